@@ -1,5 +1,5 @@
 import os
-from flask import Flask
+from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
@@ -8,6 +8,8 @@ import string
 from dotenv import load_dotenv
 from datetime import timedelta
 from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 
 # Cargar variables de entorno
@@ -19,6 +21,10 @@ app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI', 'sqlite:///users.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Tamaño máximo del cuerpo de una petición (por defecto 100 MB). Las peticiones más grandes
+# se rechazan con 413 antes de leer el cuerpo; para archivos más grandes se usa /uploads/
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 100 * 1024 * 1024))
+
 
 
 # JWT Secret Key Configuration
@@ -43,20 +49,33 @@ CORS(app, resources={
     r"/*": {
         "origins": [os.getenv('FRONTEND_BASE_URL', 'http://localhost:3000')],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization", "Upload-Offset"]
     }
 })
 
 # Initialize extensions
 # Initialize extensions
 db = SQLAlchemy(app)
+
+
+@event.listens_for(Engine, "savepoint")
+def begin_sqlite_transaction(conn, name):
+    """
+    pysqlite solo inicia la transacción antes de un INSERT/UPDATE/DELETE: si un punto de guardado
+    es lo primero que modifica la transacción, su RELEASE confirmaría los cambios y un rollback
+    posterior ya no los revertiría. Se inicia la transacción explícitamente antes del SAVEPOINT.
+    """
+    dbapi_connection = conn.connection.dbapi_connection
+    if conn.dialect.name == "sqlite" and not dbapi_connection.in_transaction:
+        dbapi_connection.execute("BEGIN")
+
 jwt = JWTManager(app)
 
 # Initialize Flask-Migrate
 migrate = Migrate(app, db)
 
 # Import and register blueprints
-from app.models import user_model, topic_model, statu_model, tercero_model, ticket_model
+from app.models import user_model, topic_model, statu_model, tercero_model, ticket_model, ticket_stat_model, attachment_blob_model, email_outbox_model
 from app.routes import (
     auth_routes, 
     topic_routes, 
@@ -65,7 +84,9 @@ from app.routes import (
     ticket_routes, 
     terceros_routes,
     auth_paz_y_salgo_routes,
-    dependencia_routes
+    dependencia_routes,
+    upload_routes,
+    email_routes
 
 )
 
@@ -77,6 +98,35 @@ app.register_blueprint(ticket_routes.bp)
 app.register_blueprint(terceros_routes.bp)
 app.register_blueprint(auth_paz_y_salgo_routes.bp)
 app.register_blueprint(dependencia_routes.bp)
+app.register_blueprint(upload_routes.bp)
+app.register_blueprint(email_routes.bp)
+
+# Recibir los anexos multipart/form-data directamente en disco
+from app.utils.attachment_uploads import AttachmentRequest
+
+app.request_class = AttachmentRequest
+
+# Register CLI commands
+from app.commands import attachment_commands, email_commands, ticket_commands
+
+app.cli.add_command(attachment_commands.cli)
+app.cli.add_command(email_commands.cli)
+app.cli.add_command(ticket_commands.cli)
+
+# Con EMAIL_OUTBOX_WORKER=thread, cada proceso que atiende peticiones envía los correos
+# pendientes desde su propio hilo. main.py lo inicia al arrancar; con otros servidores se
+# inicia con la primera petición
+from app.utils.email_outbox import start_worker
+
+
+@app.before_request
+def start_email_outbox_worker():
+    start_worker(app)
+
+
+@app.errorhandler(413)
+def request_entity_too_large(error):
+    return jsonify({"error": "La petición excede el tamaño máximo permitido"}), 413
 
 
 @app.route('/')
@@ -0,0 +1,174 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+from sqlalchemy.orm import undefer
+
+from app import db
+from app.models.attachment_blob_model import AttachmentBlob
+from app.models.ticket_model import TicketAttachment
+from app.utils.attachment_reconciler import reconcile_attachments
+from app.utils.attachment_store import compress_blob, store_blob
+from app.utils.attachment_thumbnails import THUMBNAIL_CACHE_MAX_SIZE, evict_thumbnails
+
+
+cli = AppGroup('attachments', help='Mantenimiento del almacén de anexos.')
+
+
+@cli.command('migrate-blobs')
+@click.option('--batch-size', default=50, show_default=True,
+              help='Número de anexos que se mueven por transacción.')
+def migrate_blobs(batch_size):
+    """
+    Mueve al almacén de anexos el contenido guardado en la columna file_content.
+    Procesa los anexos por lotes y confirma cada lote, por lo que puede interrumpirse
+    y volver a ejecutarse: solo se procesan los anexos que aún tienen file_content.
+    Uso:
+        flask attachments migrate-blobs --batch-size 50
+    """
+    moved = 0
+    last_id = 0
+    while True:
+        attachments = TicketAttachment.query.options(undefer(TicketAttachment.file_content)).filter(
+            TicketAttachment.id > last_id,
+            TicketAttachment.file_content.isnot(None)
+        ).order_by(TicketAttachment.id).limit(batch_size).all()
+        if not attachments:
+            break
+
+        for attachment in attachments:
+            sha256, file_size = store_blob(attachment.file_content, attachment.file_type)
+            attachment.sha256 = sha256
+            attachment.file_size = file_size
+            attachment.file_content = None
+
+        last_id = attachments[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+        moved += len(attachments)
+        click.echo(f"{moved} anexos movidos al almacén")
+
+    click.echo(f"Migración terminada ({moved} anexos)")
+
+
+@cli.command('compress')
+@click.option('--batch-size', default=50, show_default=True,
+              help='Número de contenidos que se comprimen por transacción.')
+def compress_blobs(batch_size):
+    """
+    Comprime los contenidos del almacén guardados antes de existir la compresión, según el
+    tipo de los anexos que los referencian, y registra su tamaño en disco.
+    Procesa los contenidos por lotes y confirma cada lote, por lo que puede interrumpirse
+    y volver a ejecutarse: solo se procesan los contenidos sin codificación registrada.
+    Uso:
+        flask attachments compress --batch-size 50
+    """
+    file_type = select(TicketAttachment.file_type).where(
+        TicketAttachment.sha256 == AttachmentBlob.sha256
+    ).limit(1).scalar_subquery()
+
+    processed = 0
+    compressed = 0
+    last_sha256 = ''
+    while True:
+        blobs = db.session.execute(
+            select(AttachmentBlob.sha256, AttachmentBlob.size, file_type).where(
+                AttachmentBlob.sha256 > last_sha256,
+                AttachmentBlob.encoding.is_(None)
+            ).order_by(AttachmentBlob.sha256).limit(batch_size)
+        ).all()
+        if not blobs:
+            break
+
+        for sha256, size, blob_file_type in blobs:
+            result = compress_blob(sha256, size, blob_file_type)
+            if result is None:
+                click.echo(f"{sha256}: el archivo no está en el almacén")
+            elif result[0] != 'identity':
+                compressed += 1
+
+        last_sha256 = blobs[-1].sha256
+        db.session.commit()
+        processed += len(blobs)
+        click.echo(f"{processed} contenidos revisados, {compressed} comprimidos")
+
+    click.echo(f"Compresión terminada ({compressed} de {processed} contenidos comprimidos)")
+    _echo_storage_stats()
+
+
+@cli.command('reconcile')
+@click.option('--delete', is_flag=True,
+              help='Eliminar los anexos, contenidos y archivos sobrantes y corregir los contadores.')
+@click.option('--batch-size', default=500, show_default=True,
+              help='Número de registros o carpetas revisados por transacción.')
+@click.option('--min-age', default=3600, show_default=True,
+              help='Segundos de antigüedad mínima de un archivo sin registro para considerarlo abandonado.')
+@click.option('--pause', default=0.0, show_default=True,
+              help='Segundos de espera entre lotes, para reducir la carga sobre la aplicación.')
+@click.option('--reset', is_flag=True,
+              help='Empezar desde el principio en lugar de continuar la revisión interrumpida.')
+def reconcile(delete, batch_size, min_age, pause, reset):
+    """
+    Compara UPLOAD_PATH con los anexos de la base de datos e informa los anexos sin contenido,
+    los contenidos y archivos sin anexos, los temporales abandonados y las carpetas de tickets
+    eliminados o anteriores al almacén. Con --delete, además los elimina.
+    La revisión avanza por lotes y guarda su avance en UPLOAD_PATH/.reconcile.json: si se
+    interrumpe, la siguiente ejecución continúa desde ahí. Puede ejecutarse periódicamente
+    (por ejemplo, con cron) mientras la aplicación atiende peticiones.
+    Uso:
+        flask attachments reconcile
+        flask attachments reconcile --delete --batch-size 200 --pause 0.5
+    """
+    counts = reconcile_attachments(
+        delete=delete, batch_size=batch_size, min_age=min_age, pause=pause, reset=reset, report=click.echo
+    )
+    if not counts:
+        click.echo("Revisión terminada: no se encontraron diferencias")
+        return
+    click.echo("Revisión terminada" + (" (diferencias eliminadas)" if delete else ""))
+    for key, count in sorted(counts.items()):
+        click.echo(f"  {key}: {count}")
+
+
+@cli.command('evict-thumbnails')
+@click.option('--max-size', default=THUMBNAIL_CACHE_MAX_SIZE, show_default=True,
+              help='Tamaño máximo en bytes de todas las miniaturas.')
+def evict_thumbnail_cache(max_size):
+    """
+    Elimina las miniaturas usadas hace más tiempo si la caché supera max-size. La aplicación
+    también lo revisa en segundo plano; este comando permite hacerlo periódicamente (por
+    ejemplo, con cron) junto con "flask attachments reconcile".
+    Uso:
+        flask attachments evict-thumbnails
+    """
+    removed = evict_thumbnails(max_size)
+    click.echo(f"Miniaturas eliminadas: {removed}")
+
+
+@cli.command('stats')
+def storage_stats():
+    """
+    Muestra el tamaño original y el tamaño en disco de los contenidos del almacén, por codificación.
+    Uso:
+        flask attachments stats
+    """
+    _echo_storage_stats()
+
+
+def _echo_storage_stats():
+    rows = db.session.execute(
+        select(
+            AttachmentBlob.encoding,
+            func.count(),
+            func.coalesce(func.sum(AttachmentBlob.size), 0),
+            func.coalesce(func.sum(func.coalesce(AttachmentBlob.stored_size, AttachmentBlob.size)), 0)
+        ).group_by(AttachmentBlob.encoding).order_by(AttachmentBlob.encoding)
+    ).all()
+
+    total_size = 0
+    total_stored_size = 0
+    for encoding, count, size, stored_size in rows:
+        click.echo(f"{encoding or 'sin revisar'}: {count} contenidos, {size} bytes originales, {stored_size} bytes en disco")
+        total_size += size
+        total_stored_size += stored_size
+    saved = 100 * (1 - total_stored_size / total_size) if total_size else 0
+    click.echo(f"Total: {total_size} bytes originales, {total_stored_size} bytes en disco ({saved:.1f} % de ahorro)")
@@ -0,0 +1,76 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+
+from app import db
+from app.models.email_outbox_model import EmailOutbox
+from app.utils.email_outbox import EMAIL_OUTBOX_POLL_INTERVAL, process_outbox, run_worker
+from app.utils.email_utils import smtp_pool
+
+
+cli = AppGroup('emails', help='Envío de los correos de la bandeja de salida.')
+
+
+@cli.command('worker')
+@click.option('--poll-interval', default=EMAIL_OUTBOX_POLL_INTERVAL, show_default=True,
+              help='Segundos entre dos revisiones de la bandeja de salida.')
+def worker(poll_interval):
+    """
+    Envía de forma continua los correos de la bandeja de salida. Para enviarlos solo con
+    este proceso, y no con un hilo dentro de cada proceso de la aplicación, configure
+    EMAIL_OUTBOX_WORKER=off en la aplicación. Pueden ejecutarse varios a la vez.
+    Uso:
+        flask emails worker --poll-interval 10
+    """
+    click.echo("Enviando correos de la bandeja de salida (Ctrl+C para detener)")
+    try:
+        run_worker(poll_interval=poll_interval)
+    except KeyboardInterrupt:
+        click.echo("Envío detenido")
+        _echo_pool_stats()
+
+
+@cli.command('send-pending')
+@click.option('--batch-size', default=20, show_default=True,
+              help='Número de correos que se reservan por lote.')
+def send_pending(batch_size):
+    """
+    Envía los correos pendientes de la bandeja de salida y termina.
+    Uso:
+        flask emails send-pending
+    """
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = process_outbox(batch_size)
+        if not sent and not failed:
+            break
+        total_sent += sent
+        total_failed += failed
+        click.echo(f"{total_sent} correos enviados, {total_failed} con error")
+    click.echo(f"Envío terminado ({total_sent} enviados, {total_failed} con error)")
+    _echo_pool_stats()
+
+
+@cli.command('stats')
+def outbox_stats():
+    """
+    Muestra el número de correos de la bandeja de salida por estado.
+    Uso:
+        flask emails stats
+    """
+    rows = db.session.execute(
+        select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status).order_by(EmailOutbox.status)
+    ).all()
+    if not rows:
+        click.echo("La bandeja de salida está vacía")
+    for status, count in rows:
+        click.echo(f"{status}: {count}")
+
+
+def _echo_pool_stats():
+    stats = smtp_pool.stats()
+    click.echo(
+        f"Conexiones SMTP: {stats['handshakes']} abiertas, {stats['handshakes_avoided']} envíos con "
+        f"una conexión reutilizada, {stats['reconnects']} reconexiones; "
+        f"latencia de envío promedio {stats['send_seconds_avg']:.3f} s, máxima {stats['send_seconds_max']:.3f} s"
+    )
@@ -0,0 +1,31 @@
+import click
+from flask.cli import AppGroup
+
+from app import db
+from app.models.ticket_model import Ticket
+from app.models.ticket_stat_model import TicketStat
+from app.utils.ticket_stats import rebuild_ticket_stats
+
+
+cli = AppGroup('tickets', help='Mantenimiento de los tickets.')
+
+
+@cli.command('rebuild-stats')
+@click.option('--if-empty', is_flag=True,
+              help='Solo llenar el acumulado si está vacío y ya existen tickets.')
+def rebuild_stats(if_empty):
+    """
+    Recalcula el acumulado de estadísticas (GET /tickets/stats/) a partir de la tabla de tickets.
+    Debe ejecutarse una vez, antes de iniciar la aplicación, en una base de datos creada antes
+    de existir el acumulado; también sirve para corregirlo. Durante el cálculo no deben
+    modificarse tickets.
+    Uso:
+        flask tickets rebuild-stats --if-empty
+    """
+    if if_empty and (TicketStat.query.first() is not None or Ticket.query.first() is None):
+        click.echo("El acumulado de estadísticas no requiere llenarse")
+        return
+    rebuild_ticket_stats()
+    db.session.commit()
+    groups = TicketStat.query.count()
+    click.echo(f"Acumulado de estadísticas recalculado ({groups} grupos)")
@@ -0,0 +1,30 @@
+from app import db
+from datetime import datetime
+
+class AttachmentBlob(db.Model):
+    """
+    Representa un archivo del almacén de anexos direccionado por contenido.
+    Cada contenido distinto se guarda una sola vez en disco, bajo UPLOAD_PATH/blobs,
+    con su SHA-256 como nombre. Los anexos de los tickets lo referencian por el hash.
+    Atributos:
+        sha256 (str): El SHA-256 del contenido, en hexadecimal. Clave primaria.
+        size (int): El tamaño del contenido en bytes.
+        stored_size (int, opcional): El tamaño del archivo en disco, menor que size si el contenido
+            está comprimido. Es None para los contenidos guardados antes de la compresión, hasta
+            ejecutar "flask attachments compress".
+        encoding (str, opcional): Cómo está guardado el archivo: "identity" (sin comprimir),
+            "zstd" o "gzip". Es None para los contenidos guardados antes de la compresión.
+        ref_count (int): El número de anexos que referencian este contenido.
+        created_at (datetime): La fecha y hora en que se guardó el contenido por primera vez.
+    Métodos:
+        __repr__(): Devuelve una representación en cadena del archivo.
+    """
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    stored_size = db.Column(db.Integer, nullable=True)
+    encoding = db.Column(db.String(10), nullable=True)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"AttachmentBlob('{self.sha256}', '{self.size}', '{self.ref_count}')"
\ No newline at end of file
@@ -0,0 +1,63 @@
+from app import db
+from datetime import datetime
+
+# Estados de un correo de la bandeja de salida
+EMAIL_STATUS_PENDIENTE = "pendiente"
+EMAIL_STATUS_ENVIANDO = "enviando"
+EMAIL_STATUS_ENVIADO = "enviado"
+EMAIL_STATUS_ERROR = "error"  # Falló de forma definitiva (cola de mensajes fallidos)
+
+
+class EmailOutbox(db.Model):
+    """
+    Correo de notificación pendiente de enviar (bandeja de salida).
+    Se guarda en la misma transacción que el cambio del ticket que lo origina, y un proceso
+    aparte (ver app/utils/email_outbox.py) lo envía después de confirmarla, de modo que la
+    respuesta de la API no espera al servidor SMTP.
+    Atributos:
+        id (int): El identificador único del correo.
+        event (str): El evento que originó el correo, por ejemplo "ticket_creado".
+        ticket_id (int, opcional): El ticket del correo. No es clave foránea: el correo puede
+            enviarse aunque el ticket se haya eliminado.
+        to_address (list): Las direcciones de los destinatarios.
+        subject (str): El asunto del correo.
+        body (str): El cuerpo HTML del correo.
+        body_text (str, opcional): El cuerpo en texto plano, que se envía como alternativa al HTML.
+        attachment_ids (list): Los ids de los anexos (TicketAttachment) que acompañan el correo.
+            Se leen al enviarlo, para no copiar su contenido en la bandeja de salida.
+        status (str): "pendiente", "enviando", "enviado" o "error". Un correo queda en "error"
+            (cola de mensajes fallidos) si el servidor lo rechazó o si se agotaron los
+            reintentos; desde ahí solo se reenvía a pedido de un administrador.
+        attempts (int): El número de intentos de envío.
+        last_error (str, opcional): El error del último intento fallido.
+        next_attempt_at (datetime, opcional): Para un correo pendiente que ya falló, cuándo
+            se vuelve a intentar.
+        idempotency_key (str, opcional): Identifica el aviso (evento y ticket), de modo que el
+            mismo aviso no se agrega dos veces a la bandeja ni se envía dos veces.
+        created_at (datetime): La fecha y hora en que se creó el correo.
+        sent_at (datetime, opcional): La fecha y hora en que se envió el correo.
+        locked_until (datetime, opcional): Mientras el estado es "enviando", hasta cuándo el
+            proceso que lo tomó tiene reservado el correo. Si el proceso se detiene, al
+            vencer la reserva otro proceso puede volver a tomarlo.
+    Métodos:
+        __repr__(): Devuelve una representación en cadena del correo.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(50), nullable=False)
+    ticket_id = db.Column(db.Integer, nullable=True, index=True)
+    to_address = db.Column(db.JSON, nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    body_text = db.Column(db.Text, nullable=True)
+    attachment_ids = db.Column(db.JSON, nullable=False, default=list)
+    status = db.Column(db.String(20), nullable=False, default=EMAIL_STATUS_PENDIENTE, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, nullable=True, index=True)
+    idempotency_key = db.Column(db.String(150), nullable=True, unique=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"EmailOutbox('{self.id}', '{self.event}', '{self.status}')"
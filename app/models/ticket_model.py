@@ -1,43 +1,48 @@
 from app import db
 from datetime import datetime
 
-class TicketAttachmentDescripcion(db.Model):
+# Tipos de anexo: los que acompañan la descripción del caso y los de la solución
+ATTACHMENT_KIND_DESCRIPCION = "descripcion"
+ATTACHMENT_KIND_SOLUCION = "solucion"
+
+
+class TicketAttachment(db.Model):
     """
-    Modelo que representa una descripción de adjunto de ticket.
+    Modelo que representa un archivo adjunto de un ticket, de descripción o de solución.
 
     Atributos:
-        id (int): Clave primaria para la descripción del adjunto.
+        id (int): Clave primaria del adjunto, única entre todos los anexos.
         ticket_id (int): Clave foránea que referencia el ticket asociado.
+        kind (str): Tipo de anexo: "descripcion" (ATTACHMENT_KIND_DESCRIPCION) o "solucion"
+            (ATTACHMENT_KIND_SOLUCION).
         file_name (str): Nombre del archivo adjunto.
         file_type (str): Tipo del archivo adjunto.
-        file_content (bytes): Contenido binario del archivo adjunto.
-        is_description_file (bool): Indicador de si el archivo es una descripción. Por defecto es True.
+        file_content (bytes, opcional): Contenido binario de los anexos guardados antes del almacén
+            de anexos; es None cuando el contenido está en el almacén. Es diferido: solo se lee
+            de la base de datos cuando se accede al atributo.
+        file_size (int): Tamaño del archivo adjunto en bytes.
+        sha256 (str): Suma de verificación SHA-256 del contenido, en hexadecimal. Identifica el
+            contenido en el almacén de anexos (AttachmentBlob).
     """
-    id = db.Column(db.Integer, primary_key=True)
-    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False)
-    file_name = db.Column(db.String(255), nullable=False)
-    file_type = db.Column(db.String(50), nullable=False)
-    file_content = db.Column(db.LargeBinary, nullable=False)
-    is_description_file = db.Column(db.Boolean, default=True)
+    # En SQLite, sin AUTOINCREMENT se reutiliza el id del último anexo eliminado: los correos
+    # pendientes que lo referencian adjuntarían el anexo de otro ticket
+    __table_args__ = {'sqlite_autoincrement': True}
 
-class TicketAttachmentRespuesta(db.Model):
-    """
-    Representa una respuesta de adjunto para un ticket.
-
-    Atributos:
-        id (int): La clave primaria del adjunto.
-        ticket_id (int): La clave foránea que referencia el ticket asociado.
-        file_name (str): El nombre del archivo adjunto.
-        file_type (str): El tipo del archivo adjunto.
-        file_content (bytes): El contenido binario del archivo adjunto.
-        is_description_file (bool): Indica si el archivo es una descripción. Por defecto es True.
-    """
     id = db.Column(db.Integer, primary_key=True)
-    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False, default=ATTACHMENT_KIND_DESCRIPCION)
     file_name = db.Column(db.String(255), nullable=False)
     file_type = db.Column(db.String(50), nullable=False)
-    file_content = db.Column(db.LargeBinary, nullable=False)
-    is_description_file = db.Column(db.Boolean, default=True)    
+    file_content = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    file_size = db.Column(db.Integer, nullable=True)
+    sha256 = db.Column(db.String(64), nullable=True)
+
+    @property
+    def is_description_file(self):
+        """
+        Indica si el archivo es de la descripción del caso (y no de la solución).
+        """
+        return self.kind == ATTACHMENT_KIND_DESCRIPCION
 
 
 class Ticket(db.Model):
@@ -59,33 +64,35 @@ class Ticket(db.Model):
         actitud (int, opcional): La calificación de actitud para el ticket.
         respuesta (int, opcional): La calificación de respuesta para el ticket.
         codigo_seguridad (int, opcional): El código de seguridad del ticket.
-        attachments_descripcion (list): Una lista de adjuntos relacionados con la descripción del ticket.
-        attachments_respuesta (list): Una lista de adjuntos relacionados con la respuesta del ticket.
+        attachments (list): Una lista de los adjuntos del ticket, de descripción y de solución.
     Métodos:
         __repr__(): Devuelve una representación en cadena de la instancia de Ticket.
     """
+    # En SQLite, sin AUTOINCREMENT se reutiliza el id del último ticket eliminado, y con él las
+    # claves de idempotencia de sus correos (ver app.utils.email_outbox.email_idempotency_key)
+    __table_args__ = {'sqlite_autoincrement': True}
+
     id = db.Column(db.Integer, primary_key=True)
-    fecha_creacion = db.Column(db.DateTime, nullable=False)
+    fecha_creacion = db.Column(db.DateTime, nullable=False, index=True)
     fecha_finalizacion = db.Column(db.DateTime, nullable=True)
     tema = db.Column(db.String(255), nullable=False)
-    estado = db.Column(db.String(50), nullable=False)
+    estado = db.Column(db.String(50), nullable=False, index=True)
     tercero_nombre = db.Column(db.String(120), nullable=True)
-    tercero_email = db.Column(db.String(120), nullable=True)
+    tercero_email = db.Column(db.String(120), nullable=True, index=True)
     especialista_nombre = db.Column(db.String(120), nullable=True)
-    especialista_email = db.Column(db.String(120), nullable=True)
+    especialista_email = db.Column(db.String(120), nullable=True, index=True)
     descripcion_caso = db.Column(db.Text, nullable=False)
     solucion_caso = db.Column(db.Text, nullable=True)
     tiempo_de_respuesta = db.Column(db.Integer, nullable=True)
     actitud = db.Column(db.Integer, nullable=True)
     respuesta = db.Column(db.Integer, nullable=True)
     codigo_seguridad = db.Column(db.Integer, nullable=True)
-    attachments_descripcion = db.relationship('TicketAttachmentDescripcion', backref='ticket', lazy=True)
-    attachments_respuesta = db.relationship('TicketAttachmentRespuesta', backref='ticket', lazy=True)
+    attachments = db.relationship('TicketAttachment', backref='ticket', lazy=True)
 
     def __repr__(self):
         return (f"Ticket('{self.tema}', '{self.fecha_creacion}', '{self.fecha_finalizacion}', "
                 f"'{self.estado}', '{self.tercero_nombre}', '{self.tercero_email}', "
                 f"'{self.especialista_nombre}', '{self.especialista_email}', '{self.descripcion_caso}', '{self.solucion_caso}', "
-                f"'{self.tiempo_de_respuesta}', '{self.actitud}', '{self.respuesta}', '{self.attachments_descripcion}', '{self.attachments_respuesta}', "
+                f"'{self.tiempo_de_respuesta}', '{self.actitud}', '{self.respuesta}', '{len(self.attachments)}', "
                 f"'{self.codigo_seguridad}')")
 
@@ -0,0 +1,36 @@
+from app import db
+
+class TicketStat(db.Model):
+    """
+    Acumulado de estadísticas de tickets para un grupo (por ejemplo, un estado o un especialista).
+    Se actualiza en la misma transacción que cada cambio de un ticket, de modo que el tablero
+    puede consultar los conteos y promedios sin recorrer la tabla de tickets.
+    Atributos:
+        id (int): El identificador único del acumulado.
+        dimension (str): La dimensión del grupo: "total", "estado", "especialista_email" o "tema".
+        valor (str): El valor del grupo dentro de la dimensión. Cadena vacía para "total" o valores nulos.
+        total (int): El número de tickets del grupo.
+        suma_actitud (int): La suma de las calificaciones de actitud del grupo.
+        conteo_actitud (int): El número de tickets del grupo con calificación de actitud.
+        suma_respuesta (int): La suma de las calificaciones de respuesta del grupo.
+        conteo_respuesta (int): El número de tickets del grupo con calificación de respuesta.
+        suma_tiempo_de_respuesta (int): La suma de las calificaciones de tiempo de respuesta del grupo.
+        conteo_tiempo_de_respuesta (int): El número de tickets del grupo con calificación de tiempo de respuesta.
+    Métodos:
+        __repr__(): Devuelve una representación en cadena del acumulado.
+    """
+    __table_args__ = (db.UniqueConstraint('dimension', 'valor', name='uq_ticket_stat_dimension_valor'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.String(30), nullable=False)
+    valor = db.Column(db.String(255), nullable=False, default='')
+    total = db.Column(db.Integer, nullable=False, default=0)
+    suma_actitud = db.Column(db.Integer, nullable=False, default=0)
+    conteo_actitud = db.Column(db.Integer, nullable=False, default=0)
+    suma_respuesta = db.Column(db.Integer, nullable=False, default=0)
+    conteo_respuesta = db.Column(db.Integer, nullable=False, default=0)
+    suma_tiempo_de_respuesta = db.Column(db.Integer, nullable=False, default=0)
+    conteo_tiempo_de_respuesta = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"TicketStat('{self.dimension}', '{self.valor}', '{self.total}')"
\ No newline at end of file
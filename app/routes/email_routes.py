@@ -0,0 +1,105 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+from sqlalchemy import func, select
+
+from app import db
+from app.models.email_outbox_model import EMAIL_STATUS_ERROR, EmailOutbox
+from app.utils.email_outbox import replay_emails
+from app.utils.email_utils import smtp_pool
+
+
+bp = Blueprint('emails', __name__, url_prefix='/emails')
+
+
+@bp.route('/stats/', methods=['GET'])
+@jwt_required()
+def get_email_stats():
+    """
+    Devuelve el número de correos de la bandeja de salida por estado y los contadores del
+    pool de conexiones SMTP.
+    Los contadores del pool son los del proceso que atiende la petición, desde que se inició:
+    con varios procesos, o con "flask emails worker", cada uno lleva los suyos.
+    Returns:
+        Response: {"outbox": {"<estado>": <correos>}, "smtp_pool": {"handshakes": ...,
+        "handshakes_avoided": ..., "sends": ..., "send_seconds_avg": ..., ...}}, estado HTTP 200.
+    """
+    rows = db.session.execute(
+        select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+    ).all()
+    return jsonify({
+        "outbox": {status: count for status, count in rows},
+        "smtp_pool": smtp_pool.stats()
+    })
+
+
+def email_to_dict(email):
+    """
+    Convierte un correo de la bandeja de salida en un diccionario, sin el cuerpo.
+    """
+    return {
+        "id": email.id,
+        "event": email.event,
+        "ticket_id": email.ticket_id,
+        "to_address": email.to_address,
+        "subject": email.subject,
+        "status": email.status,
+        "attempts": email.attempts,
+        "last_error": email.last_error,
+        "idempotency_key": email.idempotency_key,
+        "created_at": email.created_at.isoformat() if email.created_at else None,
+        "next_attempt_at": email.next_attempt_at.isoformat() if email.next_attempt_at else None,
+        "sent_at": email.sent_at.isoformat() if email.sent_at else None
+    }
+
+
+@bp.route('/failed/', methods=['GET'])
+@jwt_required()
+def get_failed_emails():
+    """
+    Lista los correos de la cola de mensajes fallidos: los que el servidor rechazó o que
+    agotaron sus reintentos. Los más recientes primero.
+    Parámetros de consulta:
+        limit (int, opcional): El número máximo de correos (por defecto 100, máximo 1000).
+    Returns:
+        Response: {"emails": [...], "total": <correos fallidos>}, estado HTTP 200.
+    """
+    limit = min(request.args.get('limit', 100, type=int) or 100, 1000)
+    query = EmailOutbox.query.filter(EmailOutbox.status == EMAIL_STATUS_ERROR)
+    emails = query.order_by(EmailOutbox.id.desc()).limit(limit).all()
+    return jsonify({
+        "emails": [email_to_dict(email) for email in emails],
+        "total": query.count()
+    })
+
+
+@bp.route('/<int:id>/replay/', methods=['POST'])
+@jwt_required()
+def replay_email(id):
+    """
+    Vuelve a enviar un correo de la cola de mensajes fallidos, con los reintentos reiniciados.
+    Un correo que no está en la cola (por ejemplo, uno ya enviado) no se reenvía.
+    Returns:
+        Response: {"message": ...}, estado HTTP 202 si el correo volvió a la bandeja de salida.
+        Response: {"error": ...}, estado HTTP 404 si el correo no existe o 409 si no está en la cola.
+    """
+    email = db.session.get(EmailOutbox, id)
+    if email is None:
+        return jsonify({"error": "Correo no encontrado"}), 404
+    if not replay_emails([id]):
+        return jsonify({"error": f"El correo no está en la cola de fallidos (estado: {email.status})"}), 409
+    db.session.commit()
+    return jsonify({"message": "El correo se enviará de nuevo"}), 202
+
+
+@bp.route('/failed/replay/', methods=['POST'])
+@jwt_required()
+def replay_failed_emails():
+    """
+    Vuelve a enviar todos los correos de la cola de mensajes fallidos, por ejemplo después de
+    corregir la configuración SMTP.
+    Returns:
+        Response: {"message": ..., "replayed": <correos>}, estado HTTP 202.
+    """
+    replayed = replay_emails()
+    db.session.commit()
+    return jsonify({"message": "Los correos fallidos se enviarán de nuevo", "replayed": replayed}), 202
@@ -1,42 +1,84 @@
-from flask import Blueprint, request, jsonify, send_file, make_response
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 from app import db
+from sqlalchemy import select
 from app.models.ticket_model import Ticket
-from app.models.ticket_model import TicketAttachmentDescripcion
-from app.models.ticket_model import TicketAttachmentRespuesta
-from io import BytesIO
+from app.models.ticket_model import TicketAttachment
+from app.models.ticket_model import ATTACHMENT_KIND_DESCRIPCION, ATTACHMENT_KIND_SOLUCION
+from app.utils.ticket_utils import (
+    InvalidQueryError,
+    apply_projection,
+    apply_ticket_filters,
+    iter_tickets_csv,
+    iter_tickets_ndjson,
+    paginate_tickets,
+    parse_fields,
+    ticket_to_dict,
+    write_tickets_xlsx
+)
+from app.utils.ticket_search import (
+    DEFAULT_SEARCH_LIMIT,
+    index_ticket,
+    remove_ticket_from_index,
+    search_tickets
+)
+from app.utils.ticket_stats import (
+    apply_ticket_stats_change,
+    get_ticket_stats,
+    ticket_stats_snapshot
+)
+from app.utils.attachment_store import (
+    ENCODING_IDENTITY,
+    find_blob,
+    open_blob,
+    open_database_content,
+    release_blob
+)
+from app.utils.attachment_uploads import (
+    AttachmentTooLargeError,
+    get_request_data,
+    has_attachment_content,
+    prepare_attachments,
+    store_attachment
+)
+from app.utils.upload_sessions import UploadSessionError
+from app.utils.attachment_zip import iter_attachments_zip
+from app.utils.email_templates import render_email
+from app.utils.email_outbox import (
+    EMAIL_EVENT_TICKET_CREADO,
+    EMAIL_EVENT_TICKET_FINALIZADO,
+    email_idempotency_key,
+    email_occurrence,
+    enqueue_email
+)
+from app.utils.attachment_thumbnails import (
+    DEFAULT_THUMBNAIL_SIZE,
+    THUMBNAIL_FORMATS,
+    ThumbnailError,
+    get_thumbnail
+)
 from datetime import datetime
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-import base64
-from datetime import datetime, timedelta
 import pytz
 import os
 from dotenv import load_dotenv
 import uuid
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-from email.mime.base import MIMEBase
-from email import encoders
-from email.mime.application import MIMEApplication
 import traceback
 import random
+import shutil
+import tempfile
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
 
 
 load_dotenv()  # Cargar variables de entorno
 
 # Ejemplos de uso
-SMTP_SERVER = os.getenv('SMTP_SERVER')
-SMTP_PORT = int(os.getenv('SMTP_PORT'))
-SMTP_USERNAME = os.getenv('SMTP_USERNAME')
-SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
 
 FRONTEND_BASE_URL = os.getenv('FRONTEND_BASE_URL')
 
 UPLOAD_PATH=os.getenv('UPLOAD_PATH')
 
+# Segundos que el navegador puede reutilizar un anexo descargado sin volver a validarlo
+ATTACHMENT_CACHE_MAX_AGE = int(os.getenv('ATTACHMENT_CACHE_MAX_AGE', 30 * 24 * 3600))
+
 bp = Blueprint("tickets", __name__, url_prefix="/tickets")
 
 
@@ -47,6 +89,8 @@ def create_ticket():
     Este endpoint recibe datos en formato JSON para crear un nuevo ticket, 
     valida los campos requeridos, procesa archivos adjuntos, guarda el ticket 
     en la base de datos y envía una notificación por correo electrónico.
+    También acepta multipart/form-data, con los campos del ticket como campos del formulario
+    y los anexos como archivos del campo "attachments", que se escriben en disco a medida que llegan.
     JSON de entrada:
     {
         "tema": "string",
@@ -63,7 +107,10 @@ def create_ticket():
                 "fileType": "string",
                 "base64Content": "string"
             }
+        ]
     }
+    Los anexos grandes pueden subirse antes por fragmentos con /uploads/ y referenciarse
+    con {"uploadId": "string"} en lugar de base64Content.
     Respuestas:
     - 201: Ticket creado correctamente.
     - 400: Campo requerido faltante o archivo adjunto excede el tamaño máximo.
@@ -71,7 +118,7 @@ def create_ticket():
     Returns:
         Response: Respuesta HTTP con el resultado de la operación.
     """
-    data = request.json
+    data = get_request_data()
     try:
         # Validar campos requeridos
         required_fields = [
@@ -105,153 +152,66 @@ def create_ticket():
         
         db.session.add(new_ticket)
         db.session.flush()  # Esto poblará el ID sin hacer commit aún
-
-        def sanitize_filename(filename):
-            """
-            Limpia y reduce el nombre del archivo
-            - Elimina caracteres no válidos
-            - Limita la longitud
-            - Usa un UUID si el nombre es problemático
-            """
-            import re
-            import uuid
-            
-            # Eliminar caracteres no válidos
-            filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-            
-            # Limitar longitud
-            max_length = 255
-            if len(filename) > max_length:
-                # Tomar los primeros caracteres y añadir extensión
-                name, ext = os.path.splitext(filename)
-                filename = f"{name[:max_length-len(ext)]}{ext}"
-            
-            # Si el nombre sigue siendo problemático, usar UUID
-            if not filename or len(filename) == 0:
-                filename = f"{uuid.uuid4()}.png"
-            
-            return filename
-
-        def get_safe_file_path(base_path, ticket_id, filename):
-            """
-            Genera una ruta de archivo segura con longitud limitada
-            """
-            ticket_folder = os.path.join(base_path, str(ticket_id))
-            descripcion_folder = os.path.join(ticket_folder, "Anexos_Descripcion")
-            
-            # Crear carpetas si no existen
-            os.makedirs(descripcion_folder, exist_ok=True)
-            
-            # Intentar varias estrategias de nombrado
-            attempts = [
-                os.path.join(descripcion_folder, filename),
-                os.path.join(descripcion_folder, f"{uuid.uuid4()}_{filename}"),
-                os.path.join(descripcion_folder, f"{uuid.uuid4()}.png")
-            ]
-            
-            for file_path in attempts:
-                try:
-                    # Intentar crear un archivo temporal para verificar la ruta
-                    with open(file_path, 'wb') as f:
-                        f.write(b'test')
-                    os.remove(file_path)  # Eliminar el archivo de prueba
-                    return file_path
-                except (OSError, IOError):
-                    continue
-            
-            raise ValueError("No se pudo crear un archivo de imagen válido")
-
-        # Crear las carpetas para los anexos
-        ticket_folder = os.path.join(UPLOAD_PATH, str(new_ticket.id))
-        descripcion_folder = os.path.join(ticket_folder, "Anexos_Descripcion")
-        solucion_folder = os.path.join(ticket_folder, "Anexos_Solucion")
-        
-        # Crear las carpetas si no existen
-        os.makedirs(descripcion_folder, exist_ok=True)
-        os.makedirs(solucion_folder, exist_ok=True)
+        index_ticket(new_ticket)
+        apply_ticket_stats_change(None, ticket_stats_snapshot(new_ticket))
 
         # Procesar archivos adjuntos
         attachments = data.get("attachments", [])
-        processed_attachments = []
+        prepare_attachments(attachments)  # Decodificar y escribir los anexos en paralelo
+        new_attachments = []
         for attachment in attachments:
             try:
-                if not attachment.get('base64Content'):
+                if not has_attachment_content(attachment):
                     continue  # Saltar archivos sin contenido
 
-                # Extraer base64 real (remover prefijo data:image/png;base64, si existe)
-                base64_content = attachment['base64Content'].split(',')[-1]
-                
-                # Decodificar contenido
-                file_content = base64.b64decode(base64_content)
-                
-                # Validar tamaño del archivo (por ejemplo, máximo 10MB)
-                max_file_size = 10 * 1024 * 1024  # 10 MB
-                if len(file_content) > max_file_size:
-                    return jsonify({
-                        "error": f"Archivo {attachment.get('fileName', 'Sin nombre')} excede el tamaño máximo de 10MB"
-                    }), 400
-
-                # Sanitizar y obtener nombre de archivo seguro
+                # Guardar el contenido en el almacén de anexos (una sola copia por contenido),
+                # validando el tamaño máximo de 10MB
+                try:
+                    sha256, file_size = store_attachment(attachment)
+                except AttachmentTooLargeError as size_error:
+                    db.session.rollback()
+                    return jsonify({"error": str(size_error)}), 400
+                except UploadSessionError as upload_error:
+                    db.session.rollback()
+                    return jsonify({"error": str(upload_error)}), upload_error.status_code
+
+                # Sanitizar el nombre del archivo
                 file_name = sanitize_filename(attachment.get('fileName', f'archivo_{uuid.uuid4()}'))
 
-                # Obtener ruta de archivo segura
-                try:
-                    file_path = get_safe_file_path(UPLOAD_PATH, new_ticket.id, file_name)
-                    
-                    # Guardar el archivo en el servidor
-                    with open(file_path, 'wb') as f:
-                        f.write(file_content)
-
-                    # Crear registro de archivo adjunto
-                    ticket_attachment = TicketAttachmentDescripcion(
-                        ticket_id=new_ticket.id,
-                        file_name=os.path.basename(file_path),
-                        file_type=attachment.get('fileType', 'application/octet-stream'),
-                        file_content=file_content,  # Si es necesario almacenar el archivo, puedes hacerlo
-                        is_description_file=True
-                    )
-                    
-                    db.session.add(ticket_attachment)
-                    processed_attachments.append(attachment)
-
-                except ValueError as path_error:
-                    print(f"Error de ruta al procesar archivo: {path_error}")
-                    # Puedes manejar este error según tus necesidades
-                    continue
+                # Crear registro de archivo adjunto
+                ticket_attachment = TicketAttachment(
+                    ticket_id=new_ticket.id,
+                    kind=ATTACHMENT_KIND_DESCRIPCION,
+                    file_name=file_name,
+                    file_type=attachment.get('fileType', 'application/octet-stream'),
+                    file_size=file_size,
+                    sha256=sha256
+                )
+
+                db.session.add(ticket_attachment)
+                new_attachments.append(ticket_attachment)
 
             except Exception as attachment_error:
                 print(f"Error procesando archivo: {attachment_error}")
                 print(traceback.format_exc())  # Imprimir traza completa
         
-        # Enviar correo electrónico de notificación
-        frontend_url = os.getenv('FRONTEND_BASE_URL')
-        email_body = f"""
-        <h2>Ticket creado para {data['tercero_nombre']}</h2>
-        <p>Cordial saludo {data['tercero_nombre']},</p>
-        <p>Para consultar el estado de su ticket ingrese a <a href="{frontend_url}historial">{frontend_url}historial</a> y digite el ID del ticket</p>
-        <p>Se ha creado un nuevo ticket con la siguiente descripción:</p>
-        <ul>
-            <li>ID de ticket: {new_ticket.id}</li>
-            <li>Código de verificación: {codigo_seguridad}</li>
-            <li>Tema: {data['tema']}</li>
-        </ul>
-        <h3>Descripción:</h3>
-        <p>{data['descripcion_caso']}</p>
-        <p>El especialista {data['especialista_nombre']} lo atenderá lo más pronto posible</p>
-        <p>Tenga en cuenta que los casos los especialistas los atienden en orden de llegada</p>
-        <p>Atentamente,<br>Soporte TICS</p>
-        """
+        # Correo de notificación (plantillas app/templates/emails/ticket_creado.*)
+        subject, text_body, html_body = render_email(
+            EMAIL_EVENT_TICKET_CREADO, ticket=new_ticket, frontend_url=FRONTEND_BASE_URL
+        )
 
-        try:
-            send_email(
-                to_address=[data["especialista_email"], data["tercero_email"]],
-                subject=f"Nuevo Ticket Creado para {data['tercero_nombre']}",
-                body=email_body,
-                images=[attachment['base64Content'] for attachment in processed_attachments if attachment.get('fileType', '').startswith('image/')], 
-                attachments=[attachment for attachment in processed_attachments if not attachment.get('fileType', '').startswith('image/')]
-            )
-        except Exception as email_error:
-            print(f"Error enviando correo electrónico: {email_error}")
+        # El correo se guarda en la bandeja de salida en la misma transacción que el ticket
+        # y se envía en segundo plano después de confirmarla
+        db.session.flush()  # Poblar los ids de los anexos
+        enqueue_email(
+            EMAIL_EVENT_TICKET_CREADO,
+            to_address=[data["especialista_email"], data["tercero_email"]],
+            subject=subject,
+            body=html_body,
+            text_body=text_body,
+            ticket_id=new_ticket.id,
+            attachment_ids=[attachment.id for attachment in new_attachments]
+        )
 
         db.session.commit()
 
@@ -271,154 +231,32 @@ def create_ticket():
     finally:
         db.session.close()
 
-def send_email(to_address, subject, body, images=[], attachments=[]):
-    """
-    Envía un correo electrónico con el asunto, cuerpo, imágenes y archivos adjuntos especificados.
-    Args:
-        to_address (list): Lista de direcciones de correo electrónico de los destinatarios.
-        subject (str): Asunto del correo electrónico.
-        body (str): Contenido HTML del cuerpo del correo electrónico.
-        images (list, optional): Lista de cadenas de imágenes codificadas en base64 para incrustar en el correo electrónico. Por defecto es [].
-        attachments (list, optional): Lista de diccionarios que representan archivos adjuntos. Cada diccionario debe tener:
-            - 'base64Content' (str): Contenido codificado en base64 del archivo.
-            - 'fileName' (str, opcional): Nombre del archivo. Por defecto es "archivo".
-            - 'fileType' (str, opcional): Tipo MIME del archivo. Por defecto es 'application/octet-stream'.
-    Raises:
-        Exception: Si hay un error al procesar imágenes o archivos adjuntos, o al enviar el correo electrónico.
-    Example:
-        send_email(
-            to_address=["example@example.com"],
-            subject="Correo de prueba",
-            body="<h1>Este es un correo de prueba</h1>",
-            images=["cadena_base64_imagen"],
-            attachments=[{
-                "base64Content": "cadena_base64_archivo",
-                "fileName": "prueba.pdf",
-                "fileType": "application/pdf"
-            }]
-    """
-    msg = MIMEMultipart('related')
-    msg['From'] = SMTP_USERNAME
-    msg['To'] = ', '.join(to_address)
-    msg['Subject'] = subject
-
-    # Crear la parte HTML del correo
-    html = f"""
-    <html>
-        <body>
-            {body}
-            <br><br>
-            {''.join([f'<img src="cid:image{i}" style="max-width:100%;">' for i in range(len(images))])}
-        </body>
-    </html>
-    """
-
-    # Adjuntar la parte HTML
-    msg.attach(MIMEText(html, 'html'))
-
-    # Adjuntar las imágenes
-    for i, image_data in enumerate(images):
-        try:
-            # Asegúrate de que image_data es una cadena base64 válida
-            if ',' in image_data:
-                image_data = image_data.split(',', 1)[1]
-            
-            image_binary = base64.b64decode(image_data)
-            image = MIMEImage(image_binary)
-            image.add_header('Content-ID', f'<image{i}>')
-            msg.attach(image)
-        except Exception as img_error:
-            print(f"Error procesando imagen {i}: {str(img_error)}")
-
-    # Mapeo de tipos MIME
-    mime_types = {
-        'application/pdf': 'application/pdf',
-        'application/vnd.ms-powerpoint': 'application/vnd.ms-powerpoint',
-        'application/vnd.openxmlformats-officedocument.presentationml.presentation': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
-        'application/vnd.ms-excel': 'application/vnd.ms-excel',  # Archivos .xls
-        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',  # Archivos .xlsx
-        'application/msword': 'application/msword',  # Archivos .doc
-        'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',  # Archivos .docx
-        'video/mp4': 'video/mp4',
-        'image/jpeg': 'image/jpeg',
-        'image/png': 'image/png',
-        'image/gif': 'image/gif'
-}
-
-
-
-    # Adjuntar archivos
-    for attachment in attachments:
-        try:
-            # Asegúrate de que el contenido base64 es válido
-            if ',' in attachment['base64Content']:
-                file_content = attachment['base64Content'].split(',', 1)[1]
-            else:
-                file_content = attachment['base64Content']
-            
-            # Decodificar contenido
-            file_binary = base64.b64decode(file_content)
-            
-            # Obtener el tipo MIME correcto
-            file_type = attachment.get('fileType', 'application/octet-stream')
-            mime_type = mime_types.get(file_type, file_type)
-
-            # Crear parte MIME para el archivo
-            if mime_type.startswith('image/'):
-                part = MIMEImage(file_binary, _subtype=mime_type.split('/')[-1])
-            elif mime_type == 'application/pdf':
-                part = MIMEApplication(file_binary, _subtype='pdf')
-            elif mime_type.startswith('video/'):
-                part = MIMEBase('video', mime_type.split('/')[-1])
-                part.set_payload(file_binary)
-                encoders.encode_base64(part)
-            elif mime_type.startswith('application/vnd.'):
-                part = MIMEApplication(file_binary, _subtype=mime_type.split('.')[-1])
-            else:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(file_binary)
-                encoders.encode_base64(part)
-            
-            # Agregar encabezados
-            part.add_header(
-                'Content-Disposition', 
-                f'attachment; filename="{attachment.get("fileName", "archivo")}"'
-            )
-            
-            msg.attach(part)
-        except Exception as file_error:
-            print(f"Error procesando archivo adjunto: {str(file_error)}")
-
-    try:
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        
-        server.sendmail(SMTP_USERNAME, to_address, msg.as_string())
-        
-        server.quit()
-        print("Correo enviado exitosamente")
-    except Exception as e:
-        print(f"Error completo enviando correo: {str(e)}")
-        import traceback
-        traceback.print_exc()
-
-
-from flask import jsonify
-from datetime import datetime
 
 @bp.route("/", methods=["GET"])
 def get_tickets():
     """
-    Recupera todos los tickets de la base de datos y los devuelve como una respuesta JSON.
-
-    Esta función consulta todos los tickets del modelo Ticket, formatea los datos de cada ticket
-    en un diccionario y los agrega a una lista. La lista de diccionarios de tickets
-    se devuelve como una respuesta JSON.
+    Recupera los tickets de la base de datos y los devuelve como una respuesta JSON.
+
+    Los filtros se aplican en la base de datos. Parámetros de consulta opcionales:
+        - estado, tema, especialista_email, tercero_email: igualdad exacta.
+        - fecha_desde, fecha_hasta: rango de fecha de creación en formato ISO ("YYYY-MM-DD").
+        - limit: número de tickets por página (máximo 200). Activa la paginación.
+        - cursor: el valor next_cursor de la página anterior. Activa la paginación.
+        - view=summary: omite descripcion_caso y solucion_caso, que no se leen de la base de datos.
+          El texto completo se consulta en GET /tickets/<id>/.
+        - fields: lista de campos separados por comas a incluir (id siempre se incluye).
+        - format=ndjson: transmite todos los tickets que cumplen los filtros como JSON
+          delimitado por saltos de línea (application/x-ndjson). La tabla se recorre por lotes,
+          por lo que la memoria usada no depende del número de tickets. Ignora limit y cursor.
+
+    Sin limit ni cursor se devuelve la lista completa de tickets que cumplen los filtros,
+    como hasta ahora. Con paginación, los tickets se ordenan del más reciente al más antiguo
+    y la respuesta es un objeto {"tickets": [...], "next_cursor": "..."}; next_cursor es
+    None en la última página.
 
     Returns:
-        Response: Una respuesta JSON de Flask que contiene una lista de diccionarios, cada
-                  uno representando un ticket con las siguientes claves:
+        Response: Una respuesta JSON de Flask que contiene la lista (o la página) de tickets,
+                  cada uno representado con las siguientes claves:
                   - id (int): El identificador único del ticket.
                   - fecha_creacion (str o None): La fecha de creación del ticket en formato ISO, o None si no está disponible.
                   - tema (str): El tema del ticket.
@@ -433,28 +271,151 @@ def get_tickets():
                   - actitud (str): La calificación de actitud para el ticket.
                   - respuesta (str): La respuesta proporcionada para el ticket.
                   - fecha_finalizacion (str o None): La fecha de finalización del ticket en formato ISO, o None si no está disponible.
+                  Con view o fields solo se incluyen las claves solicitadas.
+                  Si algún parámetro no es válido se devuelve un error 400.
     """
-    tickets = Ticket.query.all()
-    tickets_data = []
-    for ticket in tickets:
-        ticket_info = {
-            "id": ticket.id,
-            "fecha_creacion": ticket.fecha_creacion.isoformat() if ticket.fecha_creacion else None,
-            "tema": ticket.tema,
-            "estado": ticket.estado,
-            "tercero_nombre": ticket.tercero_nombre,
-            "tercero_email": ticket.tercero_email,
-            "especialista_nombre": ticket.especialista_nombre,
-            "especialista_email": ticket.especialista_email,
-            "descripcion_caso": ticket.descripcion_caso,
-            "solucion_caso": ticket.solucion_caso,
-            "tiempo_de_respuesta": ticket.tiempo_de_respuesta,
-            "actitud": ticket.actitud,
-            "respuesta": ticket.respuesta,
-            "fecha_finalizacion": ticket.fecha_finalizacion.isoformat() if ticket.fecha_finalizacion else None
-        }
-        tickets_data.append(ticket_info)
-    return jsonify(tickets_data)
+    try:
+        fields = parse_fields(request.args)
+        query = apply_projection(apply_ticket_filters(Ticket.query, request.args), fields)
+
+        output_format = request.args.get("format", "json")
+        if output_format == "ndjson":
+            return Response(
+                stream_with_context(iter_tickets_ndjson(query, fields)),
+                mimetype="application/x-ndjson"
+            )
+        if output_format != "json":
+            return jsonify({"error": f"Formato desconocido: {output_format}"}), 400
+
+        if "limit" not in request.args and "cursor" not in request.args:
+            return jsonify([ticket_to_dict(ticket, fields) for ticket in query.all()])
+
+        tickets, next_cursor = paginate_tickets(query, request.args)
+    except InvalidQueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "tickets": [ticket_to_dict(ticket, fields) for ticket in tickets],
+        "next_cursor": next_cursor
+    })
+
+
+@bp.route("/stats/", methods=["GET"])
+def get_stats():
+    """
+    Devuelve las estadísticas de tickets para el tablero.
+    Los datos se leen del acumulado TicketStat, que se actualiza con cada cambio de un ticket,
+    por lo que el costo depende del número de grupos y no del número de tickets. En una base
+    de datos creada antes de existir el acumulado, se llena con "flask tickets rebuild-stats".
+    Returns:
+        Response: Una respuesta JSON con las claves:
+            - total: el conteo y los promedios de calificación de todos los tickets.
+            - por_estado, por_especialista_email, por_tema: listas de grupos ordenados por total,
+              cada uno con valor, total, promedio_actitud, promedio_respuesta y
+              promedio_tiempo_de_respuesta.
+    """
+    return jsonify(get_ticket_stats())
+
+
+@bp.route("/search/", methods=["GET"])
+def search():
+    """
+    Busca tickets por texto en el tema, la descripción y la solución del caso.
+    Usa el índice de texto completo de la base de datos (FTS5 en SQLite, tsvector en PostgreSQL),
+    por lo que no recorre la tabla de tickets.
+    Parámetros de consulta:
+        - q (str): El texto a buscar. Requerido.
+        - limit (int, opcional): Número máximo de resultados (por defecto 20, máximo 100).
+    Returns:
+        Response: Una respuesta JSON {"tickets": [...]} con los tickets ordenados por relevancia.
+                  Cada resultado incluye id, fecha_creacion, tema, estado, especialista_nombre, rank
+                  y los fragmentos descripcion_fragmento y solucion_fragmento, en HTML escapado
+                  con los términos encontrados marcados con <mark>.
+                  Si falta q o limit no es válido se devuelve un error 400.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "El parámetro q es requerido"}), 400
+    try:
+        limit = int(request.args.get("limit", DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        return jsonify({"error": "El parámetro limit debe ser un número entero"}), 400
+
+    return jsonify({"tickets": search_tickets(query, limit)})
+
+
+def iter_file_and_remove(path, chunk_size=64 * 1024):
+    """
+    Lee un archivo temporal por fragmentos y lo elimina al terminar la descarga.
+    El archivo se elimina también si el cliente cierra la conexión antes de tiempo.
+    Args:
+        path (str): La ruta del archivo temporal.
+        chunk_size (int, opcional): Tamaño de cada fragmento en bytes.
+    Yields:
+        bytes: Fragmentos del archivo.
+    """
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+@bp.route("/export/", methods=["GET"])
+def export_tickets():
+    """
+    Exporta los tickets a un archivo CSV o Excel.
+    Acepta los mismos filtros que el listado (estado, tema, especialista_email, tercero_email,
+    fecha_desde, fecha_hasta) y los parámetros view y fields para elegir las columnas.
+    Parámetros de consulta adicionales:
+        - formato: "csv" (por defecto) o "xlsx".
+    El CSV se transmite a medida que se leen los tickets por lotes. El Excel se construye
+    con un libro de solo escritura en un archivo temporal que se elimina al terminar la descarga.
+    En ambos casos la memoria usada no depende del número de tickets exportados.
+    Returns:
+        Response: El archivo exportado como descarga.
+                  Si algún parámetro no es válido se devuelve un error 400.
+    """
+    try:
+        fields = parse_fields(request.args)
+        query = apply_projection(apply_ticket_filters(Ticket.query, request.args), fields)
+    except InvalidQueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    file_name = f"tickets_{datetime.now(pytz.timezone('America/Bogota')).strftime('%Y%m%d_%H%M%S')}"
+    formato = request.args.get("formato", "csv")
+
+    if formato == "csv":
+        response = Response(
+            stream_with_context(iter_tickets_csv(query, fields)),
+            mimetype="text/csv"
+        )
+        response.headers.set('Content-Disposition', f'attachment; filename="{file_name}.csv"')
+        return response
+
+    if formato == "xlsx":
+        temp_file = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        temp_file.close()
+        try:
+            write_tickets_xlsx(query, temp_file.name, fields)
+        except Exception as e:
+            os.remove(temp_file.name)
+            print(f"Error al exportar los tickets: {str(e)}")
+            return jsonify({"error": "Error al exportar los tickets"}), 500
+
+        response = Response(
+            iter_file_and_remove(temp_file.name),
+            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+        response.headers.set('Content-Length', str(os.path.getsize(temp_file.name)))
+        response.headers.set('Content-Disposition', f'attachment; filename="{file_name}.xlsx"')
+        return response
+
+    return jsonify({"error": f"Formato desconocido: {formato}"}), 400
 
 
 @bp.route("/<int:id>/", methods=["DELETE"])
@@ -476,41 +437,31 @@ def delete_ticket(id):
         # Obtener el path de la carpeta del ticket
         ticket_folder = os.path.join(UPLOAD_PATH, str(ticket.id))
         
-        # Eliminar los anexos de descripción
-        attachments_descripcion = TicketAttachmentDescripcion.query.filter_by(ticket_id=id).all()
-        for attachment in attachments_descripcion:
-            # Eliminar archivos adjuntos físicamente si existen
-            file_path = os.path.join(os.getenv('UPLOAD_PATH', '\\Users\\saramirez\\Documents\\MINDEPORTE\\MINTICKETS\\Anexos'), attachment.file_name)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        
-        # Eliminar los anexos de respuesta
-        attachments_respuesta = TicketAttachmentRespuesta.query.filter_by(ticket_id=id).all()
-        for attachment in attachments_respuesta:
-            # Eliminar archivos adjuntos físicamente si existen
-            file_path = os.path.join(os.getenv('UPLOAD_PATH', '/default/path/'), attachment.file_name)
-            if os.path.exists(file_path):
-                os.remove(file_path)
+        # Liberar el contenido de los anexos en el almacén; el archivo se elimina
+        # cuando ningún otro anexo lo referencia
+        # (los anexos anteriores al almacén tienen el contenido en file_content y no lo referencian)
+        stored_hashes = db.session.query(TicketAttachment.sha256).filter(
+            TicketAttachment.ticket_id == id,
+            TicketAttachment.file_content.is_(None)
+        ).all()
+        for (sha256,) in stored_hashes:
+            release_blob(sha256)
         
-        # Eliminar los anexos de descripción
-        TicketAttachmentDescripcion.query.filter_by(ticket_id=id).delete()
-        # Eliminar los anexos de respuesta
-        TicketAttachmentRespuesta.query.filter_by(ticket_id=id).delete()
+        # Eliminar los anexos de descripción y de solución
+        TicketAttachment.query.filter_by(ticket_id=id).delete()
         
-        # Eliminar la carpeta del ticket y sus archivos (si existen)
-        if os.path.exists(ticket_folder):
-            for root, dirs, files in os.walk(ticket_folder, topdown=False):
-                for file in files:
-                    os.remove(os.path.join(root, file))  # Eliminar los archivos
-                for dir in dirs:
-                    os.rmdir(os.path.join(root, dir))  # Eliminar los directorios vacíos
-            os.rmdir(ticket_folder)  # Eliminar la carpeta del ticket
-
-        # Eliminar el ticket
+        # Eliminar el ticket y su entrada en el índice de búsqueda
+        remove_ticket_from_index(ticket.id)
+        apply_ticket_stats_change(ticket_stats_snapshot(ticket), None)
         db.session.delete(ticket)
         
         # Confirmar los cambios
         db.session.commit()
+
+        # Eliminar la carpeta del ticket (miniaturas de sus anexos y carpetas Anexos_* anteriores
+        # al almacén) una vez confirmada la eliminación; si queda algo, lo elimina
+        # "flask attachments reconcile --delete"
+        shutil.rmtree(ticket_folder, ignore_errors=True)
         
         return jsonify({"message": "Ticket y sus anexos eliminados correctamente"}), 200
     except Exception as e:
@@ -532,20 +483,22 @@ def update_ticket(id):
         Response: Una respuesta JSON que indica el resultado de la operación de actualización.
             - En caso de éxito: {"message": "Ticket actualizado correctamente", "ticket_id": ticket.id}, estado HTTP 200.
             - En caso de fallo: {"error": "Error interno al actualizar el ticket", "details": str(e)}, estado HTTP 500.
+            - Si un uploadId no existe, no se completó o ya se usó: {"error": str}, estado 404 o 409, sin cambios.
     La función realiza los siguientes pasos:
         1. Recupera el ticket por ID o devuelve un error 404 si no se encuentra.
         2. Actualiza los campos del ticket con los datos proporcionados.
-        3. Crea los directorios necesarios para los archivos adjuntos si no existen.
-        4. Procesa y guarda los archivos adjuntos, asegurándose de que sean válidos y estén dentro de los límites de tamaño.
-        5. Confirma los cambios en la base de datos.
-        6. Maneja cualquier excepción revirtiendo la transacción y devolviendo una respuesta de error.
+        3. Procesa y guarda los archivos adjuntos en el almacén de anexos, asegurándose de que sean válidos y estén dentro de los límites de tamaño.
+        4. Confirma los cambios en la base de datos.
+        5. Maneja cualquier excepción revirtiendo la transacción y devolviendo una respuesta de error.
     Nota:
         - La función espera que los datos de la solicitud estén en formato JSON.
-        - Los archivos adjuntos deben proporcionarse como cadenas codificadas en base64 en el campo "attachments" de los datos JSON.
-        - La función asegura que los nombres de archivo y las rutas sean seguros.
+        - Los archivos adjuntos deben proporcionarse como cadenas codificadas en base64 en el campo "attachments" de los datos JSON,
+          o como archivos del campo "attachments" de un formulario multipart/form-data.
+        - La función asegura que los nombres de archivo sean seguros.
     """
     ticket = Ticket.query.get_or_404(id)
-    data = request.json
+    data = get_request_data()
+    stats_before = ticket_stats_snapshot(ticket)
     try:
         ticket.fecha_finalizacion = datetime.utcnow()
         ticket.tema = data.get("tema", ticket.tema)
@@ -557,68 +510,45 @@ def update_ticket(id):
         ticket.descripcion_caso = data.get("descripcion_caso", ticket.descripcion_caso)
         ticket.solucion_caso = data.get("solucion_caso", ticket.solucion_caso)
 
-        # Crear las carpetas si no existen
-        ticket_folder = os.path.join(UPLOAD_PATH, str(ticket.id))
-        solucion_folder = os.path.join(ticket_folder, "Anexos_Solucion")
-
-        # Crear la carpeta de anexos solución si no existe
-        os.makedirs(solucion_folder, exist_ok=True)
-
         # Procesar archivos adjuntos de respuesta
         attachments = data.get("attachments", [])
-        processed_attachments = []
+        prepare_attachments(attachments)  # Decodificar y escribir los anexos en paralelo
         for attachment in attachments:
             try:
-                if not attachment.get('base64Content'):
+                if not has_attachment_content(attachment):
                     continue  # Saltar archivos sin contenido
 
-                # Extraer base64 real (remover prefijo data:image/png;base64, si existe)
-                base64_content = attachment['base64Content'].split(',')[-1]
-                
-                # Decodificar contenido
-                file_content = base64.b64decode(base64_content)
-                
-                # Validar tamaño del archivo (por ejemplo, máximo 10MB)
-                max_file_size = 10 * 1024 * 1024  # 10 MB
-                if len(file_content) > max_file_size:
-                    print(f"Archivo {attachment.get('fileName', 'Sin nombre')} excede el tamaño máximo de 10MB")
+                # Guardar el contenido en el almacén de anexos (una sola copia por contenido),
+                # validando el tamaño máximo de 10MB
+                try:
+                    sha256, file_size = store_attachment(attachment)
+                except AttachmentTooLargeError as size_error:
+                    print(size_error)
                     continue
+                except UploadSessionError as upload_error:
+                    db.session.rollback()
+                    return jsonify({"error": str(upload_error)}), upload_error.status_code
 
-                # Sanitizar y obtener nombre de archivo seguro
+                # Sanitizar el nombre del archivo
                 file_name = sanitize_filename(attachment.get('fileName', f'archivo_{uuid.uuid4()}'))
 
-                # Obtener ruta de archivo segura
-                try:
-                    file_path = get_safe_file_path(UPLOAD_PATH, ticket.id, file_name)
-                    
-                    # Guardar el archivo en el servidor
-                    with open(file_path, 'wb') as f:
-                        f.write(file_content)
-
-                    # Crear registro de archivo adjunto de solución
-                    ticket_attachment = TicketAttachmentRespuesta(
-                        ticket_id=ticket.id,
-                        file_name=os.path.basename(file_path),
-                        file_type=attachment.get('fileType', 'application/octet-stream'),
-                        file_content=file_content,
-                        is_description_file=False  # Es un archivo de solución
-                    )
-                    db.session.add(ticket_attachment)
-
-                    processed_attachments.append({
-                        'fileName': os.path.basename(file_path),
-                        'fileType': attachment.get('fileType', 'application/octet-stream'),
-                        'base64Content': base64.b64encode(file_content).decode('utf-8')
-                    })
-
-                except ValueError as path_error:
-                    print(f"Error de ruta al procesar archivo: {path_error}")
-                    continue
+                # Crear registro de archivo adjunto de solución
+                ticket_attachment = TicketAttachment(
+                    ticket_id=ticket.id,
+                    kind=ATTACHMENT_KIND_SOLUCION,  # Es un archivo de solución
+                    file_name=file_name,
+                    file_type=attachment.get('fileType', 'application/octet-stream'),
+                    file_size=file_size,
+                    sha256=sha256
+                )
+                db.session.add(ticket_attachment)
 
             except Exception as attachment_error:
                 print(f"Error procesando archivo: {attachment_error}")
                 print(traceback.format_exc())  # Imprimir traza completa
 
+        index_ticket(ticket)
+        apply_ticket_stats_change(stats_before, ticket_stats_snapshot(ticket))
         db.session.commit()
 
         return jsonify({
@@ -638,7 +568,9 @@ def update_ticket(id):
 @bp.route("/<int:id>/finalize/", methods=["PUT"])
 def finalize_ticket(id):
     ticket = Ticket.query.get_or_404(id)
-    data = request.json
+    data = get_request_data()
+    stats_before = ticket_stats_snapshot(ticket)
+    already_finalized = ticket.estado == "Solucionado"
     try:
         ticket.fecha_finalizacion = datetime.utcnow()
         ticket.tema = data.get("tema", ticket.tema)
@@ -649,111 +581,84 @@ def finalize_ticket(id):
         ticket.especialista_email = data.get("especialista_email", ticket.especialista_email)
         ticket.descripcion_caso = data.get("descripcion_caso", ticket.descripcion_caso)
         ticket.solucion_caso = data.get("solucion_caso", ticket.solucion_caso)
+        index_ticket(ticket)
+        apply_ticket_stats_change(stats_before, ticket_stats_snapshot(ticket))
 
-        # Crear las carpetas si no existen
-        ticket_folder = os.path.join(UPLOAD_PATH, str(ticket.id))
-        solucion_folder = os.path.join(ticket_folder, "Anexos_Solucion")
-        os.makedirs(solucion_folder, exist_ok=True)
-
-        # Lista única para los archivos adjuntos del correo
-        respuesta_email_attachments = []
+        new_attachments = []
 
         # Procesar nuevos archivos adjuntos
         attachments = data.get("attachments", [])
+        prepare_attachments(attachments)  # Decodificar y escribir los anexos en paralelo
         for attachment in attachments:
             try:
-                if not attachment.get('base64Content'):
+                if not has_attachment_content(attachment):
                     continue
 
-                base64_content = attachment['base64Content'].split(',')[-1]
-                file_content = base64.b64decode(base64_content)
-                
-                max_file_size = 10 * 1024 * 1024
-                if len(file_content) > max_file_size:
-                    print(f"Archivo {attachment.get('fileName', 'Sin nombre')} excede el tamaño máximo de 10MB")
+                # Guardar el contenido en el almacén de anexos (una sola copia por contenido)
+                try:
+                    sha256, file_size = store_attachment(attachment)
+                except AttachmentTooLargeError as size_error:
+                    print(size_error)
                     continue
+                except UploadSessionError as upload_error:
+                    db.session.rollback()
+                    return jsonify({"error": str(upload_error)}), upload_error.status_code
 
                 file_name = sanitize_filename(attachment.get('fileName', f'archivo_{uuid.uuid4()}'))
 
-                try:
-                    file_path = get_safe_file_path(UPLOAD_PATH, ticket.id, file_name)
-                    
-                    with open(file_path, 'wb') as f:
-                        f.write(file_content)
-
-                    # Guardar en la base de datos
-                    ticket_attachment = TicketAttachmentRespuesta(
-                        ticket_id=ticket.id,
-                        file_name=os.path.basename(file_path),
-                        file_type=attachment.get('fileType', 'application/octet-stream'),
-                        file_content=file_content,
-                        is_description_file=False
-                    )
-                    db.session.add(ticket_attachment)
-
-                    # Añadir a la lista de adjuntos para el correo
-                    respuesta_email_attachments.append({
-                        'fileName': os.path.basename(file_path),
-                        'fileType': attachment.get('fileType', 'application/octet-stream'),
-                        'base64Content': base64.b64encode(file_content).decode('utf-8')
-                    })
-
-                except ValueError as path_error:
-                    print(f"Error de ruta al procesar archivo: {path_error}")
-                    continue
+                # Guardar en la base de datos
+                ticket_attachment = TicketAttachment(
+                    ticket_id=ticket.id,
+                    kind=ATTACHMENT_KIND_SOLUCION,
+                    file_name=file_name,
+                    file_type=attachment.get('fileType', 'application/octet-stream'),
+                    file_size=file_size,
+                    sha256=sha256
+                )
+                db.session.add(ticket_attachment)
+                new_attachments.append(ticket_attachment)
 
             except Exception as attachment_error:
                 print(f"Error procesando archivo de solución: {attachment_error}")
                 continue
 
-        # Recuperar todos los archivos adjuntos anteriores (tanto de descripción como de respuesta)
-        # excluyendo los que acabamos de agregar
-        existing_file_names = [attachment['fileName'] for attachment in respuesta_email_attachments]
-        previous_attachments = TicketAttachmentRespuesta.query.filter(
-            TicketAttachmentRespuesta.ticket_id == ticket.id,
-            ~TicketAttachmentRespuesta.file_name.in_(existing_file_names)  # Excluir los que acabamos de agregar
-        ).all()
-        
-        for attachment in previous_attachments:
-            respuesta_email_attachments.append({
-                'fileName': attachment.file_name,
-                'fileType': attachment.file_type,
-                'base64Content': base64.b64encode(attachment.file_content).decode('utf-8')
-            })
-
-        # Enviar correo electrónico
-        encuestaLink = f"{os.getenv('FRONTEND_BASE_URL')}encuesta?id={ticket.id}"
-
-        email_body = f"""
-        <html>
-        <body>
-            <h2>Ticket solucionado para {ticket.tercero_nombre}</h2>
-            <p>Cordial saludo {ticket.tercero_nombre},</p>
-            <p>El especialista {ticket.especialista_nombre} ha solucionado su ticket.</p>
-            <ul>
-                <li>ID de ticket: {ticket.id}</li>
-                <li>Tema: {ticket.tema}</li>
-            </ul>
-            <h3>Descripción del caso:</h3>
-            <p>{ticket.descripcion_caso}</p>
-            <h3>Solución al caso:</h3>
-            <p>{ticket.solucion_caso}</p>
-            <p>Por favor, califique la solución del ticket aquí: <a href="{encuestaLink}">{encuestaLink}</a></p>
-            <p>Atentamente,<br>Soporte TICS</p>
-        </body>
-        </html>
-        """
-
-        send_email(
+        # El correo lleva los anexos de solución nuevos y, después, los anteriores
+        db.session.flush()
+        new_attachment_ids = [attachment.id for attachment in new_attachments]
+        previous_attachment_ids = db.session.execute(
+            select(TicketAttachment.id).where(
+                TicketAttachment.ticket_id == ticket.id,
+                TicketAttachment.kind == ATTACHMENT_KIND_SOLUCION,
+                ~TicketAttachment.id.in_(new_attachment_ids)  # Excluir los que acabamos de agregar
+            ).order_by(TicketAttachment.id)
+        ).scalars().all()
+
+        # Correo de solución (plantillas app/templates/emails/ticket_finalizado.*)
+        subject, text_body, html_body = render_email(
+            EMAIL_EVENT_TICKET_FINALIZADO,
+            ticket=ticket,
+            encuesta_url=f"{FRONTEND_BASE_URL}encuesta?id={ticket.id}"
+        )
+
+        # El correo se envía en segundo plano después de confirmar la transacción
+        enqueue_email(
+            EMAIL_EVENT_TICKET_FINALIZADO,
             to_address=[ticket.tercero_email],
-            subject=f"Solución ticket de {ticket.tercero_nombre}",
-            body=email_body,
-            images=[attachment['base64Content'] for attachment in respuesta_email_attachments if attachment['fileType'].startswith('image/')],
-            attachments=[attachment for attachment in respuesta_email_attachments if not attachment['fileType'].startswith('image/')]
+            subject=subject,
+            body=html_body,
+            text_body=text_body,
+            ticket_id=ticket.id,
+            attachment_ids=new_attachment_ids + previous_attachment_ids,
+            # Un ticket reabierto puede finalizarse de nuevo: cada finalización es un aviso
+            # distinto. Repetir la petición sobre un ticket ya finalizado no agrega otro aviso.
+            idempotency_key=email_idempotency_key(
+                EMAIL_EVENT_TICKET_FINALIZADO, ticket.id,
+                email_occurrence(EMAIL_EVENT_TICKET_FINALIZADO, ticket.id, repeated=already_finalized)
+            )
         )
 
         db.session.commit()
-        return jsonify({"message": "Ticket finalizado y correo enviado correctamente"}), 200
+        return jsonify({"message": "Ticket finalizado correctamente; el correo se enviará en breve"}), 200
     except Exception as e:
         db.session.rollback()
         print(f"Error al finalizar el ticket: {str(e)}")
@@ -795,47 +700,6 @@ def sanitize_filename(filename):
     
     return filename
 
-def get_safe_file_path(base_path, ticket_id, filename, subfolder="Anexos_Solucion"):
-    """
-    Genera una ruta de archivo segura con una longitud limitada.
-    Esta función crea una estructura de directorios basada en la ruta base dada, el ID del ticket y un nombre de subcarpeta opcional. 
-    Luego intenta generar una ruta de archivo única dentro de esta estructura de directorios probando diferentes estrategias de nombrado.
-    Args:
-        base_path (str): La ruta base donde se encuentran las carpetas de los tickets.
-        ticket_id (int o str): El identificador único del ticket.
-        filename (str): El nombre deseado del archivo.
-        subfolder (str, opcional): El nombre de la subcarpeta dentro de la carpeta del ticket donde se debe almacenar el archivo. Por defecto es "Anexos_Solucion".
-    Returns:
-        str: Una ruta de archivo válida donde se puede crear el archivo de forma segura.
-    Raises:
-        ValueError: Si no se puede crear una ruta de archivo válida después de varios intentos.
-    """
-
-    ticket_folder = os.path.join(base_path, str(ticket_id))
-    solution_folder = os.path.join(ticket_folder, subfolder)
-    
-    # Crear carpetas si no existen
-    os.makedirs(solution_folder, exist_ok=True)
-    
-    # Intentar varias estrategias de nombrado
-    attempts = [
-        os.path.join(solution_folder, filename),
-        os.path.join(solution_folder, f"{uuid.uuid4()}_{filename}"),
-        os.path.join(solution_folder, f"{uuid.uuid4()}.png")
-    ]
-    
-    for file_path in attempts:
-        try:
-            # Intentar crear un archivo temporal para verificar la ruta
-            with open(file_path, 'wb') as f:
-                f.write(b'test')
-            os.remove(file_path)  # Eliminar el archivo de prueba
-            return file_path
-        except (OSError, IOError):
-            continue
-    
-    raise ValueError("No se pudo crear un archivo de imagen válido")
-
 @bp.route("/<int:id>/", methods=["GET"])
 def get_ticket(id):
     """
@@ -909,6 +773,7 @@ def rate_ticket(id):
     """
     ticket = Ticket.query.get_or_404(id)
     data = request.json
+    stats_before = ticket_stats_snapshot(ticket)
     try:
         ticket.tiempo_de_respuesta = data.get("tiempo_de_respuesta")
         ticket.actitud = data.get("actitud")
@@ -917,6 +782,8 @@ def rate_ticket(id):
         if data.get("solutionApproval") == "No":
             ticket.estado = "Devuelto"
 
+        apply_ticket_stats_change(stats_before, ticket_stats_snapshot(ticket))
+
         db.session.commit()
         return jsonify({"message": "Calificaciones actualizadas correctamente"}), 200
     except Exception as e:
@@ -927,8 +794,9 @@ def rate_ticket(id):
 def get_ticket_attachments(ticket_id):
     """
     Recupera y devuelve los archivos adjuntos asociados con un ticket específico.
-    Esta función obtiene tanto los archivos adjuntos de descripción como los de respuesta para un ID de ticket dado.
-    Devuelve una respuesta JSON que contiene los metadatos de cada archivo adjunto.
+    Esta función obtiene tanto los archivos adjuntos de descripción como los de solución para un ID de ticket dado,
+    en una sola consulta. Devuelve una respuesta JSON que contiene los metadatos de cada archivo adjunto (id, nombre, tipo y tamaño).
+    El contenido de los archivos no se lee de la base de datos.
     Args:
         ticket_id (int): El ID del ticket para el cual se deben recuperar los archivos adjuntos.
     Returns:
@@ -942,32 +810,20 @@ def get_ticket_attachments(ticket_id):
         # Check if ticket exists
         ticket = Ticket.query.get_or_404(ticket_id)
         
-        # Retrieve description attachments
-        description_attachments = TicketAttachmentDescripcion.query.filter_by(ticket_id=ticket_id).all()
-        
-        # Retrieve response attachments
-        response_attachments = TicketAttachmentRespuesta.query.filter_by(ticket_id=ticket_id).all()
+        # Retrieve description and solution attachments, description files first
+        attachments = TicketAttachment.query.filter_by(ticket_id=ticket_id).order_by(
+            TicketAttachment.kind != ATTACHMENT_KIND_DESCRIPCION,
+            TicketAttachment.id
+        ).all()
         
         # Prepare attachment metadata
-        attachments_data = []
-        
-        # Process description attachments
-        for attachment in description_attachments:
-            attachments_data.append({
-                "id": attachment.id,
-                "file_name": attachment.file_name,
-                "file_type": attachment.file_type,
-                "is_description_file": True  # Explicitly set to True for description files
-            })
-        
-        # Process response attachments
-        for attachment in response_attachments:
-            attachments_data.append({
-                "id": attachment.id,
-                "file_name": attachment.file_name,
-                "file_type": attachment.file_type,
-                "is_description_file": False  # Explicitly set to False for response files
-            })
+        attachments_data = [{
+            "id": attachment.id,
+            "file_name": attachment.file_name,
+            "file_type": attachment.file_type,
+            "file_size": attachment.file_size,
+            "is_description_file": attachment.is_description_file
+        } for attachment in attachments]
         
         return jsonify(attachments_data), 200
     
@@ -975,13 +831,46 @@ def get_ticket_attachments(ticket_id):
         return jsonify({"error": str(e)}), 404
 
 
+@bp.route("/<int:ticket_id>/attachments.zip", methods=["GET"])
+def download_ticket_attachments_zip(ticket_id):
+    """
+    Descarga en un ZIP todos los archivos adjuntos de un ticket, con los de descripción en la
+    carpeta Anexos_Descripcion y los de solución en Anexos_Solucion.
+    El ZIP se genera a medida que se envía, sin armarlo en memoria ni en disco.
+    Args:
+        ticket_id (int): El ID del ticket.
+    Returns:
+        Response: El ZIP enviado por fragmentos, o un error 404 si el ticket no existe.
+    """
+    try:
+        ticket = Ticket.query.get(ticket_id)
+        if not ticket:
+            return jsonify({"error": "Ticket not found"}), 404
+
+        attachments = TicketAttachment.query.filter_by(
+            ticket_id=ticket_id
+        ).order_by(TicketAttachment.id).all()
+
+        response = Response(
+            iter_attachments_zip(attachments),
+            mimetype="application/zip"
+        )
+        response.headers.set('Content-Disposition', f'attachment; filename="ticket_{ticket_id}_anexos.zip"')
+        return response
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @bp.route("/attachment/<int:attachment_id>/", methods=["GET"])
 def download_attachment(attachment_id):
     """
     Descarga un archivo adjunto basado en el ID del adjunto proporcionado.
-    Esta función intenta recuperar un archivo adjunto de las tablas 
-    TicketAttachmentDescripcion o TicketAttachmentRespuesta. 
-    Si se encuentra el archivo adjunto, devuelve el contenido del archivo como una respuesta descargable. 
+    Esta función recupera el archivo adjunto, de descripción o de solución, con una sola consulta
+    a la tabla TicketAttachment.
+    Si se encuentra el archivo adjunto, devuelve el contenido del archivo como una respuesta descargable,
+    enviada por fragmentos. Admite Range (206 Partial Content) para reanudar descargas, e
+    If-None-Match con el SHA-256 del contenido como ETag (304 Not Modified).
     Si no se encuentra el archivo adjunto, devuelve un error 404. 
     En caso de cualquier otra excepción, devuelve un error 500 con el mensaje de la excepción.
     Args:
@@ -993,26 +882,105 @@ def download_attachment(attachment_id):
     """
 
     try:
-        # Primero intentar encontrarlo en los archivos de descripción
-        attachment = TicketAttachmentDescripcion.query.get(attachment_id)
-        attachment_type = "description"
-        
-        # Si no se encuentra, intentar en los archivos de respuesta
-        if not attachment:
-            attachment = TicketAttachmentRespuesta.query.get(attachment_id)
-            attachment_type = "response"
+        attachment = TicketAttachment.query.get(attachment_id)
         
-        # Si aún no se encuentra, retornar 404
+        # Si no se encuentra, retornar 404
         if not attachment:
             return jsonify({"error": "Attachment not found"}), 404
         
-        # Crear la respuesta con el archivo
-        response = make_response(attachment.file_content)
-        response.headers.set('Content-Type', attachment.file_type)
-        response.headers.set('Content-Disposition', 
-                             f'attachment; filename="{attachment.file_name}"')
-        
+        # Enviar el archivo por fragmentos, desde el almacén o desde la base de datos
+        # para los anexos guardados antes de existir el almacén
+        stored = find_blob(attachment.sha256)
+        if stored is not None and stored[1] == ENCODING_IDENTITY:
+            source = stored[0]
+            size = None
+        elif stored is not None:
+            # Contenido comprimido en el almacén: se descomprime a medida que se envía
+            source = open_blob(attachment.sha256)
+            size = attachment.file_size
+        else:
+            source = open_database_content(attachment)
+            if source is None:
+                return jsonify({"error": "Attachment content not found"}), 404
+            size = len(source)
+
+        response = send_file(
+            source,
+            mimetype=attachment.file_type or None,
+            as_attachment=True,
+            download_name=attachment.file_name,
+            conditional=False,
+            etag=False
+        )
+        if size is not None:
+            response.content_length = size
+
+        # El contenido de un anexo no cambia, por lo que su SHA-256 sirve como ETag y el
+        # navegador puede guardarlo en caché; es privado porque los anexos no son públicos
+        if attachment.sha256:
+            response.set_etag(attachment.sha256)
+        response.cache_control.no_cache = None
+        response.cache_control.private = True
+        response.cache_control.max_age = ATTACHMENT_CACHE_MAX_AGE
+
+        # Responder 304 a If-None-Match y 206 Partial Content a Range
+        try:
+            response = response.make_conditional(
+                request, accept_ranges=True, complete_length=response.content_length
+            )
+        except RequestedRangeNotSatisfiable as e:
+            response.close()
+            return e.get_response()
         return response
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/attachment/<int:attachment_id>/thumbnail/", methods=["GET"])
+def download_attachment_thumbnail(attachment_id):
+    """
+    Descarga una miniatura de un anexo de imagen, para mostrar vistas previas sin descargar
+    la imagen original. La miniatura se genera la primera vez que se pide y se guarda en disco.
+    Parámetros de consulta:
+        - size: El lado mayor de la miniatura en píxeles (por defecto 256; ver THUMBNAIL_SIZES).
+        - format: "webp" o "jpeg". Si no se indica, se usa WebP cuando el navegador lo acepta.
+    Args:
+        attachment_id (int): El ID del archivo adjunto.
+    Returns:
+        Response: La miniatura, o 304 si el navegador ya la tiene.
+        Si el tamaño o el formato no son válidos, devuelve un error 400; si el anexo no existe, 404;
+        si no es una imagen, 415.
+    """
+    try:
+        size = request.args.get("size", DEFAULT_THUMBNAIL_SIZE, type=int)
+        image_format = request.args.get("format")
+        if image_format is None:
+            accepted = request.accept_mimetypes.best_match(["image/webp", "image/jpeg"])
+            image_format = "jpeg" if accepted == "image/jpeg" else "webp"
+
+        attachment = TicketAttachment.query.get(attachment_id)
+        if not attachment:
+            return jsonify({"error": "Attachment not found"}), 404
+
+        try:
+            path = get_thumbnail(attachment, size, image_format)
+        except ThumbnailError as e:
+            return jsonify({"error": str(e)}), e.status_code
+
+        response = send_file(
+            path,
+            mimetype=THUMBNAIL_FORMATS[image_format][1],
+            conditional=False,
+            etag=False
+        )
+        response.set_etag(f"{attachment.sha256 or attachment.id}-{size}.{image_format}")
+        response.cache_control.no_cache = None
+        response.cache_control.private = True
+        response.cache_control.max_age = ATTACHMENT_CACHE_MAX_AGE
+        if "format" not in request.args:
+            response.vary.add("Accept")
+        return response.make_conditional(request)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,129 @@
+from flask import Blueprint, jsonify, request
+from app.utils.upload_sessions import (
+    UploadSessionError,
+    complete_upload_session,
+    create_upload_session,
+    delete_upload_session,
+    get_upload_session,
+    write_upload_chunk
+)
+
+
+bp = Blueprint('uploads', __name__, url_prefix='/uploads')
+
+
+def upload_session_error(error):
+    """
+    Convierte un UploadSessionError en una respuesta JSON con su código HTTP.
+    Si el error indica los bytes recibidos, se incluyen como offset para que el cliente continúe desde ahí.
+    """
+    body = {"error": str(error)}
+    if error.offset is not None:
+        body["offset"] = error.offset
+    return jsonify(body), error.status_code
+
+
+@bp.route('/', methods=['POST'])
+def create_upload():
+    """
+    Crea una sesión de subida para enviar un archivo grande por fragmentos.
+    JSON de entrada:
+    {
+        "fileName": "string",
+        "fileType": "string",
+        "size": int  (tamaño total en bytes)
+    }
+    Los fragmentos se envían con PATCH /uploads/<uploadId>/ y la subida se cierra con
+    POST /uploads/<uploadId>/complete/. Después, el uploadId se usa como anexo en
+    /tickets/register/, PATCH /tickets/<id>/ y /tickets/<id>/finalize/:
+    "attachments": [{"uploadId": "string"}]
+    Returns:
+        Response: La sesión creada con estado 201, o un error 400/413.
+    """
+    data = request.get_json() or {}
+    if not data.get('fileName'):
+        return jsonify({"error": "Campo requerido faltante: fileName"}), 400
+    try:
+        session = create_upload_session(data['fileName'], data.get('fileType'), data.get('size'))
+    except UploadSessionError as e:
+        return upload_session_error(e)
+    return jsonify(session), 201
+
+
+@bp.route('/<upload_id>/', methods=['GET'])
+def get_upload(upload_id):
+    """
+    Devuelve el estado de una sesión de subida. Tras un corte, el cliente consulta aquí el
+    offset (bytes recibidos) y continúa enviando desde esa posición.
+    Args:
+        upload_id (str): El ID de la sesión.
+    Returns:
+        Response: La sesión, o un error 404 si no existe.
+    """
+    try:
+        return jsonify(get_upload_session(upload_id)), 200
+    except UploadSessionError as e:
+        return upload_session_error(e)
+
+
+@bp.route('/<upload_id>/', methods=['PATCH'])
+def upload_chunk(upload_id):
+    """
+    Recibe un fragmento del archivo. El cuerpo es el contenido binario del fragmento y el
+    encabezado Upload-Offset indica su posición, que debe coincidir con los bytes ya recibidos.
+    Cada fragmento debe ser menor que MAX_CONTENT_LENGTH.
+    Args:
+        upload_id (str): El ID de la sesión.
+    Returns:
+        Response: La sesión con el nuevo offset, o un error 400/404/409/413. En los errores
+        409 y 413 se incluye el offset actual, salvo si otra petición está escribiendo en la
+        sesión (el cliente consulta el offset con GET y continúa).
+    """
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({"error": "El encabezado Upload-Offset es requerido"}), 400
+    if request.content_length is None:
+        return jsonify({"error": "El encabezado Content-Length es requerido"}), 411
+
+    try:
+        session = write_upload_chunk(upload_id, offset, request.stream, request.content_length)
+    except UploadSessionError as e:
+        return upload_session_error(e)
+    return jsonify(session), 200
+
+
+@bp.route('/<upload_id>/complete/', methods=['POST'])
+def complete_upload(upload_id):
+    """
+    Cierra la subida cuando se han recibido todos los bytes.
+    JSON de entrada (opcional):
+    {
+        "sha256": "string"  (para verificar el archivo recibido)
+    }
+    Args:
+        upload_id (str): El ID de la sesión.
+    Returns:
+        Response: La sesión completada con su sha256, o un error 400/404/409.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(complete_upload_session(upload_id, data.get('sha256'))), 200
+    except UploadSessionError as e:
+        return upload_session_error(e)
+
+
+@bp.route('/<upload_id>/', methods=['DELETE'])
+def cancel_upload(upload_id):
+    """
+    Cancela una sesión de subida y elimina lo recibido.
+    Args:
+        upload_id (str): El ID de la sesión.
+    Returns:
+        Response: Un mensaje de éxito, o un error 404 si no existe.
+    """
+    try:
+        delete_upload_session(upload_id)
+    except UploadSessionError as e:
+        return upload_session_error(e)
+    return jsonify({"message": "Sesión de subida cancelada"}), 200
@@ -0,0 +1,74 @@
+import os
+import uuid
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_open(path, mode='wb', fsync=False):
+    """
+    Abre un archivo para escribirlo de forma atómica.
+    Se escribe en un archivo temporal de la misma carpeta, creado con O_EXCL para que dos
+    escrituras concurrentes nunca compartan el temporal, y al terminar se renombra al destino.
+    Así nunca queda visible un archivo a medio escribir; si ocurre un error el temporal se elimina
+    y el destino no cambia.
+    Args:
+        path (str): La ruta del archivo de destino. Su carpeta se crea si no existe.
+        mode (str, opcional): 'wb' para binario o 'w' para texto.
+        fsync (bool, opcional): Si es True, el contenido y el renombrado se sincronizan con el
+            disco antes de salir, para que sobrevivan a un corte de energía.
+    Yields:
+        file: El archivo temporal abierto para escritura.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if fsync:
+        fsync_directory(directory)
+
+
+def atomic_write(path, content, fsync=False):
+    """
+    Escribe un contenido completo en un archivo de forma atómica (ver atomic_open).
+    Args:
+        path (str): La ruta del archivo de destino.
+        content (bytes o str): El contenido.
+        fsync (bool, opcional): Si es True, se sincroniza con el disco.
+    """
+    with atomic_open(path, 'w' if isinstance(content, str) else 'wb', fsync=fsync) as f:
+        f.write(content)
+
+
+def fsync_directory(directory):
+    """
+    Sincroniza con el disco las entradas de una carpeta (por ejemplo, tras renombrar un archivo en ella).
+    En sistemas que no permiten abrir carpetas (Windows) no hace nada.
+    Args:
+        directory (str): La ruta de la carpeta.
+    """
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,415 @@
+import json
+import os
+import shutil
+import time
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.attachment_blob_model import AttachmentBlob
+from app.models.ticket_model import Ticket, TicketAttachment
+from app.utils.atomic_file import atomic_write
+from app.utils.attachment_store import (
+    BLOB_FOLDER,
+    ENCODING_IDENTITY,
+    UPLOAD_PATH,
+    blob_exists,
+    delete_blob,
+    parse_blob_file_name
+)
+from app.utils.attachment_thumbnails import THUMBNAIL_FOLDER
+from app.utils.attachment_uploads import UPLOAD_TEMP_FOLDER
+from app.utils.upload_sessions import remove_expired_upload_sessions
+
+
+# Archivo de UPLOAD_PATH donde se guarda hasta dónde llegó la última revisión
+RECONCILE_CHECKPOINT_FILE = ".reconcile.json"
+
+# Fases de la revisión, en orden: anexos sin contenido, contenidos sin anexos, archivos del
+# almacén sin registro y carpetas de tickets
+RECONCILE_PHASES = ("attachments", "blobs", "files", "tickets")
+
+# Carpetas de UPLOAD_PATH/<ticket> donde se guardaban los anexos antes del almacén
+LEGACY_ATTACHMENT_FOLDERS = ("Anexos_Descripcion", "Anexos_Solucion")
+
+# Extensiones de los archivos temporales del almacén (escrituras atómicas y contenidos apartados)
+_TEMPORARY_SUFFIXES = (".tmp", ".trash")
+
+
+def _checkpoint_path():
+    return os.path.join(UPLOAD_PATH, RECONCILE_CHECKPOINT_FILE)
+
+
+def load_checkpoint():
+    """
+    Devuelve el punto donde se interrumpió la última revisión, o un diccionario vacío.
+    Returns:
+        dict: La fase ("phase"), la posición dentro de la fase ("position") y los conteos ("counts").
+    """
+    try:
+        with open(_checkpoint_path(), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_checkpoint(checkpoint):
+    atomic_write(_checkpoint_path(), json.dumps(checkpoint))
+
+
+def _remove_checkpoint():
+    try:
+        os.remove(_checkpoint_path())
+    except FileNotFoundError:
+        pass
+
+
+def reconcile_attachments(delete=False, batch_size=500, min_age=3600, pause=0, reset=False, report=print):
+    """
+    Compara los archivos de UPLOAD_PATH con los anexos de la base de datos e informa las diferencias:
+    - Anexos cuyo contenido no está en el almacén ni en file_content.
+    - Contenidos del almacén que ningún anexo referencia, o con un contador de referencias incorrecto,
+      y contenidos cuyo archivo no existe.
+    - Archivos del almacén sin registro, copias sobrantes de un contenido comprimido y temporales
+      abandonados.
+    - Carpetas de tickets eliminados, carpetas Anexos_* anteriores al almacén y miniaturas de
+      anexos eliminados.
+    Con delete=True, además elimina lo sobrante y corrige los contadores. Los anexos sin contenido
+    también se eliminan, porque su contenido no se puede recuperar.
+    La revisión avanza por lotes, cada uno en su propia transacción corta para no bloquear las
+    peticiones, y guarda después de cada lote hasta dónde llegó; si se interrumpe, la siguiente
+    ejecución continúa desde ese punto.
+    Args:
+        delete (bool, opcional): Eliminar lo sobrante en lugar de solo informarlo.
+        batch_size (int, opcional): Número de registros o carpetas revisados por lote.
+        min_age (int, opcional): Segundos de antigüedad mínima de un archivo para considerarlo
+            abandonado, de modo que no se eliminen los de una subida en curso.
+        pause (float, opcional): Segundos de espera entre lotes.
+        reset (bool, opcional): Empezar desde el principio, ignorando el punto guardado.
+        report (callable, opcional): Recibe un mensaje por cada diferencia encontrada.
+    Returns:
+        dict: El número de diferencias encontradas por tipo.
+    """
+    checkpoint = {} if reset else load_checkpoint()
+    counts = checkpoint.get("counts", {})
+    start_phase = checkpoint.get("phase", RECONCILE_PHASES[0])
+    if start_phase not in RECONCILE_PHASES:
+        start_phase = RECONCILE_PHASES[0]
+    if checkpoint:
+        report(f"Continuando la revisión desde la fase {start_phase}")
+
+    options = {"delete": delete, "batch_size": batch_size, "min_age": min_age}
+    for phase in RECONCILE_PHASES[RECONCILE_PHASES.index(start_phase):]:
+        position = checkpoint.get("position") if phase == start_phase else None
+        for position in _PHASES[phase](position, counts, report, **options):
+            db.session.commit()
+            _save_checkpoint({"phase": phase, "position": position, "counts": counts})
+            if pause:
+                time.sleep(pause)
+
+    remove_expired_upload_sessions()
+    _remove_checkpoint()
+    return counts
+
+
+def _count(counts, key):
+    counts[key] = counts.get(key, 0) + 1
+
+
+def _is_old(path, min_age):
+    try:
+        return time.time() - os.path.getmtime(path) >= min_age
+    except FileNotFoundError:
+        return False
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _check_attachments(position, counts, report, delete, batch_size, min_age):
+    """
+    Busca anexos cuyo contenido no está en el almacén ni en la columna file_content.
+    Avanza por id de anexo.
+    """
+    last_id = position or 0
+    while True:
+        attachments = db.session.execute(
+            select(TicketAttachment.id, TicketAttachment.ticket_id, TicketAttachment.sha256)
+            .where(TicketAttachment.id > last_id, TicketAttachment.file_content.is_(None))
+            .order_by(TicketAttachment.id)
+            .limit(batch_size)
+        ).all()
+        if not attachments:
+            return
+
+        for attachment_id, ticket_id, sha256 in attachments:
+            if blob_exists(sha256):
+                continue
+            _count(counts, "missing_content")
+            report(f"Anexo {attachment_id} del ticket {ticket_id} sin contenido ({sha256})")
+            if delete:
+                db.session.execute(TicketAttachment.__table__.delete().where(TicketAttachment.id == attachment_id))
+                if sha256:
+                    db.session.execute(
+                        update(AttachmentBlob)
+                        .where(AttachmentBlob.sha256 == sha256)
+                        .values(ref_count=AttachmentBlob.ref_count - 1)
+                    )
+
+        last_id = attachments[-1].id
+        yield last_id
+
+
+def _references(sha256_column):
+    """
+    Subconsulta con el número de anexos que referencian un contenido del almacén.
+    """
+    return select(func.count()).where(
+        TicketAttachment.sha256 == sha256_column,
+        TicketAttachment.file_content.is_(None)
+    ).scalar_subquery()
+
+
+def _check_blobs(position, counts, report, delete, batch_size, min_age):
+    """
+    Busca contenidos del almacén sin anexos que los referencien, con un contador de
+    referencias distinto del real o sin archivo. Avanza por SHA-256.
+    """
+    last_sha256 = position or ''
+    while True:
+        blobs = db.session.execute(
+            select(AttachmentBlob.sha256, AttachmentBlob.ref_count, _references(AttachmentBlob.sha256))
+            .where(AttachmentBlob.sha256 > last_sha256)
+            .order_by(AttachmentBlob.sha256)
+            .limit(batch_size)
+        ).all()
+        if not blobs:
+            return
+
+        for sha256, ref_count, references in blobs:
+            if not blob_exists(sha256):
+                _count(counts, "missing_blob_file")
+                report(f"Contenido {sha256} sin archivo en el almacén")
+
+            if references == 0:
+                _count(counts, "orphan_blob")
+                report(f"Contenido {sha256} sin anexos que lo referencien")
+                if delete:
+                    _delete_orphan_blob(sha256)
+            elif references != ref_count:
+                _count(counts, "wrong_ref_count")
+                report(f"Contenido {sha256} con {ref_count} referencias registradas y {references} reales")
+                if delete:
+                    # En una sola sentencia, para no sobrescribir una referencia sumada mientras tanto
+                    db.session.execute(
+                        update(AttachmentBlob)
+                        .where(AttachmentBlob.sha256 == sha256)
+                        .values(ref_count=_references(AttachmentBlob.sha256))
+                    )
+
+        last_sha256 = blobs[-1].sha256
+        yield last_sha256
+
+
+def _delete_orphan_blob(sha256):
+    """
+    Elimina un contenido sin referencias, salvo que una petición lo haya vuelto a usar.
+    El registro se bloquea antes de volver a contar, de modo que una subida concurrente del
+    mismo contenido espera o ya confirmó su anexo.
+    """
+    locked = db.session.execute(
+        select(AttachmentBlob.sha256).where(AttachmentBlob.sha256 == sha256).with_for_update()
+    ).scalar()
+    if locked is None:
+        return
+    references = db.session.execute(
+        select(_references(AttachmentBlob.sha256)).where(AttachmentBlob.sha256 == sha256)
+    ).scalar()
+    if references == 0:
+        delete_blob(sha256)
+
+
+def _iter_blob_folders(position):
+    """
+    Recorre en orden las carpetas blobs/aa/bb del almacén posteriores a position ("aa/bb").
+    """
+    root = os.path.join(UPLOAD_PATH, BLOB_FOLDER)
+    try:
+        first_levels = sorted(entry.name for entry in os.scandir(root) if entry.is_dir())
+    except FileNotFoundError:
+        return
+    for first in first_levels:
+        if position and first < position[:2]:
+            continue
+        try:
+            second_levels = sorted(entry.name for entry in os.scandir(os.path.join(root, first)) if entry.is_dir())
+        except FileNotFoundError:
+            continue
+        for second in second_levels:
+            name = f"{first}/{second}"
+            if position and name <= position:
+                continue
+            yield name, os.path.join(root, first, second)
+
+
+def _check_files(position, counts, report, delete, batch_size, min_age):
+    """
+    Busca archivos del almacén sin registro, copias de un contenido en una codificación distinta
+    de la registrada (por ejemplo, si se interrumpió "flask attachments compress") y temporales
+    abandonados. Avanza por carpeta del almacén (aa/bb).
+    """
+    checked = 0
+    for name, folder in _iter_blob_folders(position):
+        files = {}
+        for entry in os.scandir(folder):
+            if entry.name.endswith(_TEMPORARY_SUFFIXES):
+                if _is_old(entry.path, min_age):
+                    _count(counts, "stale_temporary_file")
+                    report(f"Archivo temporal abandonado {entry.path}")
+                    if delete:
+                        _remove_file(entry.path)
+                continue
+            parsed = parse_blob_file_name(entry.name)
+            if parsed is None:
+                _count(counts, "unknown_file")
+                report(f"Archivo desconocido en el almacén {entry.path}")
+                continue
+            files[entry.path] = parsed
+
+        encodings = dict(db.session.execute(
+            select(AttachmentBlob.sha256, AttachmentBlob.encoding)
+            .where(AttachmentBlob.sha256.in_({sha256 for sha256, _ in files.values()}))
+        ).all()) if files else {}
+
+        for path, (sha256, encoding) in files.items():
+            if sha256 in encodings:
+                if encoding == (encodings[sha256] or ENCODING_IDENTITY) or not _is_old(path, min_age):
+                    continue
+                _count(counts, "stale_blob_copy")
+                report(f"Copia sobrante de un contenido comprimido {path}")
+                if delete:
+                    _remove_file(path)
+            elif _is_old(path, min_age):
+                _count(counts, "orphan_file")
+                report(f"Archivo sin registro en el almacén {path}")
+                if delete:
+                    _delete_orphan_file(sha256, path)
+
+        if delete:
+            _remove_empty_folder(folder, min_age)
+            _remove_empty_folder(os.path.dirname(folder), min_age)
+
+        checked += max(len(files), 1)
+        if checked >= batch_size:
+            checked = 0
+            yield name
+    if checked:
+        yield name
+
+
+def _delete_orphan_file(sha256, path):
+    """
+    Elimina un archivo del almacén sin registro. Se crea un registro provisional y se elimina
+    con delete_blob en la misma transacción: si una subida concurrente ya registró el mismo
+    contenido, la inserción falla y el archivo se conserva.
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.add(AttachmentBlob(sha256=sha256, size=os.path.getsize(path), ref_count=0))
+    except (IntegrityError, FileNotFoundError):
+        return
+    delete_blob(sha256)
+
+
+def _remove_empty_folder(folder, min_age):
+    try:
+        if not os.listdir(folder) and _is_old(folder, min_age):
+            os.rmdir(folder)
+    except OSError:
+        pass
+
+
+def _check_tickets(position, counts, report, delete, batch_size, min_age):
+    """
+    Revisa las carpetas UPLOAD_PATH/<ticket>: carpetas de tickets eliminados, carpetas Anexos_*
+    anteriores al almacén (su contenido está en la base de datos o en el almacén) y miniaturas de
+    anexos eliminados. También elimina los temporales abandonados de UPLOAD_PATH/.tmp.
+    Avanza por ID de ticket.
+    """
+    _check_temporary_uploads(counts, report, delete, min_age)
+
+    try:
+        ticket_ids = sorted(int(entry.name) for entry in os.scandir(UPLOAD_PATH)
+                            if entry.name.isdigit() and entry.is_dir())
+    except FileNotFoundError:
+        return
+    ticket_ids = [ticket_id for ticket_id in ticket_ids if ticket_id > (position or 0)]
+
+    for start in range(0, len(ticket_ids), batch_size):
+        batch = ticket_ids[start:start + batch_size]
+        existing = set(db.session.execute(select(Ticket.id).where(Ticket.id.in_(batch))).scalars())
+        attachments = set(db.session.execute(
+            select(TicketAttachment.ticket_id, TicketAttachment.id).where(TicketAttachment.ticket_id.in_(batch))
+        ).all())
+
+        for ticket_id in batch:
+            folder = os.path.join(UPLOAD_PATH, str(ticket_id))
+            if ticket_id not in existing:
+                _count(counts, "orphan_ticket_folder")
+                report(f"Carpeta de un ticket eliminado {folder}")
+                if delete:
+                    shutil.rmtree(folder, ignore_errors=True)
+                continue
+
+            for legacy_folder in LEGACY_ATTACHMENT_FOLDERS:
+                path = os.path.join(folder, legacy_folder)
+                if os.path.isdir(path):
+                    _count(counts, "legacy_folder")
+                    report(f"Carpeta de anexos anterior al almacén {path}")
+                    if delete:
+                        shutil.rmtree(path, ignore_errors=True)
+
+            thumbnails = os.path.join(folder, THUMBNAIL_FOLDER)
+            if os.path.isdir(thumbnails):
+                for entry in os.scandir(thumbnails):
+                    attachment_id = entry.name.split("-", 1)[0]
+                    if attachment_id.isdigit() and (ticket_id, int(attachment_id)) in attachments:
+                        continue
+                    _count(counts, "orphan_thumbnail")
+                    report(f"Miniatura de un anexo eliminado {entry.path}")
+                    if delete:
+                        _remove_file(entry.path)
+                if delete:
+                    _remove_empty_folder(thumbnails, 0)
+            if delete:
+                _remove_empty_folder(folder, min_age)
+
+        yield batch[-1]
+
+
+def _check_temporary_uploads(counts, report, delete, min_age):
+    """
+    Busca archivos de UPLOAD_PATH/.tmp que quedaron de peticiones interrumpidas.
+    """
+    folder = os.path.join(UPLOAD_PATH, UPLOAD_TEMP_FOLDER)
+    if not os.path.isdir(folder):
+        return
+    for entry in os.scandir(folder):
+        if _is_old(entry.path, min_age):
+            _count(counts, "stale_temporary_file")
+            report(f"Archivo temporal abandonado {entry.path}")
+            if delete:
+                _remove_file(entry.path)
+
+
+_PHASES = {
+    "attachments": _check_attachments,
+    "blobs": _check_blobs,
+    "files": _check_files,
+    "tickets": _check_tickets,
+}
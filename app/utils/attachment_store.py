@@ -0,0 +1,654 @@
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import uuid
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.attachment_blob_model import AttachmentBlob
+from app.utils.atomic_file import atomic_open, atomic_write, fsync_directory
+
+
+load_dotenv()  # Cargar variables de entorno
+
+UPLOAD_PATH = os.getenv('UPLOAD_PATH')
+
+# Carpeta de UPLOAD_PATH donde se guardan los contenidos, con su SHA-256 como nombre
+BLOB_FOLDER = "blobs"
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Sincronizar con el disco cada contenido nuevo antes de confirmar la transacción
+# (más lento, pero el archivo sobrevive a un corte de energía)
+ATTACHMENT_FSYNC = os.getenv('ATTACHMENT_FSYNC', 'False') == 'True'
+
+# Compresión de los contenidos en disco: "zstd" (si está instalado zstandard; si no, gzip),
+# "gzip" o "none". Solo se comprimen los tipos de COMPRESSIBLE_TYPES.
+ATTACHMENT_COMPRESSION = os.getenv('ATTACHMENT_COMPRESSION', 'zstd')
+# Los contenidos más pequeños se guardan sin comprimir
+ATTACHMENT_COMPRESSION_MIN_SIZE = int(os.getenv('ATTACHMENT_COMPRESSION_MIN_SIZE', 4096))
+ZSTD_LEVEL = 3
+GZIP_LEVEL = 6
+# Un contenido se guarda comprimido solo si ocupa como máximo esta fracción del original
+_MAX_COMPRESSION_RATIO = 0.9
+
+# Codificaciones de los contenidos en disco y la extensión de su archivo en el almacén
+ENCODING_IDENTITY = "identity"
+ENCODING_ZSTD = "zstd"
+ENCODING_GZIP = "gzip"
+_ENCODING_SUFFIXES = {ENCODING_IDENTITY: "", ENCODING_ZSTD: ".zst", ENCODING_GZIP: ".gz"}
+
+# Tipos de anexo que se comprimen bien: texto, registros, CSV, JSON/XML y documentos de
+# Office anteriores a OOXML (los .docx/.xlsx ya son ZIP, como las imágenes, PDF y videos)
+COMPRESSIBLE_TYPE_PREFIXES = ("text/",)
+COMPRESSIBLE_TYPE_SUFFIXES = ("+xml", "+json")
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/x-ndjson", "application/xml", "application/javascript",
+    "application/sql", "application/x-sh", "application/yaml", "application/x-yaml",
+    "application/rtf", "application/msword", "application/vnd.ms-excel",
+    "application/vnd.ms-powerpoint", "application/vnd.ms-outlook", "application/x-tar",
+    "image/bmp", "image/x-ms-bmp"
+}
+
+# Claves de session.info con los archivos a confirmar o revertir al terminar la transacción
+_CREATED_KEY = "attachment_store_created"
+_TRASHED_KEY = "attachment_store_trashed"
+_MOVED_KEY = "attachment_store_moved"
+_DISCARDED_KEY = "attachment_store_discarded"
+_FINISHED_KEY = "attachment_store_finished"
+
+
+def blob_path(sha256, encoding=ENCODING_IDENTITY):
+    """
+    Devuelve la ruta en disco de un contenido del almacén.
+    Los archivos se reparten en subcarpetas por los primeros caracteres del hash
+    para no acumular miles de archivos en una sola carpeta. Los contenidos comprimidos
+    llevan la extensión de su codificación (.zst o .gz).
+    Args:
+        sha256 (str): El SHA-256 del contenido, en hexadecimal.
+        encoding (str, opcional): La codificación del archivo.
+    Returns:
+        str: La ruta del archivo.
+    """
+    return os.path.join(UPLOAD_PATH, BLOB_FOLDER, sha256[:2], sha256[2:4], sha256 + _ENCODING_SUFFIXES[encoding])
+
+
+def parse_blob_file_name(name):
+    """
+    Obtiene el contenido y la codificación de un archivo del almacén a partir de su nombre.
+    Args:
+        name (str): El nombre del archivo, por ejemplo "<sha256>.zst".
+    Returns:
+        tuple o None: (sha256, codificación), o None si no es un archivo del almacén.
+    """
+    sha256, extension = os.path.splitext(name)
+    for encoding, suffix in _ENCODING_SUFFIXES.items():
+        if extension == suffix and len(sha256) == 64 and all(c in "0123456789abcdef" for c in sha256):
+            return sha256, encoding
+    return None
+
+
+def find_blob(sha256):
+    """
+    Busca el archivo de un contenido en el almacén, sin comprimir o comprimido.
+    Args:
+        sha256 (str o None): El SHA-256 del contenido.
+    Returns:
+        tuple o None: (ruta, codificación) del archivo, o None si no está en el almacén.
+    """
+    if not sha256:
+        return None
+    for encoding in _ENCODING_SUFFIXES:
+        path = blob_path(sha256, encoding)
+        if os.path.exists(path):
+            return path, encoding
+    return None
+
+
+def blob_exists(sha256):
+    """
+    Indica si el contenido está guardado en el almacén.
+    Args:
+        sha256 (str o None): El SHA-256 del contenido.
+    Returns:
+        bool: True si existe el archivo del contenido.
+    """
+    return find_blob(sha256) is not None
+
+
+def is_compressible(file_type):
+    """
+    Indica si los anexos de un tipo MIME se guardan comprimidos.
+    Args:
+        file_type (str o None): El tipo MIME del anexo.
+    Returns:
+        bool: True si el tipo está en COMPRESSIBLE_TYPES.
+    """
+    file_type = (file_type or "").split(";")[0].strip().lower()
+    return (file_type in COMPRESSIBLE_TYPES or file_type.startswith(COMPRESSIBLE_TYPE_PREFIXES)
+            or file_type.endswith(COMPRESSIBLE_TYPE_SUFFIXES))
+
+
+def _compression_encoding(file_type, size):
+    """
+    Elige la codificación con que se guarda un contenido nuevo.
+    """
+    if ATTACHMENT_COMPRESSION == 'none' or size < ATTACHMENT_COMPRESSION_MIN_SIZE or not is_compressible(file_type):
+        return ENCODING_IDENTITY
+    if ATTACHMENT_COMPRESSION == 'zstd':
+        try:
+            import zstandard  # noqa: F401
+            return ENCODING_ZSTD
+        except ImportError:
+            pass
+    return ENCODING_GZIP
+
+
+def _write_compressed(source, sha256, size, encoding):
+    """
+    Comprime un contenido en el almacén, leyéndolo por fragmentos.
+    Si la compresión no ahorra lo suficiente, el archivo comprimido se elimina.
+    Args:
+        source: Un archivo binario con el contenido.
+        sha256 (str): El SHA-256 del contenido.
+        size (int): El tamaño del contenido en bytes.
+        encoding (str): ENCODING_ZSTD o ENCODING_GZIP.
+    Returns:
+        tuple o None: (ruta, tamaño comprimido) del archivo, o None si no se guardó comprimido.
+    """
+    path = blob_path(sha256, encoding)
+    with atomic_open(path, fsync=ATTACHMENT_FSYNC) as f:
+        if encoding == ENCODING_ZSTD:
+            import zstandard
+            zstandard.ZstdCompressor(level=ZSTD_LEVEL).copy_stream(source, f, size=size)
+        else:
+            # mtime=0 para que el mismo contenido produzca siempre el mismo archivo
+            with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=GZIP_LEVEL, mtime=0) as compressed:
+                shutil.copyfileobj(source, compressed, READ_CHUNK_SIZE)
+
+    stored_size = os.path.getsize(path)
+    if stored_size > size * _MAX_COMPRESSION_RATIO:
+        os.remove(path)
+        return None
+    return path, stored_size
+
+
+def _set_blob_storage(sha256, encoding, stored_size):
+    """
+    Registra cómo quedó guardado un contenido en disco.
+    Returns:
+        bool: False si el contenido ya no tiene registro (se liberó mientras tanto).
+    """
+    return bool(db.session.execute(
+        update(AttachmentBlob)
+        .where(AttachmentBlob.sha256 == sha256)
+        .values(encoding=encoding, stored_size=stored_size)
+    ).rowcount)
+
+
+def acquire_blob(sha256, size):
+    """
+    Suma una referencia al contenido, creando su registro si no existe, en la transacción actual.
+    El UPDATE bloquea el registro hasta el fin de la transacción, de modo que una eliminación
+    concurrente del mismo contenido espera o ya terminó cuando se verifica el archivo.
+    Args:
+        sha256 (str): El SHA-256 del contenido.
+        size (int): El tamaño del contenido en bytes.
+    """
+    statement = (
+        update(AttachmentBlob)
+        .where(AttachmentBlob.sha256 == sha256)
+        .values(ref_count=AttachmentBlob.ref_count + 1)
+    )
+    if db.session.execute(statement).rowcount:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(AttachmentBlob(sha256=sha256, size=size, ref_count=1))
+    except IntegrityError:
+        db.session.execute(statement)
+
+
+def store_blob(content, file_type=None):
+    """
+    Guarda un contenido en el almacén y le suma una referencia.
+    Si el mismo contenido ya existe (por ejemplo, la misma captura adjunta a varios tickets),
+    no se vuelve a escribir en disco. Si la transacción se revierte, el archivo recién
+    escrito se elimina, salvo que otra transacción ya lo referencie (ver _revert_blob_changes).
+    Los contenidos de tipos comprimibles se guardan comprimidos.
+    Args:
+        content (bytes): El contenido del anexo.
+        file_type (str, opcional): El tipo MIME del anexo.
+    Returns:
+        tuple: (sha256, size) del contenido.
+    """
+    sha256 = hashlib.sha256(content).hexdigest()
+    acquire_blob(sha256, len(content))
+
+    if find_blob(sha256) is None:
+        encoding = _compression_encoding(file_type, len(content))
+        compressed = None
+        if encoding != ENCODING_IDENTITY:
+            compressed = _write_compressed(io.BytesIO(content), sha256, len(content), encoding)
+        if compressed:
+            path, stored_size = compressed
+        else:
+            encoding, path, stored_size = ENCODING_IDENTITY, blob_path(sha256), len(content)
+            atomic_write(path, content, fsync=ATTACHMENT_FSYNC)
+        db.session.info.setdefault(_CREATED_KEY, []).append(path)
+        _set_blob_storage(sha256, encoding, stored_size)
+    return sha256, len(content)
+
+
+def store_file(temp_path, sha256, size, restore_on_rollback=False, file_type=None):
+    """
+    Guarda en el almacén un contenido ya escrito en un archivo temporal y le suma una referencia.
+    El archivo se mueve al almacén sin copiarlo, por lo que debe estar en el mismo sistema de
+    archivos que UPLOAD_PATH. Si el contenido ya existía, el archivo temporal se elimina.
+    Los contenidos de tipos comprimibles se comprimen en el almacén y el temporal se elimina.
+    Args:
+        temp_path (str): La ruta del archivo temporal, ya cerrado.
+        sha256 (str): El SHA-256 del contenido.
+        size (int): El tamaño del contenido en bytes.
+        restore_on_rollback (bool, opcional): Si es True, al revertir la transacción el archivo
+            vuelve a temp_path en lugar de eliminarse, y si el contenido ya existía temp_path
+            se elimina solo al confirmarla.
+        file_type (str, opcional): El tipo MIME del anexo.
+    Returns:
+        tuple: (sha256, size) del contenido.
+    """
+    acquire_blob(sha256, size)
+
+    if find_blob(sha256) is not None:
+        if restore_on_rollback:
+            discard_on_commit(temp_path)
+        else:
+            os.remove(temp_path)
+        return sha256, size
+
+    encoding = _compression_encoding(file_type, size)
+    compressed = None
+    if encoding != ENCODING_IDENTITY:
+        with open(temp_path, 'rb') as source:
+            compressed = _write_compressed(source, sha256, size, encoding)
+
+    if compressed:
+        path, stored_size = compressed
+        db.session.info.setdefault(_CREATED_KEY, []).append(path)
+        if restore_on_rollback:
+            discard_on_commit(temp_path)
+        else:
+            os.remove(temp_path)
+    else:
+        encoding, path, stored_size = ENCODING_IDENTITY, blob_path(sha256), size
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        if ATTACHMENT_FSYNC:
+            fsync_directory(os.path.dirname(path))
+        if restore_on_rollback:
+            db.session.info.setdefault(_MOVED_KEY, []).append((path, temp_path))
+        else:
+            db.session.info.setdefault(_CREATED_KEY, []).append(path)
+    _set_blob_storage(sha256, encoding, stored_size)
+    return sha256, size
+
+
+def compress_blob(sha256, size, file_type):
+    """
+    Comprime un contenido guardado sin comprimir antes de existir la compresión, en la
+    transacción actual, y registra su codificación y su tamaño en disco.
+    El archivo sin comprimir se elimina al confirmar la transacción; si se revierte, se
+    elimina el comprimido.
+    Args:
+        sha256 (str): El SHA-256 del contenido.
+        size (int): El tamaño del contenido en bytes.
+        file_type (str o None): El tipo MIME de los anexos que lo referencian.
+    Returns:
+        tuple o None: (codificación, tamaño en disco), o None si el archivo no está en el almacén.
+    """
+    found = find_blob(sha256)
+    if found is None:
+        return None
+    path, encoding = found
+    stored_size = os.path.getsize(path)
+
+    if encoding == ENCODING_IDENTITY:
+        new_encoding = _compression_encoding(file_type, size)
+        compressed = None
+        if new_encoding != ENCODING_IDENTITY:
+            with open(path, 'rb') as source:
+                compressed = _write_compressed(source, sha256, size, new_encoding)
+        if compressed:
+            compressed_path, compressed_size = compressed
+            db.session.info.setdefault(_CREATED_KEY, []).append(compressed_path)
+            if not _set_blob_storage(sha256, new_encoding, compressed_size):
+                return None
+            discard_on_commit(path)
+            return new_encoding, compressed_size
+
+    _set_blob_storage(sha256, encoding, stored_size)
+    return encoding, stored_size
+
+
+def discard_on_commit(path):
+    """
+    Programa la eliminación de un archivo para cuando se confirme la transacción actual.
+    Si la transacción se revierte, el archivo se conserva.
+    Args:
+        path (str): La ruta del archivo.
+    """
+    db.session.info.setdefault(_DISCARDED_KEY, []).append(path)
+
+
+def remove_when_finished(path):
+    """
+    Programa la eliminación de un archivo para cuando termine la transacción actual, se
+    confirme o se revierta; al revertirla, después de restaurar los archivos movidos.
+    Args:
+        path (str): La ruta del archivo.
+    """
+    db.session.info.setdefault(_FINISHED_KEY, []).append(path)
+
+
+def release_blob(sha256):
+    """
+    Resta una referencia al contenido, en la transacción actual.
+    Cuando ya nadie lo referencia se elimina (ver delete_blob).
+    Args:
+        sha256 (str): El SHA-256 del contenido.
+    """
+    db.session.execute(
+        update(AttachmentBlob)
+        .where(AttachmentBlob.sha256 == sha256)
+        .values(ref_count=AttachmentBlob.ref_count - 1)
+    )
+    ref_count = db.session.execute(
+        select(AttachmentBlob.ref_count).where(AttachmentBlob.sha256 == sha256)
+    ).scalar()
+    if ref_count is None or ref_count > 0:
+        return
+    delete_blob(sha256)
+
+
+def delete_blob(sha256):
+    """
+    Elimina el registro de un contenido en la transacción actual y aparta su archivo con un
+    nombre temporal; se borra definitivamente al confirmar la transacción o se restaura si se revierte.
+    Args:
+        sha256 (str): El SHA-256 del contenido.
+    """
+    db.session.execute(delete(AttachmentBlob).where(AttachmentBlob.sha256 == sha256))
+    found = find_blob(sha256)
+    if found is not None:
+        path = found[0]
+        trash_path = f"{path}.{uuid.uuid4().hex}.trash"
+        os.replace(path, trash_path)
+        db.session.info.setdefault(_TRASHED_KEY, []).append((path, trash_path))
+
+
+def open_blob(sha256):
+    """
+    Abre un contenido del almacén para leerlo. Los contenidos comprimidos se descomprimen
+    a medida que se leen, sin cargarlos completos en memoria.
+    El archivo devuelto permite seek hacia adelante; los comprimidos con zstd no permiten
+    volver hacia atrás (seekable() es False).
+    Args:
+        sha256 (str): El SHA-256 del contenido.
+    Returns:
+        file o None: El archivo binario, o None si el contenido no está en el almacén.
+    """
+    found = find_blob(sha256)
+    if found is None:
+        return None
+    path, encoding = found
+    if encoding == ENCODING_ZSTD:
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    if encoding == ENCODING_GZIP:
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def iter_blob(sha256, chunk_size=READ_CHUNK_SIZE):
+    """
+    Lee un contenido del almacén por fragmentos.
+    Args:
+        sha256 (str): El SHA-256 del contenido.
+        chunk_size (int, opcional): Tamaño de cada fragmento en bytes.
+    Yields:
+        bytes: Fragmentos del contenido.
+    """
+    with open_blob(sha256) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def read_blob(sha256):
+    """
+    Lee un contenido completo del almacén.
+    Args:
+        sha256 (str): El SHA-256 del contenido.
+    Returns:
+        bytes: El contenido.
+    """
+    with open_blob(sha256) as f:
+        return f.read()
+
+
+def read_attachment_content(attachment):
+    """
+    Devuelve el contenido de un anexo, desde el almacén o, para los anexos guardados
+    antes de existir el almacén, desde la columna file_content.
+    Args:
+        attachment (TicketAttachment): El anexo.
+    Returns:
+        bytes: El contenido del anexo.
+    """
+    if blob_exists(attachment.sha256):
+        return read_blob(attachment.sha256)
+    return attachment.file_content
+
+
+class DatabaseContentReader(io.RawIOBase):
+    """
+    Archivo de solo lectura sobre la columna file_content de un anexo guardado antes de existir
+    el almacén. Lee el contenido por bloques con substr(), de modo que una descarga (o un rango
+    de ella) no carga el anexo completo en memoria.
+    Usa su propia conexión, abierta en la primera lectura, porque la respuesta se envía después
+    de cerrarse la sesión de la petición. La conexión se libera al cerrar el archivo.
+    Args:
+        attachment (TicketAttachment): El anexo.
+        size (int): El tamaño del contenido en bytes.
+    """
+
+    def __init__(self, attachment, size):
+        super().__init__()
+        table = type(attachment).__table__
+        self._statement_args = (table.c.file_content, table.c.id == attachment.id)
+        self._engine = db.engine
+        self._connection = None
+        self._size = size
+        self._position = 0
+        self._block = b''
+        self._block_start = 0
+
+    def __len__(self):
+        return self._size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError("Posición negativa")
+        self._position = offset
+        return self._position
+
+    def _read_block(self, start):
+        """
+        Lee de la base de datos el bloque de READ_CHUNK_SIZE bytes que empieza en start.
+        """
+        if self._connection is None:
+            self._connection = self._engine.connect()
+        column, condition = self._statement_args
+        self._block = self._connection.execute(
+            select(func.substr(column, start + 1, READ_CHUNK_SIZE)).where(condition)
+        ).scalar() or b''
+        self._block_start = start
+
+    def readinto(self, buffer):
+        if self._position >= self._size:
+            return 0
+        offset = self._position - self._block_start
+        if not 0 <= offset < len(self._block):
+            self._read_block(self._position)
+            offset = 0
+        chunk = self._block[offset:offset + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        super().close()
+
+
+def open_database_content(attachment):
+    """
+    Abre el contenido de un anexo guardado en la columna file_content para leerlo por bloques.
+    Args:
+        attachment (TicketAttachment): El anexo.
+    Returns:
+        DatabaseContentReader o None: El archivo, o None si el anexo no tiene contenido.
+    """
+    # length() sobre un BLOB/bytea obtiene el tamaño sin leer el contenido
+    table = type(attachment).__table__
+    size = db.session.execute(
+        select(func.length(table.c.file_content)).where(table.c.id == attachment.id)
+    ).scalar()
+    if size is None:
+        return None
+    return DatabaseContentReader(attachment, size)
+
+
+@event.listens_for(db.session, "after_commit")
+def _finish_blob_changes(session):
+    """
+    Al confirmar la transacción principal, borra los archivos apartados por release_blob
+    y los programados con discard_on_commit y remove_when_finished.
+    """
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_CREATED_KEY, None)
+    session.info.pop(_MOVED_KEY, None)
+    trashed = [trash_path for _, trash_path in session.info.pop(_TRASHED_KEY, [])]
+    for path in trashed + session.info.pop(_DISCARDED_KEY, []) + session.info.pop(_FINISHED_KEY, []):
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"No se pudo eliminar el archivo {path}: {e}")
+
+
+def _unless_referenced(path, action):
+    """
+    Ejecuta action() sobre un archivo escrito en el almacén por una transacción revertida,
+    salvo que un registro confirmado referencie su contenido.
+    Mientras la transacción revertida tenía el archivo, otra pudo haber agregado el mismo
+    contenido, encontrado el archivo sin volver a escribirlo y confirmado su registro. Para
+    verificarlo se bloquea el registro del contenido en una transacción aparte, o se inserta
+    si no existe: si otra transacción lo está creando, la inserción espera a que termine.
+    Mientras dura la verificación, ninguna otra puede registrar el contenido; al final se revierte.
+    Args:
+        path (str): La ruta del archivo en el almacén.
+        action (callable): Elimina o mueve el archivo.
+    Returns:
+        bool: True si se ejecutó action().
+    """
+    parsed = parse_blob_file_name(os.path.basename(path))
+    if parsed is None:
+        action()
+        return True
+    sha256 = parsed[0]
+    table = AttachmentBlob.__table__
+    with db.engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            # El UPDATE bloquea el registro si existe (como acquire_blob)
+            locked = conn.execute(
+                update(table).where(table.c.sha256 == sha256).values(ref_count=table.c.ref_count)
+            ).rowcount
+            if not locked:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(insert(table).values(sha256=sha256, size=0, ref_count=0))
+                except IntegrityError:
+                    locked = True  # Otra transacción confirmó el registro mientras tanto
+            referenced = bool(locked) and bool(conn.execute(
+                select(table.c.ref_count).where(table.c.sha256 == sha256)
+            ).scalar())
+            if not referenced:
+                action()
+        finally:
+            transaction.rollback()
+    return not referenced
+
+
+@event.listens_for(db.session, "after_rollback")
+def _revert_blob_changes(session):
+    """
+    Al revertir la transacción principal, restaura los archivos apartados y los movidos
+    al almacén desde otra ubicación, y elimina los archivos escritos en ella. Un archivo
+    escrito o movido que otra transacción ya referencia se conserva (de uno movido se
+    restaura una copia); si no se puede verificar, también se conserva y lo elimina
+    después "flask attachments reconcile". Por último, elimina los programados con
+    remove_when_finished.
+    """
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_DISCARDED_KEY, None)
+    for path, trash_path in session.info.pop(_TRASHED_KEY, []):
+        try:
+            os.replace(trash_path, path)
+        except OSError as e:
+            print(f"No se pudo restaurar el archivo {path}: {e}")
+    for path, source_path in session.info.pop(_MOVED_KEY, []):
+        try:
+            if not _unless_referenced(path, lambda: os.replace(path, source_path)):
+                shutil.copyfile(path, source_path)
+        except Exception as e:
+            print(f"No se pudo restaurar el archivo {source_path}: {e}")
+    for path in session.info.pop(_CREATED_KEY, []):
+        try:
+            _unless_referenced(path, lambda: _remove_if_exists(path))
+        except Exception as e:
+            print(f"No se pudo verificar el archivo {path}, se conserva: {e}")
+    for path in session.info.pop(_FINISHED_KEY, []):
+        _remove_if_exists(path)
+
+
+def _remove_if_exists(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
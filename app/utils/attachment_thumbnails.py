@@ -0,0 +1,238 @@
+import io
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from app.utils.atomic_file import atomic_open
+from app.utils.attachment_store import READ_CHUNK_SIZE, open_blob, open_database_content
+
+
+load_dotenv()  # Cargar variables de entorno
+
+UPLOAD_PATH = os.getenv('UPLOAD_PATH')
+
+# Carpeta de UPLOAD_PATH/<ticket> donde se guardan las miniaturas de sus anexos
+THUMBNAIL_FOLDER = "thumbs"
+
+# Tamaños permitidos (lado mayor en píxeles), para no generar una miniatura por cada tamaño pedido
+THUMBNAIL_SIZES = tuple(int(size) for size in os.getenv('THUMBNAIL_SIZES', '128,256,512').split(','))
+DEFAULT_THUMBNAIL_SIZE = 256 if 256 in THUMBNAIL_SIZES else THUMBNAIL_SIZES[0]
+
+# Tamaño máximo en bytes de todas las miniaturas; al superarlo se eliminan las menos usadas
+THUMBNAIL_CACHE_MAX_SIZE = int(os.getenv('THUMBNAIL_CACHE_MAX_SIZE', 256 * 1024 * 1024))
+# Segundos mínimos entre dos revisiones del tamaño de la caché. La revisión se hace en un hilo
+# aparte, fuera de las peticiones; también puede ejecutarse con "flask attachments evict-thumbnails".
+THUMBNAIL_EVICTION_INTERVAL = int(os.getenv('THUMBNAIL_EVICTION_INTERVAL', 300))
+
+THUMBNAIL_QUALITY = 80
+
+# Formatos de miniatura: extensión y tipo MIME
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+# Al usar una miniatura se actualiza su fecha de modificación, que marca el orden LRU.
+# Solo se actualiza si pasó este tiempo, para no escribir en disco en cada petición.
+_TOUCH_INTERVAL = 600
+
+_eviction_lock = threading.Lock()
+# La primera revisión de cada proceso espera THUMBNAIL_EVICTION_INTERVAL desde su inicio
+_eviction_state = {"written": 0, "checked_at": time.monotonic(), "thread": None}
+
+
+class ThumbnailError(ValueError):
+    """
+    Error al generar una miniatura, con el código HTTP que se debe responder.
+    """
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def thumbnail_path(attachment, size, image_format):
+    """
+    Devuelve la ruta de la miniatura de un anexo: UPLOAD_PATH/<ticket>/thumbs/<anexo>-<tamaño>.<formato>.
+    Al estar dentro de la carpeta del ticket, se elimina junto con el ticket y sus anexos.
+    Args:
+        attachment (TicketAttachment): El anexo.
+        size (int): El lado mayor de la miniatura en píxeles.
+        image_format (str): "webp" o "jpeg".
+    Returns:
+        str: La ruta del archivo.
+    """
+    return os.path.join(UPLOAD_PATH, str(attachment.ticket_id), THUMBNAIL_FOLDER,
+                        f"{attachment.id}-{size}.{image_format}")
+
+
+def get_thumbnail(attachment, size=DEFAULT_THUMBNAIL_SIZE, image_format="webp"):
+    """
+    Devuelve la miniatura de un anexo de imagen, generándola la primera vez que se pide.
+    El contenido de un anexo no cambia, por lo que la miniatura guardada es válida mientras
+    exista el anexo.
+    Args:
+        attachment (TicketAttachment): El anexo.
+        size (int, opcional): El lado mayor de la miniatura en píxeles; debe estar en THUMBNAIL_SIZES.
+        image_format (str, opcional): "webp" o "jpeg".
+    Returns:
+        str: La ruta de la miniatura.
+    Raises:
+        ThumbnailError: Si el tamaño o el formato no son válidos (400), el anexo no es una
+            imagen (415) o no tiene contenido (404).
+    """
+    if size not in THUMBNAIL_SIZES:
+        raise ThumbnailError(f"Tamaño no válido; los permitidos son {', '.join(map(str, THUMBNAIL_SIZES))}")
+    if image_format not in THUMBNAIL_FORMATS:
+        raise ThumbnailError(f"Formato no válido; los permitidos son {', '.join(THUMBNAIL_FORMATS)}")
+    if not (attachment.file_type or "").lower().startswith("image/"):
+        raise ThumbnailError("El anexo no es una imagen", 415)
+
+    path = thumbnail_path(attachment, size, image_format)
+    try:
+        if time.time() - os.path.getmtime(path) > _TOUCH_INTERVAL:
+            os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+
+    source = open_blob(attachment.sha256)
+    if source is not None and not source.seekable():
+        # Pillow necesita volver al inicio del archivo, lo que no permite un contenido
+        # descomprimido con zstd
+        with source:
+            source = io.BytesIO(source.read())
+    elif source is None:
+        source = open_database_content(attachment)
+        if source is None:
+            raise ThumbnailError("Attachment content not found", 404)
+        # Pillow lee por bloques pequeños; el buffer evita una consulta por cada lectura
+        source = io.BufferedReader(source, READ_CHUNK_SIZE)
+
+    with source:
+        _write_thumbnail(source, path, size, image_format)
+    _evict_if_needed(os.path.getsize(path))
+    return path
+
+
+def _write_thumbnail(source, path, size, image_format):
+    """
+    Redimensiona la imagen y guarda la miniatura de forma atómica, para que una petición
+    concurrente nunca lea una miniatura a medio escribir.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(source) as image:
+            # En JPEG, decodificar directamente a una escala reducida es mucho más rápido
+            image.draft("RGB", (size, size))
+            # Respetar la orientación de las fotos tomadas con el celular
+            thumbnail = ImageOps.exif_transpose(image)
+            thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as e:
+        print(f"Error generando miniatura {path}: {str(e)}")
+        raise ThumbnailError("No se pudo leer la imagen del anexo", 415)
+
+    pil_format, _ = THUMBNAIL_FORMATS[image_format]
+    has_alpha = thumbnail.mode in ("RGBA", "LA", "PA") or (
+        thumbnail.mode == "P" and "transparency" in thumbnail.info
+    )
+    if has_alpha and pil_format == "WEBP":
+        thumbnail = thumbnail.convert("RGBA")
+    elif has_alpha:
+        # JPEG no admite transparencia: se pone sobre fondo blanco
+        rgba = thumbnail.convert("RGBA")
+        thumbnail = Image.new("RGB", rgba.size, (255, 255, 255))
+        thumbnail.paste(rgba, mask=rgba.getchannel("A"))
+    elif thumbnail.mode != "RGB":
+        thumbnail = thumbnail.convert("RGB")
+
+    with atomic_open(path) as f:
+        if pil_format == "WEBP":
+            thumbnail.save(f, format=pil_format, quality=THUMBNAIL_QUALITY, method=4)
+        else:
+            thumbnail.save(f, format=pil_format, quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+
+
+def _evict_if_needed(written):
+    """
+    Suma los bytes escritos y, cuando se escribió una décima parte de THUMBNAIL_CACHE_MAX_SIZE
+    o pasó THUMBNAIL_EVICTION_INTERVAL desde la última revisión, revisa el tamaño de la caché
+    en un hilo aparte, para no recorrer las carpetas de miniaturas dentro de la petición.
+    """
+    with _eviction_lock:
+        _eviction_state["written"] += written
+        now = time.monotonic()
+        if (_eviction_state["written"] < THUMBNAIL_CACHE_MAX_SIZE // 10
+                and now - _eviction_state["checked_at"] < THUMBNAIL_EVICTION_INTERVAL):
+            return
+        thread = _eviction_state["thread"]
+        if thread is not None and thread.is_alive():
+            return  # Ya hay una revisión en curso
+        _eviction_state["written"] = 0
+        _eviction_state["checked_at"] = now
+        thread = threading.Thread(target=_run_eviction, name="thumbnail-eviction", daemon=True)
+        _eviction_state["thread"] = thread
+        thread.start()
+
+
+def _run_eviction():
+    try:
+        evict_thumbnails()
+    except Exception as e:
+        print(f"Error revisando la caché de miniaturas: {str(e)}")
+
+
+def _iter_thumbnail_folders():
+    """
+    Recorre las carpetas de miniaturas de todos los tickets (UPLOAD_PATH/<ticket>/thumbs).
+    """
+    try:
+        entries = list(os.scandir(UPLOAD_PATH))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.name.isdigit() and entry.is_dir():
+            folder = os.path.join(entry.path, THUMBNAIL_FOLDER)
+            if os.path.isdir(folder):
+                yield folder
+
+
+def evict_thumbnails(max_size=THUMBNAIL_CACHE_MAX_SIZE):
+    """
+    Elimina las miniaturas usadas hace más tiempo hasta que la caché ocupe como máximo el 90 %
+    de max_size, si lo supera. Deja margen para no volver a eliminar con la siguiente miniatura.
+    Args:
+        max_size (int, opcional): El tamaño máximo de la caché en bytes.
+    Returns:
+        int: El número de miniaturas eliminadas.
+    """
+    thumbnails = []
+    total_size = 0
+    for folder in _iter_thumbnail_folders():
+        for entry in os.scandir(folder):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            thumbnails.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+    if total_size <= max_size:
+        return 0
+
+    removed = 0
+    target_size = max_size * 9 // 10
+    for _, file_size, path in sorted(thumbnails):
+        if total_size <= target_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= file_size
+        removed += 1
+    print(f"Miniaturas eliminadas de la caché: {removed}")
+    return removed
@@ -0,0 +1,357 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from flask import Request, after_this_request, current_app, request
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+
+from app.utils.attachment_store import ATTACHMENT_FSYNC, UPLOAD_PATH, store_blob, store_file
+from app.utils.json_stream import JSONStreamError, StreamingJSONParser
+from app.utils.upload_sessions import store_upload_session
+
+
+load_dotenv()  # Cargar variables de entorno
+
+# Tamaño máximo de cada anexo
+MAX_ATTACHMENT_SIZE = 10 * 1024 * 1024  # 10 MB
+
+# Carpeta de UPLOAD_PATH donde se reciben los anexos enviados como multipart/form-data.
+# Está en el mismo sistema de archivos que el almacén para poder mover los archivos sin copiarlos.
+UPLOAD_TEMP_FOLDER = ".tmp"
+
+# Campo del formulario multipart con los archivos adjuntos (puede repetirse)
+ATTACHMENTS_FIELD = "attachments"
+
+# Hilos que decodifican y escriben en disco los anexos base64. El grupo es compartido por
+# todas las peticiones, de modo que limita el trabajo simultáneo del proceso.
+ATTACHMENT_WORKERS = int(os.getenv('ATTACHMENT_WORKERS', 4))
+
+_executor = ThreadPoolExecutor(max_workers=ATTACHMENT_WORKERS, thread_name_prefix="attachments")
+
+# Cuerpos JSON a partir de este tamaño se leen por fragmentos y sus anexos base64 se decodifican
+# directamente a disco; los más pequeños se leen completos con request.json
+STREAMING_JSON_MIN_SIZE = 1024 * 1024
+
+# Caracteres que no pertenecen al alfabeto base64 (b64decode también los descarta)
+_NON_BASE64 = re.compile(rb"[^A-Za-z0-9+/=]")
+
+# Longitud máxima del prefijo "data:<tipo>;base64," de un anexo
+_DATA_URL_PREFIX_MAX = 256
+
+
+class AttachmentTooLargeError(ValueError):
+    """
+    Error lanzado cuando un anexo supera MAX_ATTACHMENT_SIZE.
+    """
+
+    def __init__(self, file_name):
+        super().__init__(f"Archivo {file_name} excede el tamaño máximo de 10MB")
+
+
+class UploadedFile:
+    """
+    Archivo temporal en el que se escribe un anexo recibido como multipart/form-data
+    a medida que llega, calculando su SHA-256 y su tamaño sin guardarlo en memoria.
+    Si el anexo supera el tamaño máximo se deja de escribir (el resto de la parte se descarta)
+    y se marca como too_large. El archivo se elimina al cerrarlo si no se movió al almacén.
+    """
+
+    def __init__(self, max_size=MAX_ATTACHMENT_SIZE):
+        directory = os.path.join(UPLOAD_PATH, UPLOAD_TEMP_FOLDER)
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix=".part")
+        self._file = os.fdopen(fd, "w+b")
+        self._hash = hashlib.sha256()
+        self.max_size = max_size
+        self.size = 0
+        self.too_large = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.too_large:
+            return len(data)
+        if self.size > self.max_size:
+            self.too_large = True
+            self._file.truncate(0)
+            return len(data)
+        self._hash.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def store(self, file_type=None):
+        """
+        Mueve el archivo al almacén de anexos y le suma una referencia.
+        Args:
+            file_type (str, opcional): El tipo MIME del anexo, que decide si se guarda comprimido.
+        Returns:
+            tuple: (sha256, size) del contenido.
+        """
+        if ATTACHMENT_FSYNC:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._file.close()
+        return store_file(self.path, self.sha256, self.size, file_type=file_type)
+
+    def close(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        # read, seek, tell, etc. del archivo temporal
+        return getattr(self._file, name)
+
+
+class AttachmentRequest(Request):
+    """
+    Petición que escribe los archivos de un formulario multipart/form-data directamente en
+    UploadedFile, en lugar de guardarlos en memoria o en un temporal del sistema.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadedFile()
+
+
+class Base64FileSink:
+    """
+    Recibe por fragmentos el string base64 de un anexo (ver StreamingJSONParser) y lo decodifica
+    a un UploadedFile, de modo que en memoria solo queda un fragmento a la vez.
+    Como en store_attachment, se descarta el prefijo "data:image/png;base64," si existe.
+    """
+
+    def __init__(self):
+        self._upload = UploadedFile()
+        self._prefix = ""
+        self._prefix_done = False
+        self._pending = b""
+        self._error = None
+
+    def write(self, text):
+        if not self._prefix_done:
+            # Esperar a tener el prefijo completo antes de decodificar
+            self._prefix += text
+            comma = self._prefix.find(",")
+            if comma < 0 and len(self._prefix) <= _DATA_URL_PREFIX_MAX:
+                return
+            text = self._prefix[comma + 1:]
+            self._prefix = ""
+            self._prefix_done = True
+
+        if self._error is not None:
+            return
+        data = self._pending + _NON_BASE64.sub(b"", text.encode("ascii", "ignore"))
+        usable = len(data) - len(data) % 4
+        self._pending = data[usable:]
+        try:
+            self._upload.write(binascii.a2b_base64(data[:usable]))
+        except binascii.Error as e:
+            self._error = e
+
+    def finish(self):
+        """
+        Decodifica lo que falte y devuelve un Future ya resuelto con el UploadedFile, o con el
+        error si el base64 no es válido, igual que los de prepare_attachments.
+        """
+        if not self._prefix_done:
+            self._prefix_done = True
+            prefix, self._prefix = self._prefix, ""
+            self.write(prefix.split(",")[-1])
+
+        future = Future()
+        try:
+            if self._error is not None:
+                raise self._error
+            if self._pending:
+                self._upload.write(base64.b64decode(self._pending))
+            future.set_result(self._upload)
+        except Exception as e:
+            self._upload.close()
+            future.set_exception(e)
+        return future
+
+    def close(self):
+        self._upload.close()
+
+
+def _read_streaming_json():
+    """
+    Lee el cuerpo JSON por fragmentos, decodificando a disco el base64Content de cada anexo.
+    Cada anexo queda con la clave "prepared" en lugar de base64Content. Los archivos temporales
+    que no se muevan al almacén se eliminan al terminar la petición.
+    """
+    sinks = []
+
+    def sink_factory(path):
+        if len(path) == 3 and path[0] == "attachments" and path[2] == "base64Content":
+            sinks.append(Base64FileSink())
+            return sinks[-1]
+        return None
+
+    @after_this_request
+    def close_streamed_attachments(response):
+        for sink in sinks:
+            sink.close()
+        return response
+
+    try:
+        data = StreamingJSONParser(request.stream, sink_factory).parse()
+    except JSONStreamError as e:
+        raise BadRequest(f"JSON no válido: {e}")
+
+    if not isinstance(data, dict):
+        raise BadRequest("Se esperaba un objeto JSON")
+    for attachment in data.get("attachments") or []:
+        if isinstance(attachment, dict) and isinstance(attachment.get("base64Content"), Future):
+            attachment["prepared"] = attachment.pop("base64Content")
+    return data
+
+
+def get_request_data():
+    """
+    Devuelve los datos de la petición, enviados como JSON o como multipart/form-data.
+    Las peticiones que superan MAX_CONTENT_LENGTH se rechazan con 413 antes de leer el cuerpo.
+    Los cuerpos JSON grandes se leen por fragmentos y sus anexos base64 se decodifican a disco a
+    medida que llegan (quedan con la clave "prepared"), de modo que la memoria usada no depende
+    del tamaño de los anexos.
+    En multipart, los campos del ticket son campos del formulario y los anexos son archivos
+    del campo "attachments"; cada anexo queda como {"fileName", "fileType", "file"}, donde
+    file es el UploadedFile ya escrito en disco.
+    Returns:
+        dict: Los datos del ticket, con la lista de anexos en "attachments".
+    Raises:
+        RequestEntityTooLarge: Si el cuerpo supera MAX_CONTENT_LENGTH.
+        BadRequest: Si el JSON no es válido.
+    """
+    max_content_length = current_app.config.get('MAX_CONTENT_LENGTH')
+    if max_content_length and (request.content_length or 0) > max_content_length:
+        raise RequestEntityTooLarge()
+
+    if request.mimetype != "multipart/form-data":
+        if request.is_json and (request.content_length or 0) >= STREAMING_JSON_MIN_SIZE:
+            return _read_streaming_json()
+        return request.json
+
+    data = request.form.to_dict()
+    data["attachments"] = [
+        {
+            "fileName": file.filename,
+            "fileType": file.mimetype or "application/octet-stream",
+            "file": file.stream
+        }
+        for file in request.files.getlist(ATTACHMENTS_FIELD)
+    ]
+    return data
+
+
+def _decode_to_file(base64_content):
+    """
+    Decodifica un anexo base64 y lo escribe en un UploadedFile, calculando su SHA-256.
+    Se ejecuta en los hilos de _executor, sin acceder a la base de datos.
+    """
+    upload = UploadedFile()
+    try:
+        # Extraer base64 real (remover prefijo data:image/png;base64, si existe)
+        upload.write(base64.b64decode(base64_content.split(",")[-1]))
+    except Exception:
+        upload.close()
+        raise
+    return upload
+
+
+def prepare_attachments(attachments):
+    """
+    Inicia en paralelo la decodificación, validación de tamaño, cálculo del SHA-256 y escritura
+    en disco de los anexos base64 de la petición. Cada anexo queda con la clave "prepared"
+    (un Future con el UploadedFile), que store_attachment espera y mueve al almacén.
+    El trabajo con la base de datos se hace después en store_attachment, en el hilo de la
+    petición, para que la sesión de SQLAlchemy no se comparta entre hilos.
+    Los archivos temporales que no lleguen al almacén se eliminan al terminar la petición.
+    Args:
+        attachments (list): Los anexos de la petición.
+    """
+    futures = []
+    for attachment in attachments:
+        if attachment.get("uploadId") or attachment.get("file") is not None:
+            continue
+        if not attachment.get("base64Content"):
+            continue
+        attachment["prepared"] = _executor.submit(_decode_to_file, attachment["base64Content"])
+        futures.append(attachment["prepared"])
+
+    if not futures:
+        return
+
+    @after_this_request
+    def close_prepared_attachments(response):
+        for future in futures:
+            try:
+                future.result().close()
+            except Exception:
+                pass
+        return response
+
+
+def has_attachment_content(attachment):
+    """
+    Indica si un anexo de la petición trae contenido.
+    Args:
+        attachment (dict): El anexo, con base64Content (JSON), prepared (base64 ya decodificado),
+            file (multipart) o uploadId (sesión de subida).
+    Returns:
+        bool: True si el anexo no está vacío.
+    """
+    if attachment.get("uploadId"):
+        return True
+    prepared = attachment.get("prepared")
+    if prepared is not None:
+        # Los errores de decodificación se informan en store_attachment
+        return prepared.exception() is not None or prepared.result().size > 0
+    if attachment.get("file") is not None:
+        return attachment["file"].size > 0
+    return bool(attachment.get("base64Content"))
+
+
+def store_attachment(attachment):
+    """
+    Guarda el contenido de un anexo de la petición en el almacén de anexos.
+    Los anexos subidos por sesiones no tienen el límite de MAX_ATTACHMENT_SIZE, sino el de
+    la sesión; si no traen fileName o fileType se toman los de la sesión.
+    Args:
+        attachment (dict): El anexo, con base64Content (JSON), file (multipart) o uploadId
+            (sesión de subida completada).
+    Returns:
+        tuple: (sha256, size) del contenido.
+    Raises:
+        AttachmentTooLargeError: Si el anexo supera MAX_ATTACHMENT_SIZE.
+        UploadSessionError: Si la sesión de subida no existe o no se ha completado.
+    """
+    if attachment.get("uploadId"):
+        session = store_upload_session(attachment["uploadId"], attachment.get("fileType"))
+        attachment.setdefault("fileName", session["fileName"])
+        attachment.setdefault("fileType", session["fileType"])
+        return session["sha256"], session["size"]
+
+    file_name = attachment.get("fileName", "Sin nombre")
+
+    # Anexos base64 ya decodificados por prepare_attachments, o archivos multipart
+    prepared = attachment.get("prepared")
+    upload = prepared.result() if prepared is not None else attachment.get("file")
+    if upload is not None:
+        if upload.too_large:
+            raise AttachmentTooLargeError(file_name)
+        return upload.store(attachment.get("fileType"))
+
+    # Extraer base64 real (remover prefijo data:image/png;base64, si existe)
+    base64_content = attachment["base64Content"].split(",")[-1]
+    file_content = base64.b64decode(base64_content)
+    if len(file_content) > MAX_ATTACHMENT_SIZE:
+        raise AttachmentTooLargeError(file_name)
+    return store_blob(file_content, attachment.get("fileType"))
@@ -0,0 +1,157 @@
+import os
+import zipfile
+from datetime import datetime
+
+from app.utils.attachment_store import READ_CHUNK_SIZE, blob_exists, iter_blob, open_database_content
+
+
+# Carpetas del ZIP, las mismas que se usaban en UPLOAD_PATH/<ticket> antes del almacén de anexos
+DESCRIPTION_FOLDER = "Anexos_Descripcion"
+SOLUTION_FOLDER = "Anexos_Solucion"
+
+# Tipos de contenido que ya vienen comprimidos: se guardan sin volver a comprimir
+_STORED_TYPE_PREFIXES = ("image/", "video/", "audio/")
+_STORED_TYPES = {
+    "application/pdf", "application/zip", "application/x-zip-compressed", "application/gzip",
+    "application/x-7z-compressed", "application/x-rar-compressed", "application/vnd.rar"
+}
+_STORED_TYPES_OOXML = "application/vnd.openxmlformats-officedocument."
+
+
+class _ZipStreamBuffer:
+    """
+    Destino de zipfile que no permite seek: guarda lo que se escribe hasta que el generador
+    lo entrega. zipfile detecta que no es buscable y escribe los tamaños y el CRC de cada archivo
+    en un descriptor después de su contenido, por lo que el ZIP se genera en una sola pasada.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _compress_type(file_type):
+    file_type = (file_type or "").lower()
+    if (file_type.startswith(_STORED_TYPE_PREFIXES) or file_type in _STORED_TYPES
+            or file_type.startswith(_STORED_TYPES_OOXML)):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _unique_name(folder, file_name, used_names):
+    """
+    Devuelve la ruta del archivo dentro del ZIP, agregando " (2)", " (3)", etc. si el nombre
+    ya se usó en la misma carpeta.
+    """
+    name, extension = os.path.splitext(os.path.basename(file_name) or "archivo")
+    candidate = f"{folder}/{name}{extension}"
+    counter = 2
+    while candidate.lower() in used_names:
+        candidate = f"{folder}/{name} ({counter}){extension}"
+        counter += 1
+    used_names.add(candidate.lower())
+    return candidate
+
+
+def _content_source(attachment):
+    """
+    Devuelve de dónde leer el contenido de un anexo: su SHA-256 si está en el almacén, o un
+    DatabaseContentReader para los anexos guardados antes de existir el almacén (None si no
+    tiene contenido). Se resuelve en la petición, porque el ZIP se genera después de cerrarse
+    la sesión de la base de datos.
+    """
+    if blob_exists(attachment.sha256):
+        return attachment.sha256
+    return open_database_content(attachment)
+
+
+def _iter_content(source):
+    """
+    Lee el contenido de un anexo por fragmentos.
+    """
+    if source is None:
+        return
+    if isinstance(source, str):
+        yield from iter_blob(source)
+        return
+    with source:
+        while True:
+            chunk = source.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_attachments_zip(attachments):
+    """
+    Genera un ZIP con los anexos de un ticket a medida que se envía, sin armarlo en memoria
+    ni en disco: en memoria solo queda el fragmento del anexo que se está comprimiendo.
+    Los anexos de descripción van en la carpeta Anexos_Descripcion y los de solución en
+    Anexos_Solucion. Las imágenes, videos, PDF y otros formatos ya comprimidos se guardan sin
+    volver a comprimir.
+    Debe llamarse dentro de la petición; el generador devuelto puede consumirse después.
+    Args:
+        attachments (list): Los anexos TicketAttachment del ticket, de descripción y de solución.
+    Returns:
+        generator: Fragmentos (bytes) del ZIP.
+    """
+    used_names = set()
+    entries = []
+    # Primero los de descripción y después los de solución
+    ordered = sorted(attachments, key=lambda attachment: not attachment.is_description_file)
+    for attachment in ordered:
+        folder = DESCRIPTION_FOLDER if attachment.is_description_file else SOLUTION_FOLDER
+        source = _content_source(attachment)
+        size = attachment.file_size
+        if size is None:
+            size = len(source) if source is not None and not isinstance(source, str) else 0
+        entries.append((
+            _unique_name(folder, attachment.file_name, used_names),
+            _compress_type(attachment.file_type),
+            size,
+            source
+        ))
+    return _generate_zip(entries)
+
+
+def _generate_zip(entries):
+    buffer = _ZipStreamBuffer()
+    date_time = datetime.now().timetuple()[:6]
+
+    with zipfile.ZipFile(buffer, mode="w", allowZip64=True) as archive:
+        for name, compress_type, size, source in entries:
+            info = zipfile.ZipInfo(name, date_time)
+            info.compress_type = compress_type
+            # El tamaño permite a zipfile decidir si necesita ZIP64 antes de escribir
+            info.file_size = size
+
+            with archive.open(info, mode="w") as entry:
+                for chunk in _iter_content(source):
+                    entry.write(chunk)
+                    data = buffer.pop()
+                    if data:
+                        yield data
+            data = buffer.pop()
+            if data:
+                yield data
+
+    # Directorio central del ZIP
+    data = buffer.pop()
+    if data:
+        yield data
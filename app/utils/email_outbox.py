@@ -0,0 +1,433 @@
+import hashlib
+import os
+import random
+import smtplib
+import threading
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from flask import current_app
+from sqlalchemy import and_, event, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.email_outbox_model import (
+    EMAIL_STATUS_ENVIADO,
+    EMAIL_STATUS_ENVIANDO,
+    EMAIL_STATUS_ERROR,
+    EMAIL_STATUS_PENDIENTE,
+    EmailOutbox
+)
+from app.models.ticket_model import TicketAttachment
+from app.utils.attachment_store import read_attachment_content
+from app.utils.email_utils import SMTP_USERNAME, build_email, deliver_email
+
+
+load_dotenv()  # Cargar variables de entorno
+
+# Cómo se envían los correos de la bandeja de salida: "thread" con un hilo dentro de cada
+# proceso de la aplicación, u "off" para enviarlos solo con "flask emails worker"
+EMAIL_OUTBOX_WORKER = os.getenv('EMAIL_OUTBOX_WORKER', 'thread')
+# Segundos entre dos revisiones de la bandeja cuando no llegan correos nuevos
+EMAIL_OUTBOX_POLL_INTERVAL = int(os.getenv('EMAIL_OUTBOX_POLL_INTERVAL', 30))
+# Segundos que un proceso tiene reservado un correo que está enviando
+EMAIL_OUTBOX_LEASE = int(os.getenv('EMAIL_OUTBOX_LEASE', 300))
+EMAIL_OUTBOX_BATCH_SIZE = 20
+
+# Reintentos de un correo que falló por un error temporal: el intento n espera
+# EMAIL_RETRY_BASE_DELAY * 2^(n-1) segundos, como máximo EMAIL_RETRY_MAX_DELAY. Al agotar
+# EMAIL_MAX_ATTEMPTS intentos, el correo pasa a la cola de mensajes fallidos.
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 6))
+EMAIL_RETRY_BASE_DELAY = int(os.getenv('EMAIL_RETRY_BASE_DELAY', 60))
+EMAIL_RETRY_MAX_DELAY = int(os.getenv('EMAIL_RETRY_MAX_DELAY', 3600))
+
+# URL pública de esta API, para enlazar desde los correos la descarga de los anexos
+BACKEND_BASE_URL = os.getenv('BACKEND_BASE_URL')
+# Los anexos más grandes que este tamaño (en bytes) se enlazan en lugar de adjuntarse, y también
+# los que harían superar EMAIL_ATTACHMENTS_MAX_TOTAL a todo el correo (muchos servidores rechazan
+# correos de más de 20-25 MB). Sin BACKEND_BASE_URL, todos los anexos se adjuntan.
+EMAIL_ATTACHMENT_MAX_SIZE = int(os.getenv('EMAIL_ATTACHMENT_MAX_SIZE', 5 * 1024 * 1024))
+EMAIL_ATTACHMENTS_MAX_TOTAL = int(os.getenv('EMAIL_ATTACHMENTS_MAX_TOTAL', 15 * 1024 * 1024))
+
+# Eventos que originan correos
+EMAIL_EVENT_TICKET_CREADO = "ticket_creado"
+EMAIL_EVENT_TICKET_FINALIZADO = "ticket_finalizado"
+
+# Clave de session.info que indica que la transacción agregó correos a la bandeja
+_ENQUEUED_KEY = "email_outbox_enqueued"
+
+_worker_lock = threading.Lock()
+_worker_thread = None
+_wake_event = threading.Event()
+
+
+def email_idempotency_key(event_name, ticket_id, occurrence=None):
+    """
+    Devuelve la clave que identifica un aviso: el evento y el ticket, más la ocurrencia
+    para los eventos que pueden repetirse en un mismo ticket (por ejemplo, el número de
+    finalización, si el ticket se reabre y se finaliza de nuevo). La clave no depende de
+    la hora, de modo que reintentar la misma petición no genera otro aviso. Los ids de los
+    tickets no se reutilizan (AUTOINCREMENT en SQLite), por lo que un ticket nuevo no toma
+    las claves de uno eliminado.
+    """
+    key = f"{event_name}:{ticket_id}"
+    if occurrence is not None:
+        key += f":{occurrence}"
+    return key
+
+
+def email_occurrence(event_name, ticket_id, repeated=False):
+    """
+    Devuelve el número de ocurrencia del siguiente aviso de un evento de un ticket: 1 para
+    el primero, 2 después de que el ticket se reabre, etc.
+    Args:
+        event_name (str): El evento, por ejemplo EMAIL_EVENT_TICKET_FINALIZADO.
+        ticket_id (int): El ticket.
+        repeated (bool, opcional): Si la petición repite un evento que ya ocurrió (por ejemplo,
+            finalizar un ticket que ya está finalizado); devuelve la ocurrencia anterior, de
+            modo que su clave coincide con la del aviso existente.
+    Returns:
+        int: La ocurrencia.
+    """
+    with db.session.no_autoflush:
+        count = db.session.execute(
+            select(func.count()).select_from(EmailOutbox)
+            .where(EmailOutbox.event == event_name, EmailOutbox.ticket_id == ticket_id)
+        ).scalar()
+    if repeated and count:
+        return count
+    return count + 1
+
+
+def enqueue_email(event_name, to_address, subject, body, ticket_id=None, attachment_ids=(),
+                  idempotency_key=None, text_body=None):
+    """
+    Agrega un correo a la bandeja de salida en la transacción actual. Se envía después
+    de confirmarla; si se revierte, el correo tampoco se guarda.
+    Si ya existe un correo con la misma clave de idempotencia, no se agrega otro. Si otra
+    transacción agrega el mismo aviso al mismo tiempo, la inserción se revierte en un punto
+    de guardado y se usa el correo de la otra transacción.
+    Args:
+        event_name (str): El evento que originó el correo, por ejemplo EMAIL_EVENT_TICKET_CREADO.
+        to_address (list): Las direcciones de los destinatarios; se omiten las vacías.
+        subject (str): El asunto del correo.
+        body (str): El cuerpo HTML del correo (ver app.utils.email_templates.render_email).
+        ticket_id (int, opcional): El ticket del correo.
+        attachment_ids (iterable, opcional): Los ids de los anexos que acompañan el correo.
+            Los anexos de imagen se incrustan en el cuerpo y los demás se adjuntan.
+        idempotency_key (str, opcional): La clave del aviso; por defecto, la del evento y el
+            ticket (email_idempotency_key).
+        text_body (str, opcional): El cuerpo en texto plano.
+    Returns:
+        EmailOutbox: El correo agregado a la sesión, o el existente con la misma clave.
+    """
+    if idempotency_key is None and ticket_id is not None:
+        idempotency_key = email_idempotency_key(event_name, ticket_id)
+    if idempotency_key is not None:
+        with db.session.no_autoflush:
+            existing = EmailOutbox.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return existing
+
+    email = EmailOutbox(
+        event=event_name,
+        ticket_id=ticket_id,
+        to_address=[address for address in to_address if address],
+        subject=subject,
+        body=body,
+        body_text=text_body,
+        attachment_ids=list(attachment_ids),
+        status=EMAIL_STATUS_PENDIENTE,
+        attempts=0,
+        idempotency_key=idempotency_key
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(email)
+    except IntegrityError:
+        if idempotency_key is None:
+            raise
+        # Otra transacción agregó el mismo aviso: ya está en la bandeja
+        with db.session.no_autoflush:
+            return EmailOutbox.query.filter_by(idempotency_key=idempotency_key).first()
+    db.session.info[_ENQUEUED_KEY] = True
+    return email
+
+
+def _claimable():
+    """
+    Condición de los correos que un proceso puede tomar: los pendientes cuyo reintento ya
+    corresponde y los que quedaron "enviando" con la reserva vencida (el proceso que los
+    tomó se detuvo).
+    """
+    now = datetime.utcnow()
+    return or_(
+        and_(EmailOutbox.status == EMAIL_STATUS_PENDIENTE,
+             or_(EmailOutbox.next_attempt_at.is_(None), EmailOutbox.next_attempt_at <= now)),
+        and_(EmailOutbox.status == EMAIL_STATUS_ENVIANDO, EmailOutbox.locked_until < now)
+    )
+
+
+def claim_emails(limit=EMAIL_OUTBOX_BATCH_SIZE):
+    """
+    Reserva hasta limit correos para este proceso y confirma la reserva.
+    Cada correo se toma con un UPDATE condicionado a que siga disponible, de modo que
+    varios procesos pueden vaciar la bandeja a la vez sin enviar dos veces el mismo correo.
+    Returns:
+        list: Los ids de los correos reservados.
+    """
+    candidate_ids = db.session.execute(
+        select(EmailOutbox.id).where(_claimable()).order_by(EmailOutbox.id).limit(limit)
+    ).scalars().all()
+
+    claimed = []
+    locked_until = datetime.utcnow() + timedelta(seconds=EMAIL_OUTBOX_LEASE)
+    for email_id in candidate_ids:
+        result = db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == email_id, _claimable())
+            .values(status=EMAIL_STATUS_ENVIANDO, locked_until=locked_until,
+                    attempts=EmailOutbox.attempts + 1)
+        )
+        if result.rowcount == 1:
+            claimed.append(email_id)
+    db.session.commit()
+    return claimed
+
+
+def attachment_download_url(attachment):
+    """
+    Devuelve la URL de descarga de un anexo (GET /tickets/attachment/<id>/), o None si no
+    está configurada BACKEND_BASE_URL.
+    """
+    if not BACKEND_BASE_URL:
+        return None
+    return f"{BACKEND_BASE_URL.rstrip('/')}/tickets/attachment/{attachment.id}/"
+
+
+def _build_outbox_email(email):
+    """
+    Construye el mensaje de un correo de la bandeja, leyendo el contenido de sus anexos.
+    El contenido se lee en bytes del almacén y se pasa directamente a build_email. Los anexos
+    que superan EMAIL_ATTACHMENT_MAX_SIZE o el total EMAIL_ATTACHMENTS_MAX_TOTAL se enlazan
+    a su descarga, sin leer su contenido. Los anexos eliminados después de crear el correo
+    se omiten.
+    """
+    attachment_ids = email.attachment_ids or []
+    attachments = TicketAttachment.query.filter(TicketAttachment.id.in_(attachment_ids)).all()
+    attachments.sort(key=lambda attachment: attachment_ids.index(attachment.id))
+
+    images = []
+    files = []
+    links = []
+    remaining = EMAIL_ATTACHMENTS_MAX_TOTAL
+    for attachment in attachments:
+        url = attachment_download_url(attachment)
+        content = None
+        size = attachment.file_size
+        if size is None:
+            # Anexo sin tamaño registrado: hay que leerlo para conocerlo
+            content = read_attachment_content(attachment)
+            if content is None:
+                continue
+            size = len(content)
+        if url is not None and (size > EMAIL_ATTACHMENT_MAX_SIZE or size > remaining):
+            links.append({'fileName': attachment.file_name, 'url': url, 'fileSize': size})
+            continue
+
+        if content is None:
+            content = read_attachment_content(attachment)
+            if content is None:
+                continue
+        remaining -= len(content)
+        if attachment.file_type.startswith('image/'):
+            images.append({'content': content, 'fileType': attachment.file_type})
+        else:
+            files.append({
+                'fileName': attachment.file_name,
+                'fileType': attachment.file_type,
+                'content': content
+            })
+    msg = build_email(email.to_address, email.subject, email.body, images, files, links, email.body_text)
+    # Message-ID fijo por aviso: si un reintento llega a entregar un correo que el servidor ya
+    # había aceptado, el cliente de correo del destinatario lo reconoce como el mismo mensaje
+    key = email.idempotency_key or f"outbox-{email.id}"
+    domain = SMTP_USERNAME.rsplit('@', 1)[-1] if SMTP_USERNAME and '@' in SMTP_USERNAME else 'localhost'
+    msg['Message-ID'] = f"<{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}@{domain}>"
+    return msg
+
+
+def is_permanent_error(error):
+    """
+    Indica si un error de envío es definitivo, de modo que reintentar no sirve: el servidor
+    respondió con un código 5xx (por ejemplo, destinatario inexistente o credenciales
+    inválidas). Los errores de conexión y los códigos 4xx son temporales.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+def retry_delay(attempts):
+    """
+    Devuelve los segundos de espera antes de reintentar un correo que falló attempts veces,
+    con una variación aleatoria de hasta 10 % para que los correos que fallaron juntos no se
+    reintenten todos a la vez.
+    """
+    delay = min(EMAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1), EMAIL_RETRY_MAX_DELAY)
+    return delay + random.uniform(0, delay / 10)
+
+
+def send_outbox_email(email_id):
+    """
+    Envía un correo reservado con claim_emails y registra el resultado.
+    Returns:
+        bool: True si el correo se envió.
+    """
+    email = db.session.get(EmailOutbox, email_id)
+    if email is None:
+        return False
+
+    try:
+        to_address = list(email.to_address)
+        msg = _build_outbox_email(email)
+        db.session.commit()  # No mantener abierta la transacción durante el envío
+        deliver_email(to_address, msg)
+    except Exception as e:
+        db.session.rollback()
+        email.last_error = f"{type(e).__name__}: {str(e)}"
+        email.locked_until = None
+        if is_permanent_error(e) or email.attempts >= EMAIL_MAX_ATTEMPTS:
+            email.status = EMAIL_STATUS_ERROR
+            email.next_attempt_at = None
+            print(f"Error enviando correo {email_id} (intento {email.attempts}, pasa a fallidos): {str(e)}")
+        else:
+            email.status = EMAIL_STATUS_PENDIENTE
+            email.next_attempt_at = datetime.utcnow() + timedelta(seconds=retry_delay(email.attempts))
+            print(f"Error enviando correo {email_id} (intento {email.attempts}, se reintentará): {str(e)}")
+        db.session.commit()
+        return False
+
+    email.status = EMAIL_STATUS_ENVIADO
+    email.sent_at = datetime.utcnow()
+    email.last_error = None
+    email.locked_until = None
+    email.next_attempt_at = None
+    db.session.commit()
+    return True
+
+
+def replay_emails(email_ids=None):
+    """
+    Devuelve a la bandeja de salida correos de la cola de mensajes fallidos, con los
+    reintentos reiniciados. Solo se reenvían los correos en estado "error": un correo ya
+    enviado nunca se vuelve a enviar. El cambio se confirma con la transacción actual.
+    Args:
+        email_ids (list, opcional): Los ids de los correos; por defecto, todos los fallidos.
+    Returns:
+        int: El número de correos devueltos a la bandeja.
+    """
+    statement = update(EmailOutbox).where(EmailOutbox.status == EMAIL_STATUS_ERROR)
+    if email_ids is not None:
+        statement = statement.where(EmailOutbox.id.in_(email_ids))
+    result = db.session.execute(
+        statement.values(status=EMAIL_STATUS_PENDIENTE, attempts=0, next_attempt_at=None, locked_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        db.session.info[_ENQUEUED_KEY] = True
+    return result.rowcount
+
+
+def process_outbox(limit=EMAIL_OUTBOX_BATCH_SIZE):
+    """
+    Reserva y envía hasta limit correos de la bandeja de salida.
+    Returns:
+        tuple: El número de correos enviados y el de correos con error.
+    """
+    sent = failed = 0
+    for email_id in claim_emails(limit):
+        if send_outbox_email(email_id):
+            sent += 1
+        else:
+            failed += 1
+    return sent, failed
+
+
+def run_worker(stop_event=None, poll_interval=EMAIL_OUTBOX_POLL_INTERVAL):
+    """
+    Vacía la bandeja de salida de forma continua. Después de cada lote, si no quedan correos,
+    espera a que se agregue uno (wake_worker) o a que pase poll_interval.
+    Debe ejecutarse dentro de un contexto de la aplicación.
+    Args:
+        stop_event (threading.Event, opcional): Detiene el ciclo al activarse.
+        poll_interval (int, opcional): Segundos máximos de espera entre revisiones.
+    """
+    while stop_event is None or not stop_event.is_set():
+        _wake_event.clear()
+        claimed = 0
+        try:
+            sent, failed = process_outbox()
+            claimed = sent + failed
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error procesando la bandeja de salida: {str(e)}")
+        finally:
+            db.session.remove()
+        if not claimed:
+            _wake_event.wait(poll_interval)
+
+
+def _run_worker_thread(app):
+    with app.app_context():
+        run_worker()
+
+
+def start_worker(app):
+    """
+    Inicia el hilo de envío de este proceso si EMAIL_OUTBOX_WORKER es "thread" y aún no
+    existe. Se llama al arrancar la aplicación, de modo que los correos que quedaron
+    pendientes de un reintento o reservados antes de un reinicio se envían sin esperar
+    a que se agregue otro.
+    Args:
+        app (Flask): La aplicación, para crear el contexto del hilo.
+    """
+    global _worker_thread
+    if EMAIL_OUTBOX_WORKER != 'thread':
+        return
+    with _worker_lock:
+        if _worker_thread is None or not _worker_thread.is_alive():
+            _worker_thread = threading.Thread(
+                target=_run_worker_thread,
+                args=(app,),
+                name="email-outbox",
+                daemon=True
+            )
+            _worker_thread.start()
+
+
+def wake_worker():
+    """
+    Avisa al hilo de envío que hay correos nuevos, iniciándolo si aún no existe.
+    """
+    start_worker(current_app._get_current_object())
+    _wake_event.set()
+
+
+@event.listens_for(db.session, "after_commit")
+def _notify_worker(session):
+    """
+    Al confirmar una transacción que agregó correos, despierta el hilo de envío.
+    """
+    if session.in_nested_transaction() or not session.info.pop(_ENQUEUED_KEY, False):
+        return
+    if EMAIL_OUTBOX_WORKER == 'thread':
+        wake_worker()
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_enqueued(session):
+    if not session.in_nested_transaction():
+        session.info.pop(_ENQUEUED_KEY, None)
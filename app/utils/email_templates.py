@@ -0,0 +1,119 @@
+import os
+import tempfile
+
+from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined, select_autoescape
+from markupsafe import Markup
+
+
+load_dotenv()  # Cargar variables de entorno
+
+# Carpeta de las plantillas de los correos. Cada aviso tiene <nombre>.txt (texto plano, con el
+# asunto en {% set subject %}) y <nombre>.html. Al enviar el correo, el cuerpo se envuelve en
+# base.txt y base.html, que agregan las imágenes y los enlaces de descarga.
+EMAIL_TEMPLATES_PATH = os.getenv(
+    'EMAIL_TEMPLATES_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'emails')
+)
+# Carpeta donde se guardan las plantillas compiladas, para no volver a compilarlas al reiniciar
+# la aplicación; "off" desactiva esta caché
+EMAIL_TEMPLATES_CACHE = os.getenv(
+    'EMAIL_TEMPLATES_CACHE', os.path.join(tempfile.gettempdir(), 'mintickets-email-templates')
+)
+# Revisar si una plantilla cambió en disco antes de usarla, para aplicar las ediciones sin
+# reiniciar la aplicación (una consulta de la fecha de modificación por uso)
+EMAIL_TEMPLATES_AUTO_RELOAD = os.getenv('EMAIL_TEMPLATES_AUTO_RELOAD', 'True') == 'True'
+
+_environment = None
+
+
+def create_environment(path=EMAIL_TEMPLATES_PATH, cache_dir=EMAIL_TEMPLATES_CACHE,
+                       auto_reload=EMAIL_TEMPLATES_AUTO_RELOAD):
+    """
+    Crea el entorno de Jinja2 de las plantillas de correo.
+    Las plantillas se compilan la primera vez que se usan y quedan en memoria; con cache_dir,
+    el código compilado también se guarda en disco. Las plantillas .html escapan
+    automáticamente las variables, de modo que el texto de los usuarios no puede insertar HTML.
+    Args:
+        path (str, opcional): La carpeta de las plantillas.
+        cache_dir (str, opcional): La carpeta de las plantillas compiladas, o "off".
+        auto_reload (bool, opcional): Revisar si las plantillas cambiaron en disco.
+    Returns:
+        jinja2.Environment: El entorno.
+    """
+    bytecode_cache = None
+    if cache_dir and cache_dir != 'off':
+        os.makedirs(cache_dir, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    environment = Environment(
+        loader=FileSystemLoader(path),
+        autoescape=select_autoescape(enabled_extensions=('html',), default_for_string=False),
+        bytecode_cache=bytecode_cache,
+        auto_reload=auto_reload,
+        undefined=StrictUndefined,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=True
+    )
+    environment.filters['filesize'] = format_file_size
+    return environment
+
+
+def format_file_size(size):
+    """
+    Filtro de las plantillas: muestra un tamaño en bytes como "900 KB" o "2.0 MB".
+    """
+    if not size:
+        return ''
+    if size >= 1024 * 1024:
+        return f'{size / (1024 * 1024):.1f} MB'
+    return f'{max(1, size // 1024)} KB'
+
+
+def get_environment():
+    """
+    Devuelve el entorno de las plantillas de correo del proceso, creándolo la primera vez.
+    """
+    global _environment
+    if _environment is None:
+        _environment = create_environment()
+    return _environment
+
+
+def render_email(name, **context):
+    """
+    Renderiza el asunto y el cuerpo en texto plano y en HTML de un aviso.
+    Args:
+        name (str): El nombre del aviso, por ejemplo "ticket_creado" (plantillas
+            ticket_creado.txt y ticket_creado.html).
+        **context: Las variables de las plantillas.
+    Returns:
+        tuple: El asunto (str), el cuerpo en texto plano (str) y el cuerpo HTML (str).
+    """
+    environment = get_environment()
+    text_module = environment.get_template(f"{name}.txt").make_module(context)
+    html = environment.get_template(f"{name}.html").render(context)
+    return " ".join(str(text_module.subject).split()), str(text_module), html
+
+
+def render_layout(body, text_body, image_count=0, links=()):
+    """
+    Envuelve el cuerpo de un aviso en el diseño común de los correos (base.html y base.txt),
+    con las imágenes incrustadas y los enlaces a los archivos que no se adjuntan.
+    Args:
+        body (str): El cuerpo HTML, ya renderizado.
+        text_body (str o None): El cuerpo en texto plano, ya renderizado.
+        image_count (int, opcional): El número de imágenes incrustadas (cid:image0, cid:image1...).
+        links (iterable, opcional): Diccionarios con 'fileName', 'url' y 'fileSize' (opcional).
+    Returns:
+        tuple: El HTML y el texto plano (o None si no hay text_body) del correo.
+    """
+    environment = get_environment()
+    links = list(links)
+    html = environment.get_template("base.html").render(
+        body=Markup(body), image_count=image_count, links=links
+    )
+    text = None
+    if text_body is not None:
+        text = environment.get_template("base.txt").render(body=text_body, links=links)
+    return html, text
@@ -0,0 +1,173 @@
+import atexit
+import os
+import base64
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.mime.image import MIMEImage
+from email.mime.base import MIMEBase
+from email import encoders
+from email.mime.application import MIMEApplication
+
+from dotenv import load_dotenv
+
+from app.utils.email_templates import render_layout
+from app.utils.smtp_pool import SMTPConnectionPool
+
+
+load_dotenv()  # Cargar variables de entorno
+
+SMTP_SERVER = os.getenv('SMTP_SERVER')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
+SMTP_USERNAME = os.getenv('SMTP_USERNAME')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
+
+# Conexiones SMTP reutilizadas entre envíos (la primera se abre con el primer correo)
+smtp_pool = SMTPConnectionPool(SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD)
+atexit.register(smtp_pool.close)
+
+
+def build_email(to_address, subject, body, images=[], attachments=[], links=[], text_body=None):
+    """
+    Construye un correo electrónico con el asunto, cuerpo, imágenes y archivos adjuntos especificados.
+    El cuerpo va en HTML y, si se indica text_body, también en texto plano como alternativa.
+    El contenido de las imágenes y de los adjuntos se recibe en bytes ('content') y se codifica
+    una sola vez, al construir su parte MIME. Por compatibilidad, también se acepta codificado
+    en base64 ('base64Content').
+    Args:
+        to_address (list): Lista de direcciones de correo electrónico de los destinatarios.
+        subject (str): Asunto del correo electrónico.
+        body (str): Contenido HTML del cuerpo del correo electrónico (ver render_email).
+        images (list, optional): Lista de imágenes para incrustar en el correo electrónico. Cada una es
+            un diccionario con 'content' (bytes) y 'fileType' (str, opcional), o una cadena en base64.
+            Por defecto es [].
+        attachments (list, optional): Lista de diccionarios que representan archivos adjuntos. Cada diccionario debe tener:
+            - 'content' (bytes): Contenido del archivo, o 'base64Content' (str): contenido codificado en base64.
+            - 'fileName' (str, opcional): Nombre del archivo. Por defecto es "archivo".
+            - 'fileType' (str, opcional): Tipo MIME del archivo. Por defecto es 'application/octet-stream'.
+        links (list, optional): Archivos que se enlazan en lugar de adjuntarse, por ser demasiado
+            grandes para el correo. Diccionarios con 'fileName', 'url' y 'fileSize' (bytes, opcional).
+        text_body (str, optional): El cuerpo en texto plano. Por defecto el correo solo lleva HTML.
+    Returns:
+        MIMEMultipart: El mensaje, listo para enviarse con deliver_email.
+    Example:
+        build_email(
+            to_address=["example@example.com"],
+            subject="Correo de prueba",
+            body="<h1>Este es un correo de prueba</h1>",
+            images=[{"content": b"...", "fileType": "image/png"}],
+            attachments=[{
+                "content": b"%PDF-1.7 ...",
+                "fileName": "prueba.pdf",
+                "fileType": "application/pdf"
+            }]
+    """
+    # Estructura: mixed[related[alternative[texto, HTML], imágenes], adjuntos]
+    msg = MIMEMultipart('mixed')
+    msg['From'] = SMTP_USERNAME
+    msg['To'] = ', '.join(to_address)
+    msg['Subject'] = subject
+
+    # Envolver el cuerpo en el diseño común (plantillas base.html y base.txt), con los
+    # enlaces de descarga de los archivos que no se adjuntan
+    html, text = render_layout(body, text_body, len(images), links)
+    alternative = MIMEMultipart('alternative')
+    if text is not None:
+        alternative.attach(MIMEText(text, 'plain', 'utf-8'))
+    alternative.attach(MIMEText(html, 'html', 'utf-8'))
+    related = MIMEMultipart('related')
+    related.attach(alternative)
+    msg.attach(related)
+
+    # Adjuntar las imágenes
+    for i, image_data in enumerate(images):
+        try:
+            if isinstance(image_data, dict):
+                image_binary = image_data['content']
+                subtype = image_data.get('fileType', '').partition('/')[2] or None
+            else:
+                image_binary = _decode_base64(image_data)
+                subtype = None
+            image = MIMEImage(image_binary, _subtype=subtype)
+            image.add_header('Content-ID', f'<image{i}>')
+            related.attach(image)
+        except Exception as img_error:
+            print(f"Error procesando imagen {i}: {str(img_error)}")
+
+    # Mapeo de tipos MIME
+    mime_types = {
+        'application/pdf': 'application/pdf',
+        'application/vnd.ms-powerpoint': 'application/vnd.ms-powerpoint',
+        'application/vnd.openxmlformats-officedocument.presentationml.presentation': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+        'application/vnd.ms-excel': 'application/vnd.ms-excel',  # Archivos .xls
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',  # Archivos .xlsx
+        'application/msword': 'application/msword',  # Archivos .doc
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',  # Archivos .docx
+        'video/mp4': 'video/mp4',
+        'image/jpeg': 'image/jpeg',
+        'image/png': 'image/png',
+        'image/gif': 'image/gif'
+}
+
+
+
+    # Adjuntar archivos
+    for attachment in attachments:
+        try:
+            if 'content' in attachment:
+                file_binary = attachment['content']
+            else:
+                file_binary = _decode_base64(attachment['base64Content'])
+            
+            # Obtener el tipo MIME correcto
+            file_type = attachment.get('fileType', 'application/octet-stream')
+            mime_type = mime_types.get(file_type, file_type)
+
+            # Crear parte MIME para el archivo
+            if mime_type.startswith('image/'):
+                part = MIMEImage(file_binary, _subtype=mime_type.split('/')[-1])
+            elif mime_type == 'application/pdf':
+                part = MIMEApplication(file_binary, _subtype='pdf')
+            elif mime_type.startswith('video/'):
+                part = MIMEBase('video', mime_type.split('/')[-1])
+                part.set_payload(file_binary)
+                encoders.encode_base64(part)
+            elif mime_type.startswith('application/vnd.'):
+                part = MIMEApplication(file_binary, _subtype=mime_type.split('.')[-1])
+            else:
+                part = MIMEBase('application', 'octet-stream')
+                part.set_payload(file_binary)
+                encoders.encode_base64(part)
+            
+            # Agregar encabezados
+            part.add_header(
+                'Content-Disposition', 
+                'attachment',
+                filename=attachment.get("fileName", "archivo")
+            )
+            
+            msg.attach(part)
+        except Exception as file_error:
+            print(f"Error procesando archivo adjunto: {str(file_error)}")
+
+    return msg
+
+
+def _decode_base64(data):
+    """
+    Decodifica una cadena en base64, con o sin el prefijo "data:<tipo>;base64,".
+    """
+    if ',' in data:
+        data = data.split(',', 1)[1]
+    return base64.b64decode(data)
+
+
+def deliver_email(to_address, msg):
+    """
+    Envía por SMTP un mensaje construido con build_email, con una conexión de smtp_pool.
+    Args:
+        to_address (list): Lista de direcciones de correo electrónico de los destinatarios.
+        msg (MIMEMultipart): El mensaje.
+    Raises:
+        smtplib.SMTPException, OSError: Si no se pudo enviar el correo.
+    """
+    smtp_pool.send(SMTP_USERNAME, to_address, msg.as_string())
@@ -0,0 +1,241 @@
+import codecs
+import re
+
+
+READ_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = b" \t\r\n"
+_STRING_STOP = re.compile(rb'["\\]')
+_NUMBER = re.compile(rb"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?")
+_NUMBER_CHARACTERS = b"0123456789+-.eE"
+_HEX4 = re.compile(rb"[0-9a-fA-F]{4}")
+_ESCAPES = {
+    ord('"'): '"', ord('\\'): '\\', ord('/'): '/', ord('b'): '\b',
+    ord('f'): '\f', ord('n'): '\n', ord('r'): '\r', ord('t'): '\t'
+}
+_LITERALS = {ord('t'): (b"true", True), ord('f'): (b"false", False), ord('n'): (b"null", None)}
+
+
+class JSONStreamError(ValueError):
+    """
+    Error lanzado cuando el cuerpo no es un JSON válido.
+    """
+
+
+class StreamingJSONParser:
+    """
+    Parser de JSON que lee el cuerpo de la petición por fragmentos, en lugar de cargarlo completo.
+    Los strings cuya ruta indique sink_factory no se guardan en memoria: su contenido se entrega
+    por fragmentos a un "sink" (un objeto con write(str) y finish()), y en el resultado quedan
+    reemplazados por lo que devuelva finish(). Los demás valores se construyen normalmente.
+    Args:
+        stream: Un archivo binario con el JSON (por ejemplo, request.stream).
+        sink_factory (callable): Recibe la ruta del string (tupla de claves e índices, por
+            ejemplo ("attachments", 0, "base64Content")) y devuelve un sink, o None para
+            guardar el string en memoria.
+        chunk_size (int, opcional): Tamaño de cada lectura del stream.
+    """
+
+    def __init__(self, stream, sink_factory, chunk_size=READ_CHUNK_SIZE):
+        self._stream = stream
+        self._sink_factory = sink_factory
+        self._chunk_size = chunk_size
+        self._buffer = b""
+        self._position = 0
+        self._eof = False
+
+    def parse(self):
+        """
+        Lee el documento completo.
+        Returns:
+            El valor del documento (dict, list, str, número, bool o None).
+        Raises:
+            JSONStreamError: Si el JSON no es válido.
+        """
+        value = self._parse_value(())
+        if self._peek() is not None:
+            raise JSONStreamError("Contenido adicional después del JSON")
+        return value
+
+    def _fill(self):
+        """
+        Lee el siguiente fragmento del stream, descartando lo ya procesado del buffer.
+        Returns:
+            bool: False si el stream terminó.
+        """
+        if self._eof:
+            return False
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+
+    def _peek(self):
+        """
+        Devuelve el siguiente byte que no sea espacio en blanco, sin consumirlo (None al final).
+        """
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                return None
+
+    def _expect(self, character):
+        if self._peek() != ord(character):
+            raise JSONStreamError(f"Se esperaba '{character}'")
+        self._position += 1
+
+    def _parse_value(self, path):
+        character = self._peek()
+        if character is None:
+            raise JSONStreamError("JSON incompleto")
+        if character == ord('{'):
+            return self._parse_object(path)
+        if character == ord('['):
+            return self._parse_array(path)
+        if character == ord('"'):
+            self._position += 1
+            sink = self._sink_factory(path)
+            if sink is None:
+                return self._parse_string()
+            self._parse_string(sink)
+            return sink.finish()
+        if character in _LITERALS:
+            return self._parse_literal(*_LITERALS[character])
+        return self._parse_number()
+
+    def _parse_object(self, path):
+        self._position += 1
+        result = {}
+        if self._peek() == ord('}'):
+            self._position += 1
+            return result
+        while True:
+            self._expect('"')
+            key = self._parse_string()
+            self._expect(':')
+            result[key] = self._parse_value(path + (key,))
+            character = self._peek()
+            self._position += 1
+            if character == ord('}'):
+                return result
+            if character != ord(','):
+                raise JSONStreamError("Se esperaba ',' o '}'")
+
+    def _parse_array(self, path):
+        self._position += 1
+        result = []
+        if self._peek() == ord(']'):
+            self._position += 1
+            return result
+        while True:
+            result.append(self._parse_value(path + (len(result),)))
+            character = self._peek()
+            self._position += 1
+            if character == ord(']'):
+                return result
+            if character != ord(','):
+                raise JSONStreamError("Se esperaba ',' o ']'")
+
+    def _require(self, count):
+        """
+        Asegura que el buffer tenga al menos count bytes desde la posición actual.
+        """
+        while len(self._buffer) - self._position < count:
+            if not self._fill():
+                raise JSONStreamError("JSON incompleto")
+
+    def _parse_literal(self, literal, value):
+        self._require(len(literal))
+        if self._buffer[self._position:self._position + len(literal)] != literal:
+            raise JSONStreamError("Valor no válido")
+        self._position += len(literal)
+        return value
+
+    def _parse_number(self):
+        # Leer hasta el primer carácter que no puede ser parte de un número, para no cortarlo
+        # entre fragmentos
+        while True:
+            end = self._position
+            while end < len(self._buffer) and self._buffer[end] in _NUMBER_CHARACTERS:
+                end += 1
+            if end < len(self._buffer) or not self._fill():
+                break
+        match = _NUMBER.fullmatch(self._buffer, self._position, end)
+        if match is None:
+            raise JSONStreamError("Valor no válido")
+        self._position = end
+        text = match.group().decode("ascii")
+        if any(character in text for character in ".eE"):
+            return float(text)
+        return int(text)
+
+    def _parse_string(self, sink=None):
+        """
+        Lee un string cuya comilla inicial ya se consumió.
+        Si se indica sink, el contenido se le entrega por fragmentos; si no, se devuelve completo.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        parts = []
+        write = sink.write if sink is not None else parts.append
+        has_surrogates = False
+
+        while True:
+            match = _STRING_STOP.search(self._buffer, self._position)
+            end = match.start() if match else len(self._buffer)
+            if end > self._position:
+                text = self._decode(decoder, self._buffer[self._position:end])
+                if text:
+                    write(text)
+            self._position = end
+
+            if match is None:
+                if not self._fill():
+                    raise JSONStreamError("String sin terminar")
+                continue
+
+            self._position += 1
+            if match.group() == b'"':
+                self._decode(decoder, b"", final=True)
+                break
+
+            # Secuencia de escape
+            self._require(1)
+            escape = self._buffer[self._position]
+            self._position += 1
+            if escape in _ESCAPES:
+                write(_ESCAPES[escape])
+            elif escape == ord('u'):
+                self._require(4)
+                if not _HEX4.fullmatch(self._buffer, self._position, self._position + 4):
+                    raise JSONStreamError("Escape \\u no válido")
+                code = int(self._buffer[self._position:self._position + 4], 16)
+                self._position += 4
+                has_surrogates = has_surrogates or 0xD800 <= code <= 0xDFFF
+                write(chr(code))
+            else:
+                raise JSONStreamError("Escape no válido")
+
+        if sink is not None:
+            return None
+        text = "".join(parts)
+        if has_surrogates:
+            # Unir los pares sustitutos (por ejemplo, de emojis) en un solo carácter. Los
+            # sustitutos sin pareja se conservan, como en json.loads.
+            text = text.encode("utf-16", "surrogatepass").decode("utf-16", "surrogatepass")
+        return text
+
+    @staticmethod
+    def _decode(decoder, data, final=False):
+        """
+        Decodifica un fragmento de un string en UTF-8, que puede terminar a mitad de un carácter.
+        """
+        try:
+            return decoder.decode(data, final=final)
+        except UnicodeDecodeError:
+            raise JSONStreamError("El JSON no está codificado en UTF-8")
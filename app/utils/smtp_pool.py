@@ -0,0 +1,227 @@
+import os
+import smtplib
+import threading
+import time
+
+from dotenv import load_dotenv
+
+
+load_dotenv()  # Cargar variables de entorno
+
+# Número máximo de conexiones SMTP abiertas (y de envíos simultáneos) por proceso
+SMTP_POOL_SIZE = max(1, int(os.getenv('SMTP_POOL_SIZE', 4)))
+# Segundos que una conexión puede estar sin usarse antes de cerrarla; 0 no reutiliza conexiones
+SMTP_POOL_IDLE_TIMEOUT = int(os.getenv('SMTP_POOL_IDLE_TIMEOUT', 120))
+# Una conexión sin usar por más de estos segundos se verifica con NOOP antes de reutilizarla
+SMTP_POOL_NOOP_INTERVAL = int(os.getenv('SMTP_POOL_NOOP_INTERVAL', 10))
+# Segundos máximos de espera del servidor SMTP y de una conexión libre del pool
+SMTP_TIMEOUT = int(os.getenv('SMTP_TIMEOUT', 30))
+
+# Errores que indican que la conexión ya no sirve (el servidor la cerró)
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+class SMTPPoolTimeout(smtplib.SMTPException):
+    """
+    No hubo una conexión libre en el pool dentro de SMTP_TIMEOUT.
+    """
+
+
+class SMTPConnectionPool:
+    """
+    Pool de conexiones SMTP autenticadas, reutilizadas entre envíos para no repetir la
+    conexión, STARTTLS y el inicio de sesión en cada correo.
+
+    - Limita a size las conexiones abiertas y los envíos simultáneos.
+    - Antes de reutilizar una conexión que lleva un tiempo sin usarse, la verifica con NOOP.
+    - Si el servidor cerró una conexión reutilizada, abre otra y reintenta el envío una vez.
+    - Cuenta los inicios de sesión evitados y la latencia de los envíos (ver stats).
+    """
+
+    def __init__(self, host, port, username, password, size=SMTP_POOL_SIZE,
+                 idle_timeout=SMTP_POOL_IDLE_TIMEOUT, noop_interval=SMTP_POOL_NOOP_INTERVAL,
+                 timeout=SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.noop_interval = noop_interval
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []  # (conexión, momento de su último uso), la más reciente al final
+        self._pid = os.getpid()
+        self._counters = {
+            "handshakes": 0,
+            "handshakes_avoided": 0,
+            "noop_checks": 0,
+            "stale_connections": 0,
+            "reconnects": 0,
+            "sends": 0,
+            "send_errors": 0,
+            "send_seconds_total": 0.0,
+            "send_seconds_max": 0.0,
+        }
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def _connect(self):
+        """
+        Abre una conexión nueva: conexión, STARTTLS e inicio de sesión.
+        """
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.starttls()
+            server.login(self.username, self.password)
+        except Exception:
+            _close(server)
+            raise
+        self._count("handshakes")
+        return server
+
+    def _checkout(self):
+        """
+        Devuelve una conexión lista para enviar y si es reutilizada.
+        Se prefiere la usada más recientemente, que es la que con más probabilidad sigue abierta.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Proceso hijo (fork): las conexiones del proceso padre no se comparten
+                self._idle = []
+                self._pid = os.getpid()
+            idle = self._idle
+            self._idle = []
+
+        server = None
+        now = time.monotonic()
+        while idle:
+            candidate, last_used = idle.pop()
+            idle_time = now - last_used
+            if idle_time > self.idle_timeout:
+                _close(candidate)
+                continue
+            if idle_time > self.noop_interval:
+                self._count("noop_checks")
+                try:
+                    healthy = candidate.noop()[0] == 250
+                except (smtplib.SMTPException, OSError):
+                    healthy = False
+                if not healthy:
+                    self._count("stale_connections")
+                    _close(candidate)
+                    continue
+            server = candidate
+            break
+
+        if idle:
+            # Devolver las que no se usaron, conservando el orden
+            with self._lock:
+                self._idle = idle + self._idle
+
+        if server is not None:
+            self._count("handshakes_avoided")
+            return server, True
+        return self._connect(), False
+
+    def _checkin(self, server):
+        if self.idle_timeout <= 0:
+            _close(server)
+            return
+        with self._lock:
+            self._idle.append((server, time.monotonic()))
+
+    def send(self, from_address, to_address, message):
+        """
+        Envía un mensaje con una conexión del pool, esperando una libre si todas están en uso.
+        Args:
+            from_address (str): La dirección del remitente.
+            to_address (list): Las direcciones de los destinatarios.
+            message (str): El mensaje completo (msg.as_string()).
+        Raises:
+            SMTPPoolTimeout: Si no hubo una conexión libre dentro del tiempo de espera.
+            smtplib.SMTPException, OSError: Si no se pudo enviar el correo.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise SMTPPoolTimeout("No hay conexiones SMTP libres")
+        start = time.perf_counter()
+        try:
+            server, reused = self._checkout()
+            try:
+                server.sendmail(from_address, to_address, message)
+            except _CONNECTION_ERRORS:
+                _close(server)
+                if not reused:
+                    raise
+                # El servidor cerró la conexión mientras estaba libre: reconectar y reintentar
+                self._count("reconnects")
+                server = self._connect()
+                try:
+                    server.sendmail(from_address, to_address, message)
+                except Exception:
+                    _close(server)
+                    raise
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # Error del mensaje (por ejemplo, destinatario rechazado): la conexión sigue
+                # siendo válida. sendmail ya envió RSET.
+                self._checkin(server)
+                raise
+            except Exception:
+                _close(server)
+                raise
+            self._checkin(server)
+        except Exception:
+            self._count("send_errors")
+            raise
+        finally:
+            self._slots.release()
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._counters["sends"] += 1
+                self._counters["send_seconds_total"] += elapsed
+                self._counters["send_seconds_max"] = max(self._counters["send_seconds_max"], elapsed)
+
+    def close(self):
+        """
+        Cierra las conexiones libres del pool.
+        """
+        with self._lock:
+            idle = self._idle
+            self._idle = []
+        for server, _ in idle:
+            _close(server)
+
+    def stats(self):
+        """
+        Devuelve los contadores del pool desde que se inició el proceso.
+        Returns:
+            dict: handshakes (conexiones nuevas con inicio de sesión), handshakes_avoided
+                (envíos con una conexión reutilizada), noop_checks, stale_connections
+                (conexiones descartadas por no responder a NOOP), reconnects (reintentos
+                después de que el servidor cerró la conexión), sends, send_errors,
+                send_seconds_total, send_seconds_max, send_seconds_avg, idle_connections
+                y size.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["idle_connections"] = len(self._idle)
+        stats["send_seconds_avg"] = stats["send_seconds_total"] / stats["sends"] if stats["sends"] else 0.0
+        stats["size"] = self.size
+        return stats
+
+
+def _close(server):
+    """
+    Cierra una conexión SMTP sin propagar errores (el servidor pudo haberla cerrado).
+    """
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        try:
+            server.close()
+        except OSError:
+            pass
+
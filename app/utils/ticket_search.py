@@ -0,0 +1,207 @@
+import html
+import re
+
+from sqlalchemy import func, inspect, or_, select, text
+
+from app import db
+from app.models.ticket_model import Ticket
+
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Marcadores que delimitan los términos encontrados en los fragmentos. Se usan caracteres
+# de control para poder escapar el texto del ticket antes de convertirlos en <mark>.
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+# Backend de búsqueda activo: "fts5" (SQLite), "postgresql" o "like" si la base de datos
+# no tiene el índice de texto completo. Se determina la primera vez con get_search_backend().
+_search_backend = None
+
+
+def get_search_backend():
+    """
+    Devuelve el backend de búsqueda según el índice de texto completo que exista en la base de datos.
+    El índice lo crea la migración c302f4f9427b ("flask db upgrade"); la aplicación solo lo consulta
+    y lo mantiene:
+    - SQLite: tabla virtual FTS5 "ticket_fts", cuyo rowid es el id del ticket. Se mantiene desde
+      la aplicación con index_ticket() y remove_ticket_from_index().
+    - PostgreSQL: columna generada "search_vector" (tsvector) con índice GIN. La base de datos
+      la actualiza en cada INSERT/UPDATE, por lo que no requiere mantenimiento desde la aplicación.
+    Si el índice no existe, la búsqueda usa LIKE hasta reiniciar la aplicación después de la migración.
+    Returns:
+        str: "fts5", "postgresql" o "like".
+    """
+    global _search_backend
+    if _search_backend is None:
+        inspector = inspect(db.engine)
+        dialect = db.engine.dialect.name
+        if dialect == "sqlite" and inspector.has_table("ticket_fts"):
+            _search_backend = "fts5"
+        elif dialect == "postgresql" and "search_vector" in {
+            column["name"] for column in inspector.get_columns("ticket")
+        }:
+            _search_backend = "postgresql"
+        else:
+            _search_backend = "like"
+    return _search_backend
+
+
+def index_ticket(ticket):
+    """
+    Actualiza la entrada del ticket en el índice de texto completo.
+    Se ejecuta en la sesión actual, por lo que queda en la misma transacción que el
+    cambio del ticket. El ticket debe tener id (llamar después de db.session.flush()).
+    Args:
+        ticket (Ticket): El ticket creado o modificado.
+    """
+    if get_search_backend() != "fts5":
+        return
+    remove_ticket_from_index(ticket.id)
+    db.session.execute(
+        text(
+            "INSERT INTO ticket_fts (rowid, tema, descripcion_caso, solucion_caso) "
+            "VALUES (:id, :tema, :descripcion_caso, :solucion_caso)"
+        ),
+        {
+            "id": ticket.id,
+            "tema": ticket.tema or "",
+            "descripcion_caso": ticket.descripcion_caso or "",
+            "solucion_caso": ticket.solucion_caso or ""
+        }
+    )
+
+
+def remove_ticket_from_index(ticket_id):
+    """
+    Elimina un ticket del índice de texto completo, en la transacción actual.
+    Args:
+        ticket_id (int): El ID del ticket.
+    """
+    if get_search_backend() != "fts5":
+        return
+    db.session.execute(text("DELETE FROM ticket_fts WHERE rowid = :id"), {"id": ticket_id})
+
+
+def build_fts5_query(query):
+    """
+    Convierte el texto escrito por el usuario en una consulta FTS5 segura.
+    Cada palabra se busca como prefijo y todas deben aparecer en el ticket. Los operadores
+    y caracteres especiales de FTS5 se descartan para que no produzcan errores de sintaxis.
+    Args:
+        query (str): El texto de búsqueda.
+    Returns:
+        str: La consulta MATCH, o una cadena vacía si no hay palabras.
+    """
+    terms = re.findall(r"\w+", query)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def highlight(fragment):
+    """
+    Escapa un fragmento de texto y marca los términos encontrados con <mark>.
+    Args:
+        fragment (str): El fragmento con los marcadores MARK_START/MARK_END.
+    Returns:
+        str: HTML seguro para mostrar en el frontend.
+    """
+    if not fragment:
+        return ""
+    escaped = html.escape(fragment)
+    return escaped.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def search_tickets(query, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Busca tickets por tema, descripción y solución, ordenados por relevancia.
+    Args:
+        query (str): El texto de búsqueda.
+        limit (int, opcional): Número máximo de resultados.
+    Returns:
+        list: Una lista de diccionarios con las claves id, fecha_creacion, tema, estado,
+              especialista_nombre, rank (mayor es más relevante) y los fragmentos
+              descripcion_fragmento y solucion_fragmento en HTML.
+    """
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    backend = get_search_backend()
+
+    if backend == "fts5":
+        match = build_fts5_query(query)
+        if not match:
+            return []
+        rows = db.session.execute(
+            text(
+                "SELECT t.id, t.fecha_creacion, t.tema, t.estado, t.especialista_nombre, "
+                "bm25(ticket_fts, 3.0, 1.0, 1.0) AS rank, "
+                "snippet(ticket_fts, 1, :start, :end, '…', 24) AS descripcion_fragmento, "
+                "snippet(ticket_fts, 2, :start, :end, '…', 24) AS solucion_fragmento "
+                "FROM ticket_fts JOIN ticket t ON t.id = ticket_fts.rowid "
+                "WHERE ticket_fts MATCH :match "
+                "ORDER BY rank LIMIT :limit"
+            ),
+            {"match": match, "start": MARK_START, "end": MARK_END, "limit": limit}
+        ).mappings().all()
+        # bm25 devuelve valores negativos: cuanto menor, más relevante
+        return [_result_to_dict(row, -row["rank"]) for row in rows]
+
+    if backend == "postgresql":
+        headline_options = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=35, MinWords=15"
+        rows = db.session.execute(
+            text(
+                "SELECT t.id, t.fecha_creacion, t.tema, t.estado, t.especialista_nombre, "
+                "ts_rank(t.search_vector, q) AS rank, "
+                "ts_headline('spanish', t.descripcion_caso, q, :options) AS descripcion_fragmento, "
+                "ts_headline('spanish', COALESCE(t.solucion_caso, ''), q, :options) AS solucion_fragmento "
+                "FROM ticket t, websearch_to_tsquery('spanish', :query) q "
+                "WHERE t.search_vector @@ q "
+                "ORDER BY rank DESC LIMIT :limit"
+            ),
+            {"query": query, "options": headline_options, "limit": limit}
+        ).mappings().all()
+        return [_result_to_dict(row, row["rank"]) for row in rows]
+
+    # Sin índice de texto completo: búsqueda secuencial sin ranking. Los comodines % y _
+    # escritos por el usuario se buscan literalmente.
+    pattern = f"%{escape_like(query)}%"
+    rows = db.session.execute(
+        select(
+            Ticket.id, Ticket.fecha_creacion, Ticket.tema, Ticket.estado, Ticket.especialista_nombre,
+            func.substr(Ticket.descripcion_caso, 1, 200).label("descripcion_fragmento"),
+            func.substr(func.coalesce(Ticket.solucion_caso, ""), 1, 200).label("solucion_fragmento")
+        )
+        .where(or_(
+            Ticket.tema.like(pattern, escape="\\"),
+            Ticket.descripcion_caso.like(pattern, escape="\\"),
+            Ticket.solucion_caso.like(pattern, escape="\\")
+        ))
+        .order_by(Ticket.fecha_creacion.desc())
+        .limit(limit)
+    ).mappings().all()
+    return [_result_to_dict(row, 0) for row in rows]
+
+
+def escape_like(value):
+    """
+    Escapa los comodines de LIKE (% y _) y el carácter de escape (\\) de un texto.
+    """
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _result_to_dict(row, rank):
+    """
+    Serializa una fila del resultado de búsqueda.
+    """
+    fecha_creacion = row["fecha_creacion"]
+    if fecha_creacion is not None and not isinstance(fecha_creacion, str):
+        fecha_creacion = fecha_creacion.isoformat()
+    return {
+        "id": row["id"],
+        "fecha_creacion": fecha_creacion,
+        "tema": row["tema"],
+        "estado": row["estado"],
+        "especialista_nombre": row["especialista_nombre"],
+        "rank": rank,
+        "descripcion_fragmento": highlight(row["descripcion_fragmento"]),
+        "solucion_fragmento": highlight(row["solucion_fragmento"])
+    }
@@ -0,0 +1,167 @@
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.ticket_model import Ticket
+from app.models.ticket_stat_model import TicketStat
+
+
+# Dimensiones por las que se agrupan las estadísticas de tickets
+STAT_DIMENSIONS = ("estado", "especialista_email", "tema")
+
+# Calificaciones que se promedian en cada grupo
+RATING_FIELDS = ("actitud", "respuesta", "tiempo_de_respuesta")
+
+COUNTER_COLUMNS = ("total",) + tuple(
+    column for field in RATING_FIELDS for column in (f"suma_{field}", f"conteo_{field}")
+)
+
+
+def _to_int(value):
+    """
+    Convierte una calificación a entero; devuelve None si no es un número.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def ticket_stats_snapshot(ticket):
+    """
+    Captura los valores de un ticket que afectan las estadísticas.
+    Debe llamarse antes de modificar el ticket, para poder descontar su aporte anterior.
+    Args:
+        ticket (Ticket): El ticket.
+    Returns:
+        dict: Los valores de las dimensiones y las calificaciones del ticket.
+    """
+    snapshot = {dimension: getattr(ticket, dimension) or '' for dimension in STAT_DIMENSIONS}
+    for field in RATING_FIELDS:
+        snapshot[field] = _to_int(getattr(ticket, field))
+    return snapshot
+
+
+def _contribution(snapshot):
+    """
+    Calcula lo que aporta un ticket a los contadores de cada uno de sus grupos.
+    """
+    counters = {"total": 1}
+    for field in RATING_FIELDS:
+        value = snapshot[field]
+        counters[f"suma_{field}"] = value or 0
+        counters[f"conteo_{field}"] = 0 if value is None else 1
+    return counters
+
+
+def _groups(snapshot):
+    """
+    Devuelve los grupos (dimension, valor) a los que pertenece un ticket.
+    """
+    return [("total", "")] + [(dimension, snapshot[dimension]) for dimension in STAT_DIMENSIONS]
+
+
+def apply_ticket_stats_change(old, new):
+    """
+    Actualiza las estadísticas con el cambio de un ticket, en la transacción actual.
+    Se descuenta el aporte del estado anterior y se suma el del nuevo, por lo que el costo
+    depende del número de grupos afectados y no del número de tickets.
+    Args:
+        old (dict o None): Snapshot del ticket antes del cambio; None si el ticket es nuevo.
+        new (dict o None): Snapshot del ticket después del cambio; None si se elimina.
+    """
+    deltas = {}
+    for snapshot, sign in ((old, -1), (new, 1)):
+        if snapshot is None:
+            continue
+        contribution = _contribution(snapshot)
+        for group in _groups(snapshot):
+            group_deltas = deltas.setdefault(group, dict.fromkeys(COUNTER_COLUMNS, 0))
+            for column, value in contribution.items():
+                group_deltas[column] += sign * value
+
+    for (dimension, valor), group_deltas in deltas.items():
+        if any(group_deltas.values()):
+            _increment(dimension, valor, group_deltas)
+
+
+def _increment(dimension, valor, group_deltas):
+    """
+    Suma los deltas a los contadores de un grupo, creándolo si no existe.
+    El incremento se hace en el propio UPDATE para que dos transacciones concurrentes
+    no se pisen. Si otra transacción crea el grupo al mismo tiempo, se reintenta el UPDATE.
+    """
+    statement = (
+        update(TicketStat)
+        .where(TicketStat.dimension == dimension, TicketStat.valor == valor)
+        .values({column: getattr(TicketStat, column) + delta for column, delta in group_deltas.items()})
+    )
+    if db.session.execute(statement).rowcount:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(TicketStat(dimension=dimension, valor=valor, **group_deltas))
+    except IntegrityError:
+        db.session.execute(statement)
+
+
+def rebuild_ticket_stats():
+    """
+    Recalcula todas las estadísticas a partir de la tabla de tickets.
+    Se usa para llenar el acumulado la primera vez o para corregirlo (flask tickets rebuild-stats).
+    No confirma la transacción.
+    """
+    TicketStat.query.delete()
+
+    aggregates = [func.count(Ticket.id)]
+    for field in RATING_FIELDS:
+        column = getattr(Ticket, field)
+        aggregates += [func.coalesce(func.sum(column), 0), func.count(column)]
+
+    groups = [("total", None)] + [(dimension, getattr(Ticket, dimension)) for dimension in STAT_DIMENSIONS]
+    for dimension, column in groups:
+        if column is None:
+            rows = [("",) + tuple(row) for row in db.session.query(*aggregates).all()]
+        else:
+            rows = db.session.query(func.coalesce(column, ''), *aggregates).group_by(func.coalesce(column, '')).all()
+        for row in rows:
+            if not row[1]:
+                continue
+            db.session.add(TicketStat(
+                dimension=dimension,
+                valor=row[0],
+                **dict(zip(COUNTER_COLUMNS, row[1:]))
+            ))
+
+
+def _stat_to_dict(stat):
+    """
+    Serializa un acumulado con sus promedios.
+    """
+    stat_info = {"valor": stat.valor, "total": stat.total}
+    for field in RATING_FIELDS:
+        count = getattr(stat, f"conteo_{field}")
+        stat_info[f"promedio_{field}"] = round(getattr(stat, f"suma_{field}") / count, 2) if count else None
+    return stat_info
+
+
+def get_ticket_stats():
+    """
+    Devuelve las estadísticas de tickets agrupadas por dimensión.
+    Returns:
+        dict: {"total": {...}, "por_estado": [...], "por_especialista_email": [...], "por_tema": [...]}.
+              Cada grupo incluye valor, total y los promedios de actitud, respuesta y
+              tiempo_de_respuesta (None si no hay calificaciones).
+    """
+    stats = {"total": {"valor": "", "total": 0, **{f"promedio_{field}": None for field in RATING_FIELDS}}}
+    for dimension in STAT_DIMENSIONS:
+        stats[f"por_{dimension}"] = []
+
+    rows = TicketStat.query.filter(TicketStat.total > 0).order_by(TicketStat.total.desc(), TicketStat.valor).all()
+    for stat in rows:
+        if stat.dimension == "total":
+            stats["total"] = _stat_to_dict(stat)
+        elif stat.dimension in STAT_DIMENSIONS:
+            stats[f"por_{stat.dimension}"].append(_stat_to_dict(stat))
+    return stats
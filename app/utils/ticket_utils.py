@@ -0,0 +1,332 @@
+import base64
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import load_only
+
+from app.models.ticket_model import Ticket
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Número de filas que se leen de la base de datos por lote al recorrer toda la tabla
+STREAM_BATCH_SIZE = 500
+
+# Filtros de igualdad aceptados en la consulta de tickets (parámetro -> columna)
+EQUALITY_FILTERS = {
+    "estado": Ticket.estado,
+    "tema": Ticket.tema,
+    "especialista_email": Ticket.especialista_email,
+    "tercero_email": Ticket.tercero_email,
+}
+
+
+# Campos que puede devolver el listado de tickets, en el orden de la respuesta
+TICKET_LIST_FIELDS = (
+    "id",
+    "fecha_creacion",
+    "tema",
+    "estado",
+    "tercero_nombre",
+    "tercero_email",
+    "especialista_nombre",
+    "especialista_email",
+    "descripcion_caso",
+    "solucion_caso",
+    "tiempo_de_respuesta",
+    "actitud",
+    "respuesta",
+    "fecha_finalizacion",
+)
+
+# Columnas de texto sin límite que solo se devuelven en el detalle de un ticket
+# cuando se usa la vista resumida
+LARGE_TEXT_FIELDS = ("descripcion_caso", "solucion_caso")
+
+SUMMARY_FIELDS = tuple(field for field in TICKET_LIST_FIELDS if field not in LARGE_TEXT_FIELDS)
+
+# Columnas que siempre se cargan porque las necesita la paginación
+REQUIRED_FIELDS = ("id", "fecha_creacion")
+
+DATE_FIELDS = ("fecha_creacion", "fecha_finalizacion")
+
+
+class InvalidQueryError(ValueError):
+    """
+    Error lanzado cuando los parámetros de consulta de tickets no son válidos.
+    """
+
+
+def parse_date_param(value, name):
+    """
+    Convierte un parámetro de fecha en formato ISO ("YYYY-MM-DD" o "YYYY-MM-DDTHH:MM:SS") a datetime.
+    Args:
+        value (str): El valor recibido en la consulta.
+        name (str): El nombre del parámetro, usado en el mensaje de error.
+    Returns:
+        datetime: La fecha interpretada.
+    Raises:
+        InvalidQueryError: Si el valor no tiene un formato de fecha válido.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise InvalidQueryError(f"Fecha inválida en el parámetro {name}: {value}")
+
+
+def apply_ticket_filters(query, args):
+    """
+    Aplica a la consulta los filtros del listado de tickets.
+    Filtros soportados:
+        - estado, tema, especialista_email, tercero_email: igualdad exacta.
+        - fecha_desde: tickets creados a partir de esta fecha (incluida).
+        - fecha_hasta: tickets creados hasta esta fecha. Si solo se indica el día,
+          se incluye el día completo.
+    Args:
+        query (Query): La consulta sobre el modelo Ticket.
+        args (MultiDict): Los parámetros de la solicitud (request.args).
+    Returns:
+        Query: La consulta filtrada.
+    Raises:
+        InvalidQueryError: Si alguna fecha no es válida.
+    """
+    for param, column in EQUALITY_FILTERS.items():
+        value = args.get(param)
+        if value:
+            query = query.filter(column == value)
+
+    fecha_desde = args.get("fecha_desde")
+    if fecha_desde:
+        query = query.filter(Ticket.fecha_creacion >= parse_date_param(fecha_desde, "fecha_desde"))
+
+    fecha_hasta = args.get("fecha_hasta")
+    if fecha_hasta:
+        hasta = parse_date_param(fecha_hasta, "fecha_hasta")
+        if len(fecha_hasta) == 10:
+            # Solo se indicó el día: incluir hasta el final de ese día
+            query = query.filter(Ticket.fecha_creacion < hasta + timedelta(days=1))
+        else:
+            query = query.filter(Ticket.fecha_creacion <= hasta)
+
+    return query
+
+
+def encode_cursor(ticket):
+    """
+    Genera el cursor opaco que apunta a la posición de un ticket en el listado.
+    Args:
+        ticket (Ticket): El último ticket devuelto en la página.
+    Returns:
+        str: El cursor codificado en base64 seguro para URL.
+    """
+    payload = json.dumps({"f": ticket.fecha_creacion.isoformat(), "i": ticket.id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """
+    Decodifica un cursor generado por encode_cursor.
+    Args:
+        cursor (str): El cursor recibido en la consulta.
+    Returns:
+        tuple: (fecha_creacion, id) del último ticket de la página anterior.
+    Raises:
+        InvalidQueryError: Si el cursor no es válido.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(payload["f"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidQueryError("Cursor inválido")
+
+
+def paginate_tickets(query, args):
+    """
+    Pagina la consulta por conjunto de claves (keyset) sobre (fecha_creacion, id).
+    Los tickets se ordenan del más reciente al más antiguo. En lugar de usar OFFSET,
+    cada página continúa a partir del último ticket de la anterior, por lo que el costo
+    de una página no depende de su posición en el listado.
+    Args:
+        query (Query): La consulta ya filtrada sobre el modelo Ticket.
+        args (MultiDict): Los parámetros de la solicitud; se usan "limit" y "cursor".
+    Returns:
+        tuple: (tickets, next_cursor). next_cursor es None cuando no hay más páginas.
+    Raises:
+        InvalidQueryError: Si el límite o el cursor no son válidos.
+    """
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise InvalidQueryError("El parámetro limit debe ser un número entero")
+    if limit < 1:
+        raise InvalidQueryError("El parámetro limit debe ser mayor que cero")
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    cursor = args.get("cursor")
+    if cursor:
+        fecha, ticket_id = decode_cursor(cursor)
+        # Comparación de filas: permite que el índice de fecha_creacion se use como rango
+        query = query.filter(tuple_(Ticket.fecha_creacion, Ticket.id) < tuple_(fecha, ticket_id))
+
+    # Se pide un registro adicional para saber si existe una página siguiente
+    tickets = query.order_by(Ticket.fecha_creacion.desc(), Ticket.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(tickets) > limit:
+        tickets = tickets[:limit]
+        next_cursor = encode_cursor(tickets[-1])
+    return tickets, next_cursor
+
+
+def parse_fields(args):
+    """
+    Determina qué campos debe incluir el listado de tickets.
+    Parámetros soportados:
+        - view=summary: todos los campos excepto descripcion_caso y solucion_caso.
+        - fields=campo1,campo2: solo los campos indicados (id siempre se incluye).
+    Args:
+        args (MultiDict): Los parámetros de la solicitud (request.args).
+    Returns:
+        tuple o None: Los campos a devolver, o None para devolver todos.
+    Raises:
+        InvalidQueryError: Si la vista o alguno de los campos no existe.
+    """
+    fields_param = args.get("fields")
+    if fields_param:
+        requested = [field.strip() for field in fields_param.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in TICKET_LIST_FIELDS]
+        if unknown:
+            raise InvalidQueryError(f"Campos desconocidos: {', '.join(unknown)}")
+        return tuple(field for field in TICKET_LIST_FIELDS if field == "id" or field in requested)
+
+    view = args.get("view")
+    if view == "summary":
+        return SUMMARY_FIELDS
+    if view and view != "full":
+        raise InvalidQueryError(f"Vista desconocida: {view}")
+    return None
+
+
+def apply_projection(query, fields):
+    """
+    Limita las columnas que la consulta lee de la base de datos.
+    Las columnas que no están en fields quedan diferidas, de modo que el SELECT
+    no las incluye (por ejemplo, los textos largos de la vista resumida).
+    Args:
+        query (Query): La consulta sobre el modelo Ticket.
+        fields (tuple o None): Los campos a cargar; None carga todas las columnas.
+    Returns:
+        Query: La consulta con la proyección aplicada.
+    """
+    if fields is None:
+        return query
+    columns = set(fields) | set(REQUIRED_FIELDS)
+    return query.options(load_only(*[getattr(Ticket, field) for field in TICKET_LIST_FIELDS if field in columns]))
+
+
+def iter_tickets(query, batch_size=STREAM_BATCH_SIZE):
+    """
+    Recorre los tickets de la consulta por lotes, sin cargarlos todos en memoria.
+    Usa yield_per, que en PostgreSQL abre un cursor del lado del servidor, y
+    ordena igual que el listado paginado (del más reciente al más antiguo).
+    Args:
+        query (Query): La consulta ya filtrada y proyectada sobre el modelo Ticket.
+        batch_size (int, opcional): Número de filas por lote.
+    Yields:
+        Ticket: Cada ticket de la consulta.
+    """
+    ordered = query.order_by(Ticket.fecha_creacion.desc(), Ticket.id.desc())
+    yield from ordered.yield_per(batch_size)
+
+
+def iter_tickets_ndjson(query, fields=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Genera el listado de tickets como JSON delimitado por saltos de línea (NDJSON).
+    Cada línea es un ticket serializado con ticket_to_dict. Las líneas se agrupan
+    por lote para no emitir un fragmento HTTP por ticket.
+    Args:
+        query (Query): La consulta ya filtrada y proyectada sobre el modelo Ticket.
+        fields (tuple, opcional): Los campos a incluir en cada ticket.
+        batch_size (int, opcional): Número de tickets por fragmento emitido.
+    Yields:
+        str: Fragmentos de texto con una o más líneas JSON.
+    """
+    lines = []
+    for ticket in iter_tickets(query, batch_size):
+        lines.append(json.dumps(ticket_to_dict(ticket, fields), ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def iter_tickets_csv(query, fields=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Genera el listado de tickets en formato CSV, por fragmentos.
+    La primera fila contiene los nombres de las columnas. El archivo empieza con
+    la marca BOM de UTF-8 para que Excel interprete bien las tildes.
+    Args:
+        query (Query): La consulta ya filtrada y proyectada sobre el modelo Ticket.
+        fields (tuple, opcional): Las columnas a exportar. Por defecto todas.
+        batch_size (int, opcional): Número de filas por fragmento emitido.
+    Yields:
+        str: Fragmentos del archivo CSV.
+    """
+    columns = fields or TICKET_LIST_FIELDS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(columns)
+
+    for count, ticket in enumerate(iter_tickets(query, batch_size), start=1):
+        writer.writerow([getattr(ticket, column) for column in columns])
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_tickets_xlsx(query, path, fields=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Escribe el listado de tickets en un libro de Excel (.xlsx).
+    Usa un libro de solo escritura de openpyxl, que vuelca cada fila a disco a medida
+    que se agrega, por lo que la memoria usada no depende del número de tickets.
+    Args:
+        query (Query): La consulta ya filtrada y proyectada sobre el modelo Ticket.
+        path (str): La ruta del archivo .xlsx a crear.
+        fields (tuple, opcional): Las columnas a exportar. Por defecto todas.
+        batch_size (int, opcional): Número de filas que se leen por lote.
+    """
+    from openpyxl import Workbook
+
+    columns = fields or TICKET_LIST_FIELDS
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Tickets")
+    sheet.append(list(columns))
+    for ticket in iter_tickets(query, batch_size):
+        sheet.append([getattr(ticket, column) for column in columns])
+    workbook.save(path)
+
+
+def ticket_to_dict(ticket, fields=None):
+    """
+    Serializa un ticket con los campos del listado.
+    Args:
+        ticket (Ticket): El ticket a serializar.
+        fields (tuple, opcional): Los campos a incluir. Por defecto se incluyen todos.
+            Solo se accede a estos atributos, para no disparar la carga de columnas diferidas.
+    Returns:
+        dict: Los datos del ticket listos para convertir a JSON.
+    """
+    ticket_info = {}
+    for field in fields or TICKET_LIST_FIELDS:
+        value = getattr(ticket, field)
+        if field in DATE_FIELDS:
+            value = value.isoformat() if value else None
+        ticket_info[field] = value
+    return ticket_info
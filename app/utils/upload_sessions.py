@@ -0,0 +1,319 @@
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+from app.utils.atomic_file import atomic_write
+from app.utils.attachment_store import UPLOAD_PATH, discard_on_commit, remove_when_finished, store_file
+
+
+load_dotenv()  # Cargar variables de entorno
+
+# Tamaño máximo de un archivo subido por sesiones (por defecto 1 GB)
+UPLOAD_SESSION_MAX_SIZE = int(os.getenv('UPLOAD_SESSION_MAX_SIZE', 1024 * 1024 * 1024))
+
+# Segundos tras los cuales se eliminan las sesiones sin usar (por defecto 24 horas)
+UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 3600))
+
+# Segundos tras los cuales se considera abandonado el bloqueo de una sesión (por ejemplo, si
+# el proceso que la estaba usando se detuvo)
+UPLOAD_SESSION_LOCK_TIMEOUT = int(os.getenv('UPLOAD_SESSION_LOCK_TIMEOUT', 3600))
+
+# Carpeta de UPLOAD_PATH con las sesiones. Está en el mismo sistema de archivos que el
+# almacén para poder mover los archivos completos sin copiarlos.
+UPLOAD_SESSION_FOLDER = ".uploads"
+
+WRITE_CHUNK_SIZE = 64 * 1024
+
+_UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadSessionError(ValueError):
+    """
+    Error de una sesión de subida, con el código HTTP con el que se debe responder.
+    """
+
+    def __init__(self, message, status_code=400, offset=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+def _session_path(upload_id, extension):
+    """
+    Devuelve la ruta de un archivo de la sesión: ".json" con sus datos, ".part" con el contenido
+    o ".lock" con el bloqueo de la petición que la está usando.
+    """
+    if not _UPLOAD_ID_PATTERN.match(upload_id or ""):
+        raise UploadSessionError("Sesión de subida no encontrada", 404)
+    return os.path.join(UPLOAD_PATH, UPLOAD_SESSION_FOLDER, f"{upload_id}{extension}")
+
+
+def _save_session(session):
+    """
+    Guarda los datos de la sesión reemplazando el archivo de forma atómica.
+    """
+    atomic_write(_session_path(session["uploadId"], ".json"), json.dumps(session))
+
+
+def _load_session(upload_id):
+    """
+    Lee los datos de una sesión y le agrega el offset actual (bytes recibidos).
+    Raises:
+        UploadSessionError: Si la sesión no existe.
+    """
+    try:
+        with open(_session_path(upload_id, ".json")) as f:
+            session = json.load(f)
+    except FileNotFoundError:
+        raise UploadSessionError("Sesión de subida no encontrada", 404)
+    try:
+        session["offset"] = os.path.getsize(_session_path(upload_id, ".part"))
+    except FileNotFoundError:
+        session["offset"] = 0
+    return session
+
+
+def _lock_session(upload_id):
+    """
+    Reserva la sesión para esta petición creando su archivo ".lock" de forma exclusiva, de modo
+    que dos peticiones no escriban el mismo fragmento ni usen el mismo archivo a la vez.
+    Un bloqueo de más de UPLOAD_SESSION_LOCK_TIMEOUT segundos se considera abandonado.
+    Returns:
+        str: La ruta del bloqueo, que se debe eliminar al terminar.
+    Raises:
+        UploadSessionError: Si la sesión no existe (404) u otra petición la está usando (409).
+    """
+    path = _session_path(upload_id, ".lock")
+    for _ in range(2):
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return path
+        except FileNotFoundError:
+            raise UploadSessionError("Sesión de subida no encontrada", 404)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) < UPLOAD_SESSION_LOCK_TIMEOUT:
+                    break
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # La otra petición terminó: volver a intentarlo
+    raise UploadSessionError("Otra petición está usando la sesión de subida", 409)
+
+
+def _unlock_session(lock_path):
+    try:
+        os.remove(lock_path)
+    except FileNotFoundError:
+        pass
+
+
+def _remove_session_files(upload_id):
+    for extension in (".json", ".part"):
+        try:
+            os.remove(_session_path(upload_id, extension))
+        except FileNotFoundError:
+            pass
+
+
+def remove_expired_upload_sessions():
+    """
+    Elimina las sesiones que no se han modificado en UPLOAD_SESSION_TTL segundos.
+    """
+    folder = os.path.join(UPLOAD_PATH, UPLOAD_SESSION_FOLDER)
+    if not os.path.isdir(folder):
+        return
+    limit = time.time() - UPLOAD_SESSION_TTL
+    for entry in os.scandir(folder):
+        try:
+            if entry.stat().st_mtime < limit:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def create_upload_session(file_name, file_type, size):
+    """
+    Crea una sesión de subida para un archivo del tamaño indicado.
+    Args:
+        file_name (str): El nombre del archivo.
+        file_type (str): El tipo MIME del archivo.
+        size (int): El tamaño total del archivo en bytes.
+    Returns:
+        dict: La sesión, con uploadId, fileName, fileType, size, offset y completed.
+    Raises:
+        UploadSessionError: Si el tamaño no es válido o supera UPLOAD_SESSION_MAX_SIZE.
+    """
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        raise UploadSessionError("El tamaño del archivo debe ser un entero positivo")
+    if size > UPLOAD_SESSION_MAX_SIZE:
+        raise UploadSessionError(
+            f"El archivo excede el tamaño máximo de {UPLOAD_SESSION_MAX_SIZE} bytes", 413
+        )
+
+    remove_expired_upload_sessions()
+    os.makedirs(os.path.join(UPLOAD_PATH, UPLOAD_SESSION_FOLDER), exist_ok=True)
+
+    session = {
+        "uploadId": uuid.uuid4().hex,
+        "fileName": file_name,
+        "fileType": file_type or "application/octet-stream",
+        "size": size,
+        "completed": False,
+        "sha256": None
+    }
+    open(_session_path(session["uploadId"], ".part"), 'wb').close()
+    _save_session(session)
+    session["offset"] = 0
+    return session
+
+
+def get_upload_session(upload_id):
+    """
+    Devuelve el estado de una sesión de subida.
+    Args:
+        upload_id (str): El ID de la sesión.
+    Returns:
+        dict: La sesión, con el offset desde el que se debe enviar el siguiente fragmento.
+    Raises:
+        UploadSessionError: Si la sesión no existe.
+    """
+    return _load_session(upload_id)
+
+
+def write_upload_chunk(upload_id, offset, stream, length):
+    """
+    Escribe un fragmento del archivo en la posición indicada.
+    El offset debe coincidir con los bytes ya recibidos; si no, el cliente debe consultar el
+    estado de la sesión y continuar desde ahí. Si la conexión se corta a mitad del fragmento,
+    lo recibido hasta ese momento se conserva.
+    Args:
+        upload_id (str): El ID de la sesión.
+        offset (int): La posición del fragmento en el archivo.
+        stream: El cuerpo de la petición.
+        length (int): El tamaño del fragmento en bytes.
+    Returns:
+        dict: La sesión actualizada.
+    Raises:
+        UploadSessionError: Si la sesión no existe o ya se completó (404/409), si el offset no
+            coincide u otra petición está escribiendo en la sesión (409), o si el fragmento
+            excede el tamaño del archivo (413).
+    """
+    lock_path = _lock_session(upload_id)
+    try:
+        session = _load_session(upload_id)
+        if session["completed"]:
+            raise UploadSessionError("La sesión de subida ya se completó", 409, session["offset"])
+        if offset != session["offset"]:
+            raise UploadSessionError("El offset no coincide con los bytes recibidos", 409, session["offset"])
+        if offset + length > session["size"]:
+            raise UploadSessionError("El fragmento excede el tamaño del archivo", 413, session["offset"])
+
+        with open(_session_path(upload_id, ".part"), 'r+b') as f:
+            f.seek(offset)
+            remaining = length
+            while remaining > 0:
+                chunk = stream.read(min(WRITE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+            session["offset"] = f.tell()
+
+        # Actualizar la fecha de modificación para que la sesión no expire mientras se usa
+        os.utime(_session_path(upload_id, ".json"))
+    finally:
+        _unlock_session(lock_path)
+    return session
+
+
+def complete_upload_session(upload_id, sha256=None):
+    """
+    Verifica que se recibió el archivo completo y calcula su SHA-256. Desde este momento la
+    sesión puede usarse como anexo en los endpoints de tickets con {"uploadId": upload_id}.
+    Args:
+        upload_id (str): El ID de la sesión.
+        sha256 (str, opcional): El SHA-256 esperado, para verificar el archivo recibido.
+    Returns:
+        dict: La sesión completada, con su sha256.
+    Raises:
+        UploadSessionError: Si la sesión no existe, si el archivo está incompleto u otra petición
+            está usando la sesión (409) o si el SHA-256 no coincide (400; en ese caso la sesión
+            se elimina).
+    """
+    lock_path = _lock_session(upload_id)
+    try:
+        session = _load_session(upload_id)
+        if session["completed"]:
+            return session
+        if session["offset"] != session["size"]:
+            raise UploadSessionError("El archivo aún no se ha recibido completo", 409, session["offset"])
+
+        content_hash = hashlib.sha256()
+        with open(_session_path(upload_id, ".part"), 'rb') as f:
+            for chunk in iter(lambda: f.read(WRITE_CHUNK_SIZE), b''):
+                content_hash.update(chunk)
+
+        if sha256 and sha256.lower() != content_hash.hexdigest():
+            _remove_session_files(upload_id)
+            raise UploadSessionError("El SHA-256 del archivo recibido no coincide")
+
+        session["completed"] = True
+        session["sha256"] = content_hash.hexdigest()
+        _save_session({key: value for key, value in session.items() if key != "offset"})
+    finally:
+        _unlock_session(lock_path)
+    return session
+
+
+def delete_upload_session(upload_id):
+    """
+    Cancela una sesión de subida y elimina lo recibido.
+    Args:
+        upload_id (str): El ID de la sesión.
+    Raises:
+        UploadSessionError: Si la sesión no existe (404) u otra petición la está usando (409).
+    """
+    lock_path = _lock_session(upload_id)
+    try:
+        _load_session(upload_id)
+        _remove_session_files(upload_id)
+    finally:
+        _unlock_session(lock_path)
+
+
+def store_upload_session(upload_id, file_type=None):
+    """
+    Mueve el archivo de una sesión completada al almacén de anexos, en la transacción actual.
+    La sesión se elimina al confirmar la transacción; si se revierte, el archivo vuelve a la
+    sesión y el cliente puede volver a usar el mismo uploadId. La sesión queda bloqueada hasta
+    que termina la transacción, de modo que dos peticiones no pueden usar el mismo uploadId.
+    Args:
+        upload_id (str): El ID de la sesión.
+        file_type (str, opcional): El tipo MIME del anexo; por defecto el de la sesión.
+    Returns:
+        dict: La sesión, con fileName, fileType, size y sha256.
+    Raises:
+        UploadSessionError: Si la sesión no existe (404), o si no se ha completado, ya se usó u
+            otra petición la está usando (409).
+    """
+    lock_path = _lock_session(upload_id)
+    try:
+        session = _load_session(upload_id)
+        if not session["completed"]:
+            raise UploadSessionError("La sesión de subida no se ha completado", 409, session["offset"])
+        if not os.path.exists(_session_path(upload_id, ".part")):
+            raise UploadSessionError("La sesión de subida ya se usó", 409)
+
+        store_file(_session_path(upload_id, ".part"), session["sha256"], session["size"],
+                   restore_on_rollback=True, file_type=file_type or session["fileType"])
+    except BaseException:
+        _unlock_session(lock_path)
+        raise
+    discard_on_commit(_session_path(upload_id, ".json"))
+    remove_when_finished(lock_path)
+    return session
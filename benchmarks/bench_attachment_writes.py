@@ -0,0 +1,81 @@
+"""
+Mide cuántos anexos por segundo se pueden escribir en disco con:
+
+- probe: la estrategia anterior de get_safe_file_path (os.makedirs, escribir b'test' en el
+  destino, eliminarlo y abrirlo de nuevo para escribir el contenido real).
+- atomic: app.utils.atomic_file.atomic_write (temporal con O_EXCL y renombrado).
+- atomic+fsync: atomic_write con fsync del archivo y de la carpeta.
+
+Los anexos se escriben con la misma distribución de carpetas del almacén de anexos
+(blobs/aa/bb/<sha256>).
+
+Uso:
+    python benchmarks/bench_attachment_writes.py
+    python benchmarks/bench_attachment_writes.py --files 5000 --size 65536 --dir /tmp/bench
+"""
+import argparse
+import hashlib
+import importlib.util
+import os
+import shutil
+import tempfile
+import time
+
+
+def load_atomic_file():
+    """
+    Carga app/utils/atomic_file.py sin importar el paquete app (que inicia la aplicación Flask).
+    """
+    path = os.path.join(os.path.dirname(__file__), "..", "app", "utils", "atomic_file.py")
+    spec = importlib.util.spec_from_file_location("atomic_file", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def probe_write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'test')
+    os.remove(path)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def run(name, write, contents, base_dir):
+    target = os.path.join(base_dir, name.replace("+", "_"))
+    shutil.rmtree(target, ignore_errors=True)
+    start = time.perf_counter()
+    for content in contents:
+        sha256 = hashlib.sha256(content).hexdigest()
+        write(os.path.join(target, "blobs", sha256[:2], sha256[2:4], sha256), content)
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(target, ignore_errors=True)
+    print(f"{name:<14} {len(contents) / elapsed:>10.0f} anexos/s  ({elapsed * 1000:.0f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000, help="Número de anexos a escribir")
+    parser.add_argument("--size", type=int, default=200 * 1024, help="Tamaño de cada anexo en bytes")
+    parser.add_argument("--dir", default=None, help="Carpeta donde escribir (por defecto, una temporal)")
+    args = parser.parse_args()
+
+    atomic_file = load_atomic_file()
+    base_dir = args.dir or tempfile.mkdtemp(prefix="bench_attachments_")
+    # Contenidos distintos para que cada anexo vaya a su propio archivo
+    prefix = os.urandom(args.size)
+    contents = [i.to_bytes(8, "big") + prefix[8:] for i in range(args.files)]
+
+    print(f"{args.files} anexos de {args.size} bytes en {base_dir}")
+    try:
+        run("probe", probe_write, contents, base_dir)
+        run("atomic", atomic_file.atomic_write, contents, base_dir)
+        run("atomic+fsync", lambda path, content: atomic_file.atomic_write(path, content, fsync=True), contents, base_dir)
+    finally:
+        if not args.dir:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Mide el costo de generar el cuerpo de los correos de aviso (texto plano y HTML, envuelto en el
+diseño común) con:
+
+- fstring: la estrategia anterior, f-strings en ticket_routes.py y send_email (sin escapar el
+  texto de los usuarios y solo en HTML).
+- jinja sin caché: compilar las plantillas de app/templates/emails en cada correo.
+- jinja: app.utils.email_templates, con las plantillas compiladas una sola vez.
+- jinja sin recarga: igual, con EMAIL_TEMPLATES_AUTO_RELOAD=False (sin revisar si las
+  plantillas cambiaron en disco).
+
+También mide el primer uso de las plantillas en un proceso nuevo (compilarlas, o cargarlas
+de la caché de código compilado en disco).
+
+Uso:
+    python benchmarks/bench_email_templates.py
+    python benchmarks/bench_email_templates.py --messages 20000
+"""
+import argparse
+import importlib.util
+import os
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+
+
+def load_email_templates():
+    """
+    Carga app/utils/email_templates.py sin importar el paquete app (que inicia la aplicación Flask).
+    """
+    path = os.path.join(os.path.dirname(__file__), "..", "app", "utils", "email_templates.py")
+    spec = importlib.util.spec_from_file_location("email_templates", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_ticket(i):
+    return SimpleNamespace(
+        id=i,
+        codigo_seguridad=10000 + i % 90000,
+        tema="Impresora",
+        tercero_nombre=f"Tercero {i}",
+        especialista_nombre="Especialista de soporte",
+        descripcion_caso="La impresora del segundo piso no imprime.\n" * 5,
+        solucion_caso="Se cambió el tóner & se reinició el equipo."
+    )
+
+
+def render_fstring(ticket, frontend_url):
+    email_body = f"""
+        <h2>Ticket creado para {ticket.tercero_nombre}</h2>
+        <p>Cordial saludo {ticket.tercero_nombre},</p>
+        <p>Para consultar el estado de su ticket ingrese a <a href="{frontend_url}historial">{frontend_url}historial</a> y digite el ID del ticket</p>
+        <p>Se ha creado un nuevo ticket con la siguiente descripción:</p>
+        <ul>
+            <li>ID de ticket: {ticket.id}</li>
+            <li>Código de verificación: {ticket.codigo_seguridad}</li>
+            <li>Tema: {ticket.tema}</li>
+        </ul>
+        <h3>Descripción:</h3>
+        <p>{ticket.descripcion_caso}</p>
+        <p>El especialista {ticket.especialista_nombre} lo atenderá lo más pronto posible</p>
+        <p>Tenga en cuenta que los casos los especialistas los atienden en orden de llegada</p>
+        <p>Atentamente,<br>Soporte TICS</p>
+        """
+    return f"""
+    <html>
+        <body>
+            {email_body}
+            <br><br>
+            {''.join([f'<img src="cid:image{i}" style="max-width:100%;">' for i in range(0)])}
+        </body>
+    </html>
+    """
+
+
+def render_uncached(email_templates, ticket, frontend_url):
+    environment = email_templates.create_environment(cache_dir="off", auto_reload=False)
+    environment.cache = None  # Sin caché de plantillas en memoria: se compilan en cada correo
+    subject, text_body, html_body = render_templates(environment, ticket, frontend_url)
+    html = environment.get_template("base.html").render(body=email_templates.Markup(html_body), image_count=0, links=[])
+    text = environment.get_template("base.txt").render(body=text_body, links=[])
+    return subject, text, html
+
+
+def render_templates(environment, ticket, frontend_url):
+    text_module = environment.get_template("ticket_creado.txt").make_module(
+        {"ticket": ticket, "frontend_url": frontend_url}
+    )
+    html = environment.get_template("ticket_creado.html").render(ticket=ticket, frontend_url=frontend_url)
+    return str(text_module.subject), str(text_module), html
+
+
+def render_cached(email_templates, ticket, frontend_url):
+    subject, text_body, html_body = email_templates.render_email(
+        "ticket_creado", ticket=ticket, frontend_url=frontend_url
+    )
+    html, text = email_templates.render_layout(html_body, text_body)
+    return subject, text, html
+
+
+def run(name, render, tickets):
+    start = time.perf_counter()
+    for ticket in tickets:
+        render(ticket)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<18} {elapsed / len(tickets) * 1e6:>10.1f} µs/correo  ({len(tickets) / elapsed:,.0f} correos/s)")
+
+
+def first_use(email_templates, cache_dir):
+    environment = email_templates.create_environment(cache_dir=cache_dir)
+    start = time.perf_counter()
+    for name in ("base.html", "base.txt", "ticket_creado.html", "ticket_creado.txt",
+                 "ticket_finalizado.html", "ticket_finalizado.txt"):
+        environment.get_template(name)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000, help="Número de correos a generar")
+    args = parser.parse_args()
+
+    email_templates = load_email_templates()
+    frontend_url = "https://mintickets.example.com/"
+    tickets = [make_ticket(i) for i in range(args.messages)]
+    # Calentar la caché en memoria del entorno del proceso
+    render_cached(email_templates, tickets[0], frontend_url)
+
+    print(f"{args.messages} correos de ticket creado")
+    run("fstring", lambda ticket: render_fstring(ticket, frontend_url), tickets)
+    run("jinja sin caché", lambda ticket: render_uncached(email_templates, ticket, frontend_url),
+        tickets[:max(1, args.messages // 10)])
+    run("jinja", lambda ticket: render_cached(email_templates, ticket, frontend_url), tickets)
+    email_templates._environment = email_templates.create_environment(auto_reload=False)
+    run("jinja sin recarga", lambda ticket: render_cached(email_templates, ticket, frontend_url), tickets)
+
+    cache_dir = tempfile.mkdtemp(prefix="bench_email_templates_")
+    try:
+        print("Primer uso de las plantillas en un proceso nuevo:")
+        print(f"{'sin caché en disco':<18} {first_use(email_templates, 'off'):>10.1f} ms")
+        first_use(email_templates, cache_dir)  # Llenar la caché en disco
+        print(f"{'con caché en disco':<18} {first_use(email_templates, cache_dir):>10.1f} ms")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Compara el plan de ejecución y la latencia de las consultas más frecuentes de tickets
+antes y después de crear los índices de la migración 1168d103f17e.
+
+El benchmark genera una base de datos SQLite sintética con el mismo esquema de las tablas
+ticket, ticket_attachment_descripcion y ticket_attachment_respuesta (sin índices secundarios),
+mide cada consulta, crea los índices y vuelve a medir.
+
+Uso:
+    python benchmarks/bench_ticket_indexes.py
+    python benchmarks/bench_ticket_indexes.py --tickets 200000 --repeat 20 --db /tmp/bench.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+SCHEMA = """
+CREATE TABLE ticket (
+    id INTEGER PRIMARY KEY,
+    fecha_creacion DATETIME NOT NULL,
+    fecha_finalizacion DATETIME,
+    tema VARCHAR(255) NOT NULL,
+    estado VARCHAR(50) NOT NULL,
+    tercero_nombre VARCHAR(120),
+    tercero_email VARCHAR(120),
+    especialista_nombre VARCHAR(120),
+    especialista_email VARCHAR(120),
+    descripcion_caso TEXT NOT NULL,
+    solucion_caso TEXT,
+    tiempo_de_respuesta INTEGER,
+    actitud INTEGER,
+    respuesta INTEGER,
+    codigo_seguridad INTEGER
+);
+CREATE TABLE ticket_attachment_descripcion (
+    id INTEGER PRIMARY KEY,
+    ticket_id INTEGER NOT NULL REFERENCES ticket (id),
+    file_name VARCHAR(255) NOT NULL,
+    file_type VARCHAR(50) NOT NULL,
+    file_content BLOB NOT NULL,
+    is_description_file BOOLEAN
+);
+CREATE TABLE ticket_attachment_respuesta (
+    id INTEGER PRIMARY KEY,
+    ticket_id INTEGER NOT NULL REFERENCES ticket (id),
+    file_name VARCHAR(255) NOT NULL,
+    file_type VARCHAR(50) NOT NULL,
+    file_content BLOB NOT NULL,
+    is_description_file BOOLEAN
+);
+"""
+
+# Mismos índices que crea la migración 1168d103f17e
+INDEXES = """
+CREATE INDEX ix_ticket_estado ON ticket (estado);
+CREATE INDEX ix_ticket_especialista_email ON ticket (especialista_email);
+CREATE INDEX ix_ticket_tercero_email ON ticket (tercero_email);
+CREATE INDEX ix_ticket_fecha_creacion ON ticket (fecha_creacion);
+CREATE INDEX ix_ticket_attachment_descripcion_ticket_id ON ticket_attachment_descripcion (ticket_id);
+CREATE INDEX ix_ticket_attachment_respuesta_ticket_id ON ticket_attachment_respuesta (ticket_id);
+"""
+
+ESTADOS = ["Abierto", "En proceso", "Solucionado", "Devuelto", "Cerrado"]
+TEMAS = ["Impresora", "Red", "Correo", "Software", "Hardware", "Accesos", "Telefonía", "Otro"]
+
+
+def build_database(path, tickets, seed=42):
+    """
+    Crea la base de datos sintética con el número de tickets indicado.
+    Uno de cada cuatro tickets tiene un anexo de descripción y uno de cada ocho un anexo de respuesta.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+
+    start = datetime(2020, 1, 1)
+    especialistas = [f"especialista{i}@mindeporte.gov.co" for i in range(40)]
+    batch, descripciones, respuestas = [], [], []
+    for ticket_id in range(1, tickets + 1):
+        fecha = start + timedelta(seconds=ticket_id * 150 + rng.randint(0, 120))
+        batch.append((
+            ticket_id,
+            fecha.isoformat(sep=" "),
+            rng.choice(TEMAS),
+            rng.choices(ESTADOS, weights=[5, 10, 70, 5, 10])[0],
+            f"Tercero {ticket_id % 5000}",
+            f"tercero{ticket_id % 5000}@mindeporte.gov.co",
+            "Especialista",
+            rng.choice(especialistas),
+            "Descripción del caso " * rng.randint(5, 40),
+            "Solución del caso " * rng.randint(0, 20),
+        ))
+        if ticket_id % 4 == 0:
+            descripciones.append((ticket_id, f"captura_{ticket_id}.png", "image/png", b"x" * 64, 1))
+        if ticket_id % 8 == 0:
+            respuestas.append((ticket_id, f"solucion_{ticket_id}.pdf", "application/pdf", b"x" * 64, 0))
+
+        if len(batch) >= 50000:
+            _flush(conn, batch, descripciones, respuestas)
+            batch, descripciones, respuestas = [], [], []
+    _flush(conn, batch, descripciones, respuestas)
+    conn.commit()
+    return conn
+
+
+def _flush(conn, batch, descripciones, respuestas):
+    conn.executemany(
+        "INSERT INTO ticket (id, fecha_creacion, tema, estado, tercero_nombre, tercero_email, "
+        "especialista_nombre, especialista_email, descripcion_caso, solucion_caso) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        batch
+    )
+    conn.executemany(
+        "INSERT INTO ticket_attachment_descripcion (ticket_id, file_name, file_type, file_content, is_description_file) "
+        "VALUES (?, ?, ?, ?, ?)",
+        descripciones
+    )
+    conn.executemany(
+        "INSERT INTO ticket_attachment_respuesta (ticket_id, file_name, file_type, file_content, is_description_file) "
+        "VALUES (?, ?, ?, ?, ?)",
+        respuestas
+    )
+
+
+def queries(tickets):
+    """
+    Consultas representativas de las rutas de tickets, con parámetros fijos.
+    """
+    middle = datetime(2020, 1, 1) + timedelta(seconds=tickets * 75)
+    return [
+        ("listado por estado (primera página)",
+         "SELECT id, fecha_creacion, tema, estado FROM ticket WHERE estado = ? "
+         "ORDER BY fecha_creacion DESC, id DESC LIMIT 50",
+         ("Devuelto",)),
+        ("listado por especialista",
+         "SELECT id, fecha_creacion, tema, estado FROM ticket WHERE especialista_email = ? "
+         "ORDER BY fecha_creacion DESC, id DESC LIMIT 50",
+         ("especialista7@mindeporte.gov.co",)),
+        ("historial de un tercero",
+         "SELECT id, fecha_creacion, tema, estado FROM ticket WHERE tercero_email = ?",
+         ("tercero1234@mindeporte.gov.co",)),
+        ("rango de fechas (un día)",
+         "SELECT COUNT(*) FROM ticket WHERE fecha_creacion >= ? AND fecha_creacion < ?",
+         (middle.isoformat(sep=" "), (middle + timedelta(days=1)).isoformat(sep=" "))),
+        ("página intermedia por cursor",
+         "SELECT id, fecha_creacion, tema, estado FROM ticket "
+         "WHERE (fecha_creacion, id) < (?, ?) "
+         "ORDER BY fecha_creacion DESC, id DESC LIMIT 50",
+         (middle.isoformat(sep=" "), tickets // 2)),
+        ("anexos de descripción de un ticket",
+         "SELECT id, file_name, file_type FROM ticket_attachment_descripcion WHERE ticket_id = ?",
+         (tickets // 2,)),
+        ("anexos de respuesta de un ticket",
+         "SELECT id, file_name, file_type FROM ticket_attachment_respuesta WHERE ticket_id = ?",
+         (tickets // 2,)),
+    ]
+
+
+def measure(conn, sql, params, repeat):
+    """
+    Devuelve el plan de ejecución y la mediana de latencia en milisegundos.
+    """
+    plan = " | ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return plan, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=1_000_000, help="número de tickets sintéticos")
+    parser.add_argument("--repeat", type=int, default=10, help="repeticiones por consulta")
+    parser.add_argument("--db", help="ruta de la base de datos (por defecto, un archivo temporal)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "bench_tickets.db")
+    if os.path.exists(path):
+        os.remove(path)
+
+    print(f"Generando {args.tickets} tickets en {path} ...")
+    start = time.perf_counter()
+    conn = build_database(path, args.tickets)
+    print(f"Base de datos creada en {time.perf_counter() - start:.1f} s\n")
+
+    cases = queries(args.tickets)
+    before = [measure(conn, sql, params, args.repeat) for _, sql, params in cases]
+
+    conn.executescript(INDEXES)
+    conn.execute("ANALYZE")
+    after = [measure(conn, sql, params, args.repeat) for _, sql, params in cases]
+
+    for (name, _, _), (plan_before, ms_before), (plan_after, ms_after) in zip(cases, before, after):
+        print(f"{name}")
+        print(f"  antes:   {ms_before:9.3f} ms  {plan_before}")
+        print(f"  después: {ms_after:9.3f} ms  {plan_after}")
+        print(f"  mejora:  {ms_before / ms_after if ms_after else float('inf'):9.1f}x\n")
+
+    conn.close()
+    if not args.db:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
+from werkzeug.serving import is_running_from_reloader
+
 from app import app
+from app.utils.email_outbox import start_worker
 """
 Este script ejecuta la aplicación Flask definida en el módulo `app`.
 La aplicación está configurada para ejecutarse en todas las direcciones IP disponibles (host='0.0.0.0')
@@ -14,4 +17,9 @@ Atributos:
 """
 
 if __name__ == '__main__':
+    # Iniciar el envío de correos al arrancar, para que los que quedaron pendientes antes de un
+    # reinicio se envíen sin esperar una petición. Con debug=True, el proceso que atiende las
+    # peticiones es el que inicia el recargador de código
+    if is_running_from_reloader():
+        start_worker(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
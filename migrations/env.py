@@ -51,6 +51,23 @@ def get_metadata():
     return target_db.metadata
 
 
+# Objetos del índice de texto completo de los tickets (ver la revisión c302f4f9427b). No están
+# en los modelos, por lo que autogenerate no debe proponer eliminarlos.
+SEARCH_INDEX_TABLES = ('ticket_fts',)
+SEARCH_INDEX_COLUMNS = ('search_vector',)
+SEARCH_INDEX_INDEXES = ('ix_ticket_search_vector',)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and name.startswith(SEARCH_INDEX_TABLES):
+        return False  # Incluye las tablas internas de FTS5 (ticket_fts_data, ...)
+    if type_ == 'column' and name in SEARCH_INDEX_COLUMNS:
+        return False
+    if type_ == 'index' and name in SEARCH_INDEX_INDEXES:
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +82,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +111,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
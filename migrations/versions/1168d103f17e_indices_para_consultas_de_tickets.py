@@ -0,0 +1,64 @@
+"""Índices para las consultas de tickets y anexos
+
+Revision ID: 1168d103f17e
+Revises: eec47c01fff8
+Create Date: 2026-10-18 07:40:12.481305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1168d103f17e'
+down_revision = 'eec47c01fff8'
+branch_labels = None
+depends_on = None
+
+
+# Índices de cada tabla: (nombre, columnas)
+INDEXES = {
+    # Filtros y orden del listado de tickets
+    'ticket': (
+        ('ix_ticket_estado', ['estado']),
+        ('ix_ticket_especialista_email', ['especialista_email']),
+        ('ix_ticket_tercero_email', ['tercero_email']),
+        ('ix_ticket_fecha_creacion', ['fecha_creacion']),
+    ),
+    # Búsqueda de anexos por ticket (listado, eliminación y finalización)
+    'ticket_attachment_descripcion': (
+        ('ix_ticket_attachment_descripcion_ticket_id', ['ticket_id']),
+    ),
+    'ticket_attachment_respuesta': (
+        ('ix_ticket_attachment_respuesta_ticket_id', ['ticket_id']),
+    ),
+}
+
+
+def upgrade():
+    # db.create_all() pudo haber creado los índices al iniciar la aplicación (index=True)
+    inspector = sa.inspect(op.get_bind())
+    for table_name, indexes in INDEXES.items():
+        if not inspector.has_table(table_name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table_name)}
+        missing = [(name, columns) for name, columns in indexes if name not in existing]
+        if not missing:
+            continue
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for name, columns in missing:
+                batch_op.create_index(batch_op.f(name), columns, unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ticket_attachment_respuesta', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ticket_attachment_respuesta_ticket_id'))
+
+    with op.batch_alter_table('ticket_attachment_descripcion', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ticket_attachment_descripcion_ticket_id'))
+
+    with op.batch_alter_table('ticket', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ticket_fecha_creacion'))
+        batch_op.drop_index(batch_op.f('ix_ticket_tercero_email'))
+        batch_op.drop_index(batch_op.f('ix_ticket_especialista_email'))
+        batch_op.drop_index(batch_op.f('ix_ticket_estado'))
@@ -0,0 +1,43 @@
+"""Contenido de anexos opcional para el almacén direccionado por contenido
+
+Revision ID: 4345d29b99d6
+Revises: db1938c5db47
+Create Date: 2026-10-18 08:42:19.305117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4345d29b99d6'
+down_revision = 'db1938c5db47'
+branch_labels = None
+depends_on = None
+
+ATTACHMENT_TABLES = ('ticket_attachment_descripcion', 'ticket_attachment_respuesta')
+
+
+def upgrade():
+    # Los anexos nuevos guardan su contenido en UPLOAD_PATH/blobs; file_content solo queda
+    # para los anexos anteriores hasta ejecutar "flask attachments migrate-blobs"
+    inspector = sa.inspect(op.get_bind())
+    for table_name in ATTACHMENT_TABLES:
+        if not inspector.has_table(table_name):
+            continue
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.alter_column('file_content',
+                                  existing_type=sa.LargeBinary(),
+                                  nullable=True)
+
+
+def downgrade():
+    # Requiere que todos los anexos tengan file_content
+    inspector = sa.inspect(op.get_bind())
+    for table_name in reversed(ATTACHMENT_TABLES):
+        if not inspector.has_table(table_name):
+            continue
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.alter_column('file_content',
+                                  existing_type=sa.LargeBinary(),
+                                  nullable=False)
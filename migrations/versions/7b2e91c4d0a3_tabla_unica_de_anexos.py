@@ -0,0 +1,122 @@
+"""Tabla única de anexos de descripción y de solución
+
+Revision ID: 7b2e91c4d0a3
+Revises: 4345d29b99d6
+Create Date: 2026-10-18 11:20:37.482911
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e91c4d0a3'
+down_revision = '4345d29b99d6'
+branch_labels = None
+depends_on = None
+
+DESCRIPTION_TABLE = 'ticket_attachment_descripcion'
+SOLUTION_TABLE = 'ticket_attachment_respuesta'
+
+# Columnas comunes a las tres tablas (sin id ni tipo de anexo)
+COLUMNS = 'ticket_id, file_name, file_type, file_content, file_size, sha256'
+
+
+def upgrade():
+    # db.create_all() pudo haber creado la tabla al iniciar la aplicación
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('ticket_attachment'):
+        op.create_table('ticket_attachment',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ticket_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('file_name', sa.String(length=255), nullable=False),
+        sa.Column('file_type', sa.String(length=50), nullable=False),
+        sa.Column('file_content', sa.LargeBinary(), nullable=True),
+        sa.Column('file_size', sa.Integer(), nullable=True),
+        sa.Column('sha256', sa.String(length=64), nullable=True),
+        sa.ForeignKeyConstraint(['ticket_id'], ['ticket.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('ticket_attachment', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_ticket_attachment_ticket_id'), ['ticket_id'], unique=False)
+
+    # Una base de datos creada por la aplicación con la tabla única no tiene las tablas anteriores
+    if not inspector.has_table(DESCRIPTION_TABLE) or not inspector.has_table(SOLUTION_TABLE):
+        return
+
+    conn = op.get_bind()
+    has_rows = conn.execute(sa.text('SELECT 1 FROM ticket_attachment LIMIT 1')).first() is not None
+
+    # Los anexos de descripción conservan su id, para que los enlaces de descarga ya enviados
+    # sigan funcionando. Los de solución reciben un id nuevo, porque sus ids se repetían con
+    # los de descripción. La copia se hace en la base de datos, sin leer el contenido en Python.
+    if has_rows:
+        conn.execute(sa.text(
+            f"INSERT INTO ticket_attachment (kind, {COLUMNS}) "
+            f"SELECT 'descripcion', {COLUMNS} FROM {DESCRIPTION_TABLE} ORDER BY id"
+        ))
+    else:
+        conn.execute(sa.text(
+            f"INSERT INTO ticket_attachment (id, kind, {COLUMNS}) "
+            f"SELECT id, 'descripcion', {COLUMNS} FROM {DESCRIPTION_TABLE}"
+        ))
+        _reset_sequence('ticket_attachment')
+    conn.execute(sa.text(
+        f"INSERT INTO ticket_attachment (kind, {COLUMNS}) "
+        f"SELECT 'solucion', {COLUMNS} FROM {SOLUTION_TABLE} ORDER BY id"
+    ))
+
+    with op.batch_alter_table(SOLUTION_TABLE, schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ticket_attachment_respuesta_ticket_id'))
+    op.drop_table(SOLUTION_TABLE)
+
+    with op.batch_alter_table(DESCRIPTION_TABLE, schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ticket_attachment_descripcion_ticket_id'))
+    op.drop_table(DESCRIPTION_TABLE)
+
+
+def _reset_sequence(table_name):
+    """
+    En PostgreSQL, avanza la secuencia del id después de insertar filas con id explícito.
+    """
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        conn.execute(sa.text(
+            f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table_name}), 0) + 1, false)"
+        ))
+
+
+def downgrade():
+    conn = op.get_bind()
+    for table_name, kind, is_description_file in ((DESCRIPTION_TABLE, 'descripcion', True),
+                                                  (SOLUTION_TABLE, 'solucion', False)):
+        op.create_table(table_name,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ticket_id', sa.Integer(), nullable=False),
+        sa.Column('file_name', sa.String(length=255), nullable=False),
+        sa.Column('file_type', sa.String(length=50), nullable=False),
+        sa.Column('file_content', sa.LargeBinary(), nullable=True),
+        sa.Column('file_size', sa.Integer(), nullable=True),
+        sa.Column('sha256', sa.String(length=64), nullable=True),
+        sa.Column('is_description_file', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['ticket_id'], ['ticket.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.create_index(batch_op.f(f'ix_{table_name}_ticket_id'), ['ticket_id'], unique=False)
+
+        # Los ids de la tabla única no se repiten, por lo que se conservan en ambas tablas
+        conn.execute(
+            sa.text(
+                f"INSERT INTO {table_name} (id, {COLUMNS}, is_description_file) "
+                f"SELECT id, {COLUMNS}, :is_description_file FROM ticket_attachment WHERE kind = :kind"
+            ),
+            {"is_description_file": is_description_file, "kind": kind}
+        )
+        _reset_sequence(table_name)
+
+    with op.batch_alter_table('ticket_attachment', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ticket_attachment_ticket_id'))
+    op.drop_table('ticket_attachment')
@@ -0,0 +1,54 @@
+"""Ids de tickets y anexos sin reutilizar en SQLite
+
+Revision ID: a9e1f5c3b7d2
+Revises: c302f4f9427b
+Create Date: 2026-10-18 20:05:37.204118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9e1f5c3b7d2'
+down_revision = 'c302f4f9427b'
+branch_labels = None
+depends_on = None
+
+# Sin AUTOINCREMENT, SQLite asigna a una fila nueva el id de la última eliminada: un ticket
+# nuevo tomaría las claves de idempotencia de los correos del ticket eliminado y un correo
+# pendiente adjuntaría los anexos de otro ticket. En PostgreSQL las secuencias no reutilizan ids.
+TABLES = ('ticket', 'ticket_attachment')
+
+
+def _has_autoincrement(conn, table):
+    sql = conn.execute(
+        sa.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": table}
+    ).scalar()
+    return sql is not None and 'AUTOINCREMENT' in sql.upper()
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != 'sqlite':
+        return
+    inspector = sa.inspect(conn)
+    for table in TABLES:
+        if not inspector.has_table(table) or _has_autoincrement(conn, table):
+            continue
+        # Recrear la tabla copiando las filas; sqlite_sequence parte del id más alto
+        with op.batch_alter_table(table, schema=None, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': True}):
+            pass
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != 'sqlite':
+        return
+    inspector = sa.inspect(conn)
+    for table in TABLES:
+        if inspector.has_table(table) and _has_autoincrement(conn, table):
+            with op.batch_alter_table(table, schema=None, recreate='always'):
+                pass
@@ -0,0 +1,65 @@
+"""Índice de texto completo de los tickets
+
+Revision ID: c302f4f9427b
+Revises: f1b8c3e60a92
+Create Date: 2026-10-18 18:20:44.913502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c302f4f9427b'
+down_revision = 'f1b8c3e60a92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Índice sobre tema, descripcion_caso y solucion_caso (ver app/utils/ticket_search.py).
+    # Si la base de datos no lo soporta, la búsqueda usa LIKE.
+    conn = op.get_bind()
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        # Tabla virtual FTS5 cuyo rowid es el id del ticket; la aplicación la mantiene con
+        # index_ticket() y remove_ticket_from_index()
+        try:
+            with conn.begin_nested():
+                conn.execute(sa.text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS ticket_fts USING fts5("
+                    "tema, descripcion_caso, solucion_caso, "
+                    "tokenize = 'unicode61 remove_diacritics 2')"
+                ))
+        except sa.exc.OperationalError as e:
+            print(f"SQLite sin FTS5, la búsqueda de tickets usará LIKE: {e}")
+            return
+        # Indexar los tickets existentes que aún no están en el índice
+        conn.execute(sa.text(
+            "INSERT INTO ticket_fts (rowid, tema, descripcion_caso, solucion_caso) "
+            "SELECT id, tema, descripcion_caso, COALESCE(solucion_caso, '') FROM ticket "
+            "WHERE id NOT IN (SELECT rowid FROM ticket_fts)"
+        ))
+    elif dialect == 'postgresql':
+        # Columna generada: la base de datos la actualiza en cada INSERT/UPDATE
+        conn.execute(sa.text(
+            "ALTER TABLE ticket ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('spanish', COALESCE(tema, '')), 'A') || "
+            "setweight(to_tsvector('spanish', COALESCE(descripcion_caso, '')), 'B') || "
+            "setweight(to_tsvector('spanish', COALESCE(solucion_caso, '')), 'B')"
+            ") STORED"
+        ))
+        conn.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_ticket_search_vector ON ticket USING GIN (search_vector)"
+        ))
+
+
+def downgrade():
+    conn = op.get_bind()
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        conn.execute(sa.text("DROP TABLE IF EXISTS ticket_fts"))
+    elif dialect == 'postgresql':
+        conn.execute(sa.text("DROP INDEX IF EXISTS ix_ticket_search_vector"))
+        conn.execute(sa.text("ALTER TABLE ticket DROP COLUMN IF EXISTS search_vector"))
@@ -0,0 +1,38 @@
+"""Tamaño en disco y codificación de los contenidos del almacén de anexos
+
+Revision ID: c52f0d8e6a17
+Revises: 7b2e91c4d0a3
+Create Date: 2026-10-18 12:05:51.906342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52f0d8e6a17'
+down_revision = '7b2e91c4d0a3'
+branch_labels = None
+depends_on = None
+
+
+def _columns():
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('attachment_blob')}
+
+
+def upgrade():
+    # La tabla la crea db.create_all(), que en una base nueva ya incluye las columnas.
+    # Los contenidos existentes quedan sin codificación hasta ejecutar "flask attachments compress".
+    columns = _columns()
+    with op.batch_alter_table('attachment_blob', schema=None) as batch_op:
+        if 'stored_size' not in columns:
+            batch_op.add_column(sa.Column('stored_size', sa.Integer(), nullable=True))
+        if 'encoding' not in columns:
+            batch_op.add_column(sa.Column('encoding', sa.String(length=10), nullable=True))
+
+
+def downgrade():
+    # Requiere descomprimir antes los contenidos guardados con zstd o gzip
+    with op.batch_alter_table('attachment_blob', schema=None) as batch_op:
+        batch_op.drop_column('encoding')
+        batch_op.drop_column('stored_size')
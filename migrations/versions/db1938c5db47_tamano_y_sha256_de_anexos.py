@@ -0,0 +1,79 @@
+"""Tamaño y SHA-256 de los anexos
+
+Revision ID: db1938c5db47
+Revises: 1168d103f17e
+Create Date: 2026-10-18 08:05:47.120934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import hashlib
+
+
+# revision identifiers, used by Alembic.
+revision = 'db1938c5db47'
+down_revision = '1168d103f17e'
+branch_labels = None
+depends_on = None
+
+ATTACHMENT_TABLES = ('ticket_attachment_descripcion', 'ticket_attachment_respuesta')
+
+# Filas leídas por lote al calcular los metadatos (cada fila puede pesar hasta 10 MB)
+BACKFILL_BATCH_SIZE = 20
+
+
+def upgrade():
+    # db.create_all() pudo haber creado las columnas al iniciar la aplicación
+    inspector = sa.inspect(op.get_bind())
+    for table_name in ATTACHMENT_TABLES:
+        if not inspector.has_table(table_name):
+            continue
+        columns = {column['name'] for column in inspector.get_columns(table_name)}
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            if 'file_size' not in columns:
+                batch_op.add_column(sa.Column('file_size', sa.Integer(), nullable=True))
+            if 'sha256' not in columns:
+                batch_op.add_column(sa.Column('sha256', sa.String(length=64), nullable=True))
+
+    for table_name in ATTACHMENT_TABLES:
+        if inspector.has_table(table_name):
+            _backfill(table_name)
+
+
+def _backfill(table_name):
+    """
+    Calcula el tamaño y el SHA-256 de los anexos existentes que aún no los tienen, por lotes,
+    para no cargar todos los archivos en memoria a la vez.
+    """
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer),
+        sa.column('file_content', sa.LargeBinary),
+        sa.column('file_size', sa.Integer),
+        sa.column('sha256', sa.String),
+    )
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(table.c.id, table.c.file_content)
+            .where(table.c.id > last_id, table.c.sha256.is_(None), table.c.file_content.is_not(None))
+            .order_by(table.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            conn.execute(
+                table.update()
+                .where(table.c.id == row.id)
+                .values(file_size=len(row.file_content), sha256=hashlib.sha256(row.file_content).hexdigest())
+            )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    for table_name in reversed(ATTACHMENT_TABLES):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column('sha256')
+            batch_op.drop_column('file_size')
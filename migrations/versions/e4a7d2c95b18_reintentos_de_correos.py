@@ -0,0 +1,45 @@
+"""Reintentos y clave de idempotencia de la bandeja de salida de correos
+
+Revision ID: e4a7d2c95b18
+Revises: c52f0d8e6a17
+Create Date: 2026-10-18 15:42:10.318274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7d2c95b18'
+down_revision = 'c52f0d8e6a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # La tabla la crea db.create_all(): si aún no existe, se creará con las columnas nuevas
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('email_outbox'):
+        return
+    columns = {column['name'] for column in inspector.get_columns('email_outbox')}
+    indexes = {index['name'] for index in inspector.get_indexes('email_outbox')}
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        if 'next_attempt_at' not in columns:
+            batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+        if 'idempotency_key' not in columns:
+            batch_op.add_column(sa.Column('idempotency_key', sa.String(length=150), nullable=True))
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        if 'ix_email_outbox_next_attempt_at' not in indexes:
+            batch_op.create_index(batch_op.f('ix_email_outbox_next_attempt_at'), ['next_attempt_at'], unique=False)
+        if 'ix_email_outbox_idempotency_key' not in indexes:
+            batch_op.create_index(batch_op.f('ix_email_outbox_idempotency_key'), ['idempotency_key'], unique=True)
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('email_outbox'):
+        return
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_email_outbox_idempotency_key'))
+        batch_op.drop_index(batch_op.f('ix_email_outbox_next_attempt_at'))
+        batch_op.drop_column('idempotency_key')
+        batch_op.drop_column('next_attempt_at')
@@ -0,0 +1,35 @@
+"""Cuerpo en texto plano de los correos de la bandeja de salida
+
+Revision ID: f1b8c3e60a92
+Revises: e4a7d2c95b18
+Create Date: 2026-10-18 17:08:36.527190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b8c3e60a92'
+down_revision = 'e4a7d2c95b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # La tabla la crea db.create_all(): si aún no existe, se creará con la columna nueva.
+    # Los correos pendientes anteriores se envían solo en HTML.
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('email_outbox'):
+        return
+    columns = {column['name'] for column in inspector.get_columns('email_outbox')}
+    if 'body_text' not in columns:
+        with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('body_text', sa.Text(), nullable=True))
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('email_outbox'):
+        return
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.drop_column('body_text')
@@ -0,0 +1,94 @@
+import base64
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# La aplicación lee su configuración de las variables de entorno al importarse: usar una base
+# de datos y una carpeta de anexos temporales, y no enviar correos desde un hilo
+_TEST_DIR = tempfile.mkdtemp(prefix="mintickets-tests-")
+os.environ["DATABASE_URI"] = f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}"
+os.environ["UPLOAD_PATH"] = os.path.join(_TEST_DIR, "uploads")
+os.environ["EMAIL_OUTBOX_WORKER"] = "off"
+os.environ["EMAIL_TEMPLATES_CACHE"] = "off"
+os.environ.setdefault("JWT_SECRET_KEY", "test")
+os.makedirs(os.environ["UPLOAD_PATH"], exist_ok=True)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def client():
+    """
+    Cliente de prueba de la aplicación sobre una base de datos y una carpeta de anexos vacías.
+    """
+    from app import app, db
+
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+    for entry in os.scandir(os.environ["UPLOAD_PATH"]):
+        if entry.is_dir():
+            shutil.rmtree(entry.path)
+        else:
+            os.remove(entry.path)
+    yield app.test_client()
+
+
+@pytest.fixture
+def app_context(client):
+    """
+    Contexto de la aplicación para usar db.session directamente.
+    """
+    from app import app
+
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def ticket_data():
+    """
+    Datos mínimos para registrar un ticket con POST /tickets/register/.
+    """
+    return {
+        "tema": "Impresora",
+        "estado": "Abierto",
+        "tercero_nombre": "Ana",
+        "tercero_email": "ana@example.com",
+        "especialista_nombre": "Luis",
+        "especialista_email": "luis@example.com",
+        "descripcion_caso": "La impresora no imprime"
+    }
+
+
+@pytest.fixture
+def register_ticket(client, ticket_data):
+    """
+    Registra un ticket con un anexo en base64 por cada contenido y devuelve su id.
+    """
+    def register(*contents, file_type="application/octet-stream", **fields):
+        attachments = [
+            {"fileName": f"anexo{i}.bin", "fileType": file_type, "base64Content": base64.b64encode(content).decode()}
+            for i, content in enumerate(contents)
+        ]
+        response = client.post("/tickets/register/", json=dict(ticket_data, attachments=attachments, **fields))
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()["ticket_id"]
+    return register
+
+
+@pytest.fixture
+def attachment_ids(client):
+    """
+    Devuelve los ids de los anexos de un ticket.
+    """
+    def ids(ticket_id):
+        response = client.get(f"/tickets/{ticket_id}/attachments/")
+        assert response.status_code == 200
+        return [attachment["id"] for attachment in response.get_json()]
+    return ids
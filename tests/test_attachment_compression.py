@@ -0,0 +1,95 @@
+import hashlib
+import os
+
+from app import app, db
+from app.models.attachment_blob_model import AttachmentBlob
+from app.utils import attachment_store
+from app.utils.attachment_store import blob_path, find_blob
+
+
+TEXT = ("Línea de registro del ticket con texto repetido.\n" * 400).encode()
+
+
+def stored(sha256):
+    blob = db.session.get(AttachmentBlob, sha256)
+    db.session.refresh(blob)
+    return blob
+
+
+def download(client, ticket_id, attachment_ids, **kwargs):
+    return client.get(f"/tickets/attachment/{attachment_ids(ticket_id)[0]}/", **kwargs)
+
+
+def test_text_is_stored_compressed(client, app_context, register_ticket, attachment_ids):
+    sha256 = hashlib.sha256(TEXT).hexdigest()
+    ticket_id = register_ticket(TEXT, file_type="text/plain")
+
+    blob = stored(sha256)
+    assert blob.encoding == "zstd"
+    assert blob.stored_size < blob.size == len(TEXT)
+    assert find_blob(sha256) == (blob_path(sha256, "zstd"), "zstd")
+    assert not os.path.exists(blob_path(sha256))
+
+    response = download(client, ticket_id, attachment_ids)
+    assert response.status_code == 200
+    assert response.content_length == len(TEXT)
+    assert response.data == TEXT
+
+
+def test_range_on_compressed_blob(client, app_context, register_ticket, attachment_ids):
+    ticket_id = register_ticket(TEXT, file_type="text/plain")
+
+    response = download(client, ticket_id, attachment_ids, headers={"Range": "bytes=100-299"})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 100-299/{len(TEXT)}"
+    assert response.data == TEXT[100:300]
+
+
+def test_gzip_compression(client, app_context, register_ticket, attachment_ids, monkeypatch):
+    monkeypatch.setattr(attachment_store, "ATTACHMENT_COMPRESSION", "gzip")
+    sha256 = hashlib.sha256(TEXT).hexdigest()
+    ticket_id = register_ticket(TEXT, file_type="application/json")
+
+    assert stored(sha256).encoding == "gzip"
+    assert os.path.exists(blob_path(sha256, "gzip"))
+    assert download(client, ticket_id, attachment_ids).data == TEXT
+
+
+def test_content_stored_uncompressed(client, app_context, register_ticket):
+    small = TEXT[:attachment_store.ATTACHMENT_COMPRESSION_MIN_SIZE - 1]
+    incompressible = os.urandom(8000)
+    register_ticket(small, file_type="text/plain")
+    register_ticket(TEXT, file_type="image/png")
+    register_ticket(incompressible, file_type="text/plain")
+
+    for content in (small, TEXT, incompressible):
+        sha256 = hashlib.sha256(content).hexdigest()
+        blob = stored(sha256)
+        assert blob.encoding == "identity"
+        assert blob.stored_size == len(content)
+        assert find_blob(sha256) == (blob_path(sha256), "identity")
+
+
+def test_compress_command(client, app_context, register_ticket, attachment_ids, monkeypatch):
+    sha256 = hashlib.sha256(TEXT).hexdigest()
+    monkeypatch.setattr(attachment_store, "ATTACHMENT_COMPRESSION", "none")
+    ticket_id = register_ticket(TEXT, file_type="text/csv")
+    # Contenido guardado antes de existir la compresión
+    blob = stored(sha256)
+    blob.encoding = None
+    blob.stored_size = None
+    db.session.commit()
+    monkeypatch.setattr(attachment_store, "ATTACHMENT_COMPRESSION", "zstd")
+
+    result = app.test_cli_runner().invoke(args=["attachments", "compress", "--batch-size", "1"])
+    assert result.exit_code == 0, result.output
+    assert "(1 de 1 contenidos comprimidos)" in result.output
+
+    blob = stored(sha256)
+    assert blob.encoding == "zstd"
+    assert blob.stored_size < len(TEXT)
+    assert not os.path.exists(blob_path(sha256))
+    assert download(client, ticket_id, attachment_ids).data == TEXT
+
+    result = app.test_cli_runner().invoke(args=["attachments", "compress"])
+    assert "(0 de 0 contenidos comprimidos)" in result.output
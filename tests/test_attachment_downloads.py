@@ -0,0 +1,37 @@
+import hashlib
+import os
+
+
+def test_etag_and_if_none_match(client, register_ticket, attachment_ids):
+    content = os.urandom(5000)
+    (attachment_id,) = attachment_ids(register_ticket(content))
+
+    response = client.get(f"/tickets/attachment/{attachment_id}/")
+    assert response.headers["ETag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+    assert "private" in response.headers["Cache-Control"]
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+    response = client.get(f"/tickets/attachment/{attachment_id}/", headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_range(client, register_ticket, attachment_ids):
+    content = os.urandom(5000)
+    (attachment_id,) = attachment_ids(register_ticket(content))
+
+    response = client.get(f"/tickets/attachment/{attachment_id}/", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 100-199/{len(content)}"
+    assert response.data == content[100:200]
+
+    response = client.get(f"/tickets/attachment/{attachment_id}/", headers={"Range": "bytes=-50"})
+    assert response.status_code == 206
+    assert response.data == content[-50:]
+
+    response = client.get(f"/tickets/attachment/{attachment_id}/", headers={"Range": "bytes=9000-"})
+    assert response.status_code == 416
+
+
+def test_unknown_attachment(client):
+    assert client.get("/tickets/attachment/999/").status_code == 404
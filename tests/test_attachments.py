@@ -0,0 +1,52 @@
+import hashlib
+import os
+
+from app import db
+from app.models.attachment_blob_model import AttachmentBlob
+from app.utils.attachment_store import blob_exists
+
+
+def test_create_and_download(client, register_ticket):
+    content = os.urandom(10000)
+    ticket_id = register_ticket(content)
+
+    attachments = client.get(f"/tickets/{ticket_id}/attachments/").get_json()
+    assert len(attachments) == 1
+    assert attachments[0]["file_name"] == "anexo0.bin"
+    assert attachments[0]["file_size"] == len(content)
+
+    response = client.get(f"/tickets/attachment/{attachments[0]['id']}/")
+    assert response.status_code == 200
+    assert response.data == content
+
+
+def test_same_content_is_stored_once(client, app_context, register_ticket):
+    content = os.urandom(8000)
+    sha256 = hashlib.sha256(content).hexdigest()
+    register_ticket(content, content)
+    register_ticket(content)
+
+    assert db.session.get(AttachmentBlob, sha256).ref_count == 3
+    assert AttachmentBlob.query.count() == 1
+
+
+def test_delete_releases_shared_blob(client, app_context, register_ticket, attachment_ids):
+    content = os.urandom(8000)
+    sha256 = hashlib.sha256(content).hexdigest()
+    first = register_ticket(content)
+    second = register_ticket(content)
+
+    assert db.session.get(AttachmentBlob, sha256).ref_count == 2
+
+    assert client.delete(f"/tickets/{first}/").status_code == 200
+    db.session.expire_all()
+    assert db.session.get(AttachmentBlob, sha256).ref_count == 1
+    assert blob_exists(sha256)
+    (attachment_id,) = attachment_ids(second)
+    assert client.get(f"/tickets/attachment/{attachment_id}/").data == content
+
+    assert client.delete(f"/tickets/{second}/").status_code == 200
+    db.session.expire_all()
+    assert db.session.get(AttachmentBlob, sha256) is None
+    assert not blob_exists(sha256)
+    assert client.get(f"/tickets/{second}/attachments/").status_code == 404
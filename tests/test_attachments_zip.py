@@ -0,0 +1,65 @@
+import base64
+import io
+import os
+import zipfile
+
+from app import db
+from app.models.ticket_model import ATTACHMENT_KIND_SOLUCION, TicketAttachment
+
+
+def encode(file_name, file_type, content):
+    return {"fileName": file_name, "fileType": file_type, "base64Content": base64.b64encode(content).decode()}
+
+
+def test_zip_of_ticket_attachments(client, app_context, ticket_data):
+    photo = os.urandom(5000)
+    notes = b"notas del caso\n" * 500
+    other_notes = b"otras notas\n" * 10
+    response = client.post("/tickets/register/", json=dict(ticket_data, attachments=[
+        encode("foto.jpg", "image/jpeg", photo),
+        encode("notas.txt", "text/plain", notes),
+        encode("Notas.txt", "text/plain", other_notes)
+    ]))
+    ticket_id = response.get_json()["ticket_id"]
+    solution = b"informe de solucion"
+    client.put(f"/tickets/{ticket_id}/finalize/", json={"attachments": [encode("notas.txt", "text/plain", solution)]})
+
+    # Anexo guardado en la base de datos, anterior al almacén de anexos
+    legacy = b"anexo anterior"
+    db.session.add(TicketAttachment(ticket_id=ticket_id, kind=ATTACHMENT_KIND_SOLUCION, file_name="viejo.txt",
+                                    file_type="text/plain", file_content=legacy))
+    db.session.commit()
+
+    response = client.get(f"/tickets/{ticket_id}/attachments.zip")
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+    assert response.headers["Content-Disposition"] == f'attachment; filename="ticket_{ticket_id}_anexos.zip"'
+
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == [
+            "Anexos_Descripcion/foto.jpg",
+            "Anexos_Descripcion/notas.txt",
+            "Anexos_Descripcion/Notas (2).txt",
+            "Anexos_Solucion/notas.txt",
+            "Anexos_Solucion/viejo.txt"
+        ]
+        assert archive.read("Anexos_Descripcion/foto.jpg") == photo
+        assert archive.read("Anexos_Descripcion/notas.txt") == notes
+        assert archive.read("Anexos_Descripcion/Notas (2).txt") == other_notes
+        assert archive.read("Anexos_Solucion/notas.txt") == solution
+        assert archive.read("Anexos_Solucion/viejo.txt") == legacy
+        assert archive.getinfo("Anexos_Descripcion/foto.jpg").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("Anexos_Descripcion/notas.txt").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_zip_without_attachments(client, register_ticket):
+    ticket_id = register_ticket()
+    response = client.get(f"/tickets/{ticket_id}/attachments.zip")
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert archive.namelist() == []
+
+
+def test_zip_of_unknown_ticket(client):
+    assert client.get("/tickets/999/attachments.zip").status_code == 404
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from app import db
+from app.utils import email_outbox
+
+
+BASE_URL = "https://tickets.example.com/"
+
+
+@pytest.fixture
+def links_enabled(monkeypatch):
+    monkeypatch.setattr(email_outbox, "BACKEND_BASE_URL", BASE_URL)
+    monkeypatch.setattr(email_outbox, "EMAIL_ATTACHMENT_MAX_SIZE", 5000)
+
+
+def build(attachment_ids):
+    email = email_outbox.enqueue_email(
+        "prueba", ["ana@example.com"], "Asunto", "<p>Hola</p>",
+        attachment_ids=attachment_ids, idempotency_key="enlaces", text_body="Hola"
+    )
+    db.session.commit()
+    msg = email_outbox._build_outbox_email(email)
+    files = {part.get_filename(): part.get_payload(decode=True) for part in msg.walk() if part.get_filename()}
+    bodies = {part.get_content_type(): part.get_payload(decode=True).decode() for part in msg.walk()
+              if part.get_content_type() in ("text/plain", "text/html")}
+    return files, bodies
+
+
+def test_large_attachment_is_linked(client, app_context, register_ticket, attachment_ids, links_enabled):
+    small = os.urandom(1000)
+    large = os.urandom(8000)
+    ids = attachment_ids(register_ticket(small, large))
+
+    files, bodies = build(ids)
+    assert files == {"anexo0.bin": small}
+    url = f"https://tickets.example.com/tickets/attachment/{ids[1]}/"
+    assert f'<a href="{url}">anexo1.bin</a>' in bodies["text/html"]
+    assert f"- anexo1.bin (7 KB): {url}" in bodies["text/plain"]
+    assert "anexo0.bin" not in bodies["text/plain"]
+
+
+def test_total_size_limit_links_remaining(client, app_context, register_ticket, attachment_ids,
+                                          links_enabled, monkeypatch):
+    monkeypatch.setattr(email_outbox, "EMAIL_ATTACHMENTS_MAX_TOTAL", 6000)
+    first = os.urandom(4000)
+    second = os.urandom(4000)
+    ids = attachment_ids(register_ticket(first, second))
+
+    files, bodies = build(ids)
+    assert files == {"anexo0.bin": first}
+    assert f"/tickets/attachment/{ids[1]}/" in bodies["text/plain"]
+
+
+def test_attached_without_base_url(client, app_context, register_ticket, attachment_ids, monkeypatch):
+    monkeypatch.setattr(email_outbox, "BACKEND_BASE_URL", None)
+    monkeypatch.setattr(email_outbox, "EMAIL_ATTACHMENT_MAX_SIZE", 5000)
+    small = os.urandom(1000)
+    large = os.urandom(8000)
+    ids = attachment_ids(register_ticket(small, large))
+
+    files, bodies = build(ids)
+    assert files == {"anexo0.bin": small, "anexo1.bin": large}
+    assert "Archivos disponibles para descargar" not in bodies["text/plain"]
+    assert "Archivos disponibles para descargar" not in bodies["text/html"]
+
+
+def test_deleted_attachment_is_skipped(client, app_context, register_ticket, attachment_ids, links_enabled):
+    content = os.urandom(1000)
+    ticket_id = register_ticket(content)
+    ids = attachment_ids(ticket_id)
+    ids.append(ids[0] + 1000)
+
+    files, _ = build(ids)
+    assert files == {"anexo0.bin": content}
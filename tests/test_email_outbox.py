@@ -0,0 +1,186 @@
+import smtplib
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models.email_outbox_model import (
+    EMAIL_STATUS_ENVIADO,
+    EMAIL_STATUS_ERROR,
+    EMAIL_STATUS_PENDIENTE,
+    EmailOutbox
+)
+from app.utils import email_outbox
+
+
+class FakeSMTP:
+    """
+    Reemplaza deliver_email: lanza los errores indicados, en orden, y registra los envíos.
+    """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    def __call__(self, to_address, msg):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((to_address, msg))
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    def install(*errors):
+        fake = FakeSMTP(*errors)
+        monkeypatch.setattr(email_outbox, "deliver_email", fake)
+        return fake
+    return install
+
+
+def enqueue(key="prueba"):
+    email = email_outbox.enqueue_email(
+        "prueba", ["ana@example.com"], "Asunto", "<p>Hola</p>", idempotency_key=key, text_body="Hola"
+    )
+    db.session.commit()
+    return email.id
+
+
+def process(email_id):
+    """
+    Procesa la bandeja sin esperar el tiempo de reintento del correo.
+    """
+    db.session.execute(db.update(EmailOutbox).where(EmailOutbox.id == email_id).values(next_attempt_at=None))
+    db.session.commit()
+    email_outbox.process_outbox()
+    db.session.expire_all()
+    return db.session.get(EmailOutbox, email_id)
+
+
+def test_sent(app_context, smtp):
+    fake = smtp()
+    email = process(enqueue())
+    assert email.status == EMAIL_STATUS_ENVIADO
+    assert email.attempts == 1
+    assert email.sent_at is not None
+    assert fake.sent[0][0] == ["ana@example.com"]
+
+    # Un correo enviado no se vuelve a enviar
+    assert process(email.id).status == EMAIL_STATUS_ENVIADO
+    assert len(fake.sent) == 1
+
+
+def test_rolled_back_email_is_discarded(app_context, smtp):
+    email_outbox.enqueue_email("prueba", ["ana@example.com"], "Asunto", "<p>Hola</p>", idempotency_key="revertido")
+    db.session.rollback()
+    assert EmailOutbox.query.count() == 0
+
+
+def test_ticket_creation_queues_email(client, app_context, register_ticket):
+    ticket_id = register_ticket()
+    (email,) = EmailOutbox.query.filter_by(ticket_id=ticket_id).all()
+    assert email.event == email_outbox.EMAIL_EVENT_TICKET_CREADO
+    assert email.status == EMAIL_STATUS_PENDIENTE
+    assert "ana@example.com" in email.to_address
+
+
+def test_idempotency_key(app_context, smtp):
+    assert enqueue("clave") == enqueue("clave")
+    assert EmailOutbox.query.count() == 1
+
+
+def test_temporary_error_is_retried(app_context, smtp):
+    fake = smtp(smtplib.SMTPServerDisconnected("conexión cerrada"))
+    email_id = enqueue()
+
+    email_outbox.process_outbox()
+    db.session.expire_all()
+    email = db.session.get(EmailOutbox, email_id)
+    assert email.status == EMAIL_STATUS_PENDIENTE
+    assert email.attempts == 1
+    assert email.next_attempt_at > datetime.utcnow()
+    assert "SMTPServerDisconnected" in email.last_error
+
+    # No se reintenta antes de tiempo
+    assert email_outbox.claim_emails() == []
+
+    email = process(email_id)
+    assert email.status == EMAIL_STATUS_ENVIADO
+    assert email.attempts == 2
+    assert email.last_error is None
+    assert len(fake.sent) == 1
+
+
+def test_permanent_error_goes_to_dead_letter(app_context, smtp):
+    smtp(smtplib.SMTPResponseException(550, b"buzon inexistente"))
+    email = process(enqueue())
+    assert email.status == EMAIL_STATUS_ERROR
+    assert email.attempts == 1
+    assert email.next_attempt_at is None
+
+
+def test_attempts_exhausted(app_context, smtp, monkeypatch):
+    monkeypatch.setattr(email_outbox, "EMAIL_MAX_ATTEMPTS", 3)
+    smtp(*[smtplib.SMTPResponseException(421, b"intente luego")] * 3)
+    email_id = enqueue()
+
+    assert process(email_id).status == EMAIL_STATUS_PENDIENTE
+    assert process(email_id).status == EMAIL_STATUS_PENDIENTE
+    email = process(email_id)
+    assert email.status == EMAIL_STATUS_ERROR
+    assert email.attempts == 3
+
+
+def test_replay(app_context, smtp):
+    fake = smtp(smtplib.SMTPResponseException(550, b"buzon inexistente"))
+    failed_id = enqueue("fallido")
+    sent_id = enqueue("enviado")
+    email_outbox.process_outbox()
+
+    assert email_outbox.replay_emails() == 1
+    db.session.commit()
+    db.session.expire_all()
+    email = db.session.get(EmailOutbox, failed_id)
+    assert email.status == EMAIL_STATUS_PENDIENTE
+    assert email.attempts == 0
+    assert db.session.get(EmailOutbox, sent_id).status == EMAIL_STATUS_ENVIADO
+
+    assert process(failed_id).status == EMAIL_STATUS_ENVIADO
+    assert len(fake.sent) == 2
+
+
+def test_new_ticket_after_delete_gets_its_own_email(client, app_context, register_ticket, attachment_ids):
+    first = register_ticket(b"anexo del primer ticket")
+    (first_attachment,) = attachment_ids(first)
+    assert client.delete(f"/tickets/{first}/").status_code == 200
+
+    second = register_ticket(b"anexo del segundo ticket", tercero_email="otra@example.com")
+    assert second != first
+    assert attachment_ids(second) != [first_attachment]
+
+    (email,) = EmailOutbox.query.filter_by(ticket_id=second).all()
+    assert "otra@example.com" in email.to_address
+    assert EmailOutbox.query.filter_by(event=email_outbox.EMAIL_EVENT_TICKET_CREADO).count() == 2
+
+
+def test_worker_starts_with_the_app(client, app_context, smtp, monkeypatch):
+    fake = smtp()
+    email_id = enqueue()
+    runs = []
+
+    def run_once(app):
+        with app.app_context():
+            runs.append(email_outbox.process_outbox())
+            db.session.remove()
+
+    monkeypatch.setattr(email_outbox, "EMAIL_OUTBOX_WORKER", "thread")
+    monkeypatch.setattr(email_outbox, "_run_worker_thread", run_once)
+    monkeypatch.setattr(email_outbox, "_worker_thread", None)
+
+    # Un correo pendiente de antes del reinicio se envía con la primera petición, sin
+    # esperar a que se agregue otro
+    client.get("/")
+    email_outbox._worker_thread.join(5)
+    assert runs == [(1, 0)]
+    assert len(fake.sent) == 1
+    db.session.expire_all()
+    assert db.session.get(EmailOutbox, email_id).status == EMAIL_STATUS_ENVIADO
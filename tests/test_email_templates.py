@@ -0,0 +1,103 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+from jinja2 import UndefinedError
+
+from app.models.email_outbox_model import EmailOutbox
+from app.utils.email_templates import create_environment, format_file_size, render_email, render_layout
+
+
+def make_ticket(**fields):
+    values = {
+        "id": 7,
+        "codigo_seguridad": "AB12",
+        "tema": "Impresora",
+        "tercero_nombre": "Ana & <b>Pérez</b>",
+        "especialista_nombre": "Luis",
+        "descripcion_caso": "<script>alert('x')</script>",
+        "solucion_caso": "Se cambió el tóner",
+    }
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def test_user_text_is_escaped_in_html():
+    subject, text, html = render_email(
+        "ticket_creado", ticket=make_ticket(), frontend_url="https://tickets.example.com/"
+    )
+
+    assert "<script>" not in html
+    assert "&lt;script&gt;alert(&#39;x&#39;)&lt;/script&gt;" in html
+    assert "Ana &amp; &lt;b&gt;Pérez&lt;/b&gt;" in html
+    assert 'href="https://tickets.example.com/historial"' in html
+    # El texto plano y el asunto no se escapan
+    assert "<script>alert('x')</script>" in text
+    assert "Código de verificación: AB12" in text
+    assert subject == "Nuevo Ticket Creado para Ana & <b>Pérez</b>"
+
+
+def test_finalized_email():
+    subject, text, html = render_email(
+        "ticket_finalizado", ticket=make_ticket(tercero_nombre="Ana"),
+        encuesta_url="https://tickets.example.com/encuesta?id=7"
+    )
+
+    assert subject == "Solución ticket de Ana"
+    assert "Solución al caso:\nSe cambió el tóner" in text
+    assert "https://tickets.example.com/encuesta?id=7" in text
+    assert "https://tickets.example.com/encuesta?id=7" in html
+
+
+def test_missing_variable_raises():
+    with pytest.raises(UndefinedError):
+        render_email("ticket_creado", ticket=make_ticket())
+
+
+def test_layout_escapes_links_but_not_body():
+    links = [{"fileName": "<img src=x>.pdf", "url": "https://tickets.example.com/tickets/attachment/1/",
+              "fileSize": 3 * 1024 * 1024}]
+    html, text = render_layout("<p>Hola</p>", "Hola", links=links)
+
+    assert "<p>Hola</p>" in html
+    assert "&lt;img src=x&gt;.pdf" in html
+    assert "<img src=x>" not in html
+    assert "- <img src=x>.pdf (3.0 MB): https://tickets.example.com/tickets/attachment/1/" in text
+
+    html, text = render_layout("<p>Hola</p>", None)
+    assert text is None
+    assert "Archivos disponibles" not in html
+
+
+def test_format_file_size():
+    assert format_file_size(None) == ""
+    assert format_file_size(100) == "1 KB"
+    assert format_file_size(900 * 1024) == "900 KB"
+    assert format_file_size(2 * 1024 * 1024) == "2.0 MB"
+
+
+def test_environment_cache_and_reload(tmp_path):
+    templates = tmp_path / "plantillas"
+    cache = tmp_path / "cache"
+    templates.mkdir()
+    (templates / "aviso.html").write_text("<p>{{ nombre }}</p>")
+
+    environment = create_environment(str(templates), str(cache), auto_reload=True)
+    assert environment.get_template("aviso.html").render(nombre="<b>") == "<p>&lt;b&gt;</p>"
+    assert list(cache.iterdir())
+
+    (templates / "aviso.html").write_text("<div>{{ nombre }}</div>")
+    # Forzar una fecha de modificación distinta aunque el sistema de archivos tenga poca resolución
+    stat = (templates / "aviso.html").stat()
+    os.utime(templates / "aviso.html", (stat.st_atime, stat.st_mtime + 10))
+    assert environment.get_template("aviso.html").render(nombre="Ana") == "<div>Ana</div>"
+
+
+def test_ticket_email_is_escaped(client, app_context, register_ticket, ticket_data):
+    register_ticket(descripcion_caso="<script>alert('x')</script>")
+
+    email = EmailOutbox.query.one()
+    assert email.subject == f"Nuevo Ticket Creado para {ticket_data['tercero_nombre']}"
+    assert "&lt;script&gt;" in email.body
+    assert "<script>" not in email.body
+    assert "<script>alert('x')</script>" in email.body_text
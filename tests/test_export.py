@@ -0,0 +1,44 @@
+import csv
+import io
+
+from openpyxl import load_workbook
+
+
+def register_tickets(client, ticket_data):
+    for estado, tema in (("Abierto", "Impresora"), ("Cerrado", "Red"), ("Abierto", "Correo, \"urgente\"")):
+        assert client.post("/tickets/register/", json=dict(ticket_data, estado=estado, tema=tema)).status_code == 201
+
+
+def test_csv_export(client, ticket_data):
+    register_tickets(client, ticket_data)
+
+    response = client.get("/tickets/export/", query_string={"estado": "Abierto", "fields": "tema,estado"})
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.headers["Content-Disposition"].endswith('.csv"')
+
+    text = response.data.decode("utf-8")
+    assert text.startswith("\ufeff")
+    rows = list(csv.reader(io.StringIO(text[1:])))
+    assert rows[0] == ["id", "tema", "estado"]
+    assert sorted(row[1] for row in rows[1:]) == ["Correo, \"urgente\"", "Impresora"]
+    assert {row[2] for row in rows[1:]} == {"Abierto"}
+
+
+def test_xlsx_export(client, ticket_data):
+    register_tickets(client, ticket_data)
+
+    response = client.get("/tickets/export/", query_string={"formato": "xlsx", "fields": "tema"})
+    assert response.status_code == 200
+    assert int(response.headers["Content-Length"]) == len(response.data)
+
+    sheet = load_workbook(io.BytesIO(response.data), read_only=True)["Tickets"]
+    rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+    assert rows[0] == ["id", "tema"]
+    assert sorted(row[1] for row in rows[1:]) == ["Correo, \"urgente\"", "Impresora", "Red"]
+
+
+def test_invalid_export_parameters(client):
+    assert client.get("/tickets/export/", query_string={"formato": "pdf"}).status_code == 400
+    assert client.get("/tickets/export/", query_string={"fields": "no_existe"}).status_code == 400
+    assert client.get("/tickets/export/", query_string={"fecha_desde": "ayer"}).status_code == 400
@@ -0,0 +1,125 @@
+import io
+import json
+
+import pytest
+
+from app import app
+from app.utils.json_stream import JSONStreamError, StreamingJSONParser
+
+
+CHUNK_SIZES = [1, 2, 3, 7, 64 * 1024]
+
+
+class ListSink:
+    """
+    Sink de prueba: guarda los fragmentos recibidos.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def finish(self):
+        return "".join(self.parts)
+
+
+def parse(data, chunk_size=64 * 1024, sink_factory=lambda path: None):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return StreamingJSONParser(io.BytesIO(data), sink_factory, chunk_size=chunk_size).parse()
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("document", [
+    '{"tema": "Impresora", "ids": [1, -2, 3.5, 1e3, -0.25E-2], "ok": true, "no": false, "nada": null}',
+    '  [ {}, [], "", [[]], {"a": {"b": [0]}} ]  ',
+    '"texto con ñ, € y 😀"',
+    '12345678901234567890',
+    '{"clave": "valor" , "otra" :[ true ,false,null ] }',
+])
+def test_parse_matches_json_loads_at_any_chunk_size(document, chunk_size):
+    assert parse(document, chunk_size) == json.loads(document)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_escapes(chunk_size):
+    document = r'"\" \\ \/ \b \f \n \r \t é €"'
+    assert parse(document, chunk_size) == json.loads(document)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_surrogate_pairs_are_joined(chunk_size):
+    assert parse(r'"a😀b"', chunk_size) == "a😀b"
+
+
+def test_lone_surrogate_is_kept_like_json_loads():
+    document = r'"\ud800x"'
+    assert parse(document) == json.loads(document)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_multibyte_characters_split_between_chunks(chunk_size):
+    text = "ñandú €uro 😀" * 10
+    assert parse(json.dumps({"t": text}, ensure_ascii=False), chunk_size) == {"t": text}
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_sink_receives_string_by_fragments(chunk_size):
+    content = "QUJD" * 1000 + "\\n" + "ñ"
+    document = json.dumps({"attachments": [{"fileName": "a.txt", "base64Content": content}]})
+    sinks = []
+
+    def sink_factory(path):
+        if path == ("attachments", 0, "base64Content"):
+            sinks.append(ListSink())
+            return sinks[-1]
+        return None
+
+    result = parse(document, chunk_size, sink_factory)
+    assert result == {"attachments": [{"fileName": "a.txt", "base64Content": content}]}
+    assert len(sinks) == 1
+    if chunk_size < 64 * 1024:
+        assert len(sinks[0].parts) > 1  # El string no se entregó de una sola vez
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"   ",
+    b"{",
+    b'{"a" 1}',
+    b'{"a": 1,}',
+    b"{a: 1}",
+    b"[1 2]",
+    b"[1,]",
+    b'"sin terminar',
+    b"tru",
+    b"nul",
+    b"falso",
+    b"01",
+    b"1.",
+    b"-",
+    b'{"a": 1} x',
+    b'"\\x"',
+    b'"\\u12g4"',
+    b'"\\u+123"',
+    b'"\\u12"',
+    b'"\xff"',
+    b'"\xc3"',
+    b'"\xe2\x82"',
+    b'{"tema": "caf\xe9"}',
+])
+@pytest.mark.parametrize("chunk_size", [1, 64 * 1024])
+def test_invalid_documents_raise_json_stream_error(data, chunk_size):
+    with pytest.raises(JSONStreamError):
+        parse(data, chunk_size)
+
+
+def test_non_utf8_streamed_body_returns_400():
+    # Los cuerpos JSON de más de 1 MB se leen con StreamingJSONParser
+    body = b'{"tema": "caf\xe9", "descripcion_caso": "' + b"x" * (1024 * 1024) + b'"}'
+    response = app.test_client().post(
+        "/tickets/register/", data=body, content_type="application/json"
+    )
+    assert response.status_code == 400
@@ -0,0 +1,56 @@
+import io
+import os
+
+from app.utils.attachment_uploads import MAX_ATTACHMENT_SIZE, UPLOAD_TEMP_FOLDER
+
+
+def temp_files():
+    folder = os.path.join(os.environ["UPLOAD_PATH"], UPLOAD_TEMP_FOLDER)
+    return os.listdir(folder) if os.path.isdir(folder) else []
+
+
+def test_register_with_multipart(client, ticket_data, attachment_ids):
+    photo = os.urandom(20000)
+    log = b"linea\n" * 1000
+    form = dict(ticket_data, attachments=[
+        (io.BytesIO(photo), "foto.jpg", "image/jpeg"),
+        (io.BytesIO(log), "registro.log", "text/plain")
+    ])
+    response = client.post("/tickets/register/", data=form, content_type="multipart/form-data")
+    assert response.status_code == 201
+    ticket_id = response.get_json()["ticket_id"]
+
+    attachments = client.get(f"/tickets/{ticket_id}/attachments/").get_json()
+    assert [(a["file_name"], a["file_type"], a["file_size"]) for a in attachments] == [
+        ("foto.jpg", "image/jpeg", len(photo)),
+        ("registro.log", "text/plain", len(log))
+    ]
+    contents = [client.get(f"/tickets/attachment/{i}/").data for i in attachment_ids(ticket_id)]
+    assert contents == [photo, log]
+    assert temp_files() == []
+
+
+def test_update_with_multipart(client, register_ticket, attachment_ids):
+    ticket_id = register_ticket()
+    content = os.urandom(3000)
+    response = client.patch(
+        f"/tickets/{ticket_id}/",
+        data={"solucion_caso": "Se cambió el tóner", "attachments": (io.BytesIO(content), "../../evidencia.png", "image/png")},
+        content_type="multipart/form-data"
+    )
+    assert response.status_code == 200
+
+    (attachment,) = client.get(f"/tickets/{ticket_id}/attachments/").get_json()
+    assert "/" not in attachment["file_name"]
+    assert not attachment["is_description_file"]
+    assert client.get(f"/tickets/attachment/{attachment['id']}/").data == content
+    (ticket,) = client.get("/tickets/", query_string={"fields": "solucion_caso"}).get_json()
+    assert ticket["solucion_caso"] == "Se cambió el tóner"
+
+
+def test_multipart_attachment_too_large(client, ticket_data):
+    form = dict(ticket_data, attachments=(io.BytesIO(b"x" * (MAX_ATTACHMENT_SIZE + 1)), "grande.bin"))
+    response = client.post("/tickets/register/", data=form, content_type="multipart/form-data")
+    assert response.status_code == 400
+    assert client.get("/tickets/").get_json() == []
+    assert temp_files() == []
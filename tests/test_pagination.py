@@ -0,0 +1,42 @@
+def test_cursor_pagination(client, ticket_data):
+    created = []
+    for i in range(7):
+        response = client.post("/tickets/register/", json=dict(ticket_data, tema=f"Tema {i}"))
+        assert response.status_code == 201
+        created.append(response.get_json()["ticket_id"])
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        query = {"limit": 2}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get("/tickets/", query_string=query)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page["tickets"]) <= 2
+        seen.extend(ticket["id"] for ticket in page["tickets"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 4
+    assert sorted(seen) == sorted(created)
+    assert len(seen) == len(set(seen))
+
+
+def test_pagination_with_filters_and_fields(client, ticket_data):
+    for estado in ("Abierto", "Cerrado", "Abierto"):
+        client.post("/tickets/register/", json=dict(ticket_data, estado=estado))
+
+    response = client.get("/tickets/", query_string={"limit": 10, "estado": "Abierto", "fields": "estado"})
+    page = response.get_json()
+    assert [set(ticket) for ticket in page["tickets"]] == [{"id", "estado"}] * 2
+    assert page["next_cursor"] is None
+
+
+def test_invalid_cursor(client):
+    assert client.get("/tickets/", query_string={"cursor": "no-es-un-cursor"}).status_code == 400
+    assert client.get("/tickets/", query_string={"limit": "cero"}).status_code == 400
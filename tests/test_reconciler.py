@@ -0,0 +1,85 @@
+import hashlib
+import os
+
+from app import db
+from app.models.attachment_blob_model import AttachmentBlob
+from app.utils.attachment_reconciler import reconcile_attachments
+from app.utils.attachment_store import blob_exists, blob_path, store_blob
+
+
+def make_orphans():
+    """
+    Crea un contenido registrado que ningún anexo referencia y un archivo del almacén sin registro.
+    """
+    orphan_blob = os.urandom(2000)
+    store_blob(orphan_blob)
+    db.session.commit()
+
+    orphan_file = os.urandom(2000)
+    orphan_file_sha256 = hashlib.sha256(orphan_file).hexdigest()
+    path = blob_path(orphan_file_sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(orphan_file)
+    return hashlib.sha256(orphan_blob).hexdigest(), orphan_file_sha256
+
+
+def test_dry_run_only_reports(client, app_context, register_ticket):
+    content = os.urandom(3000)
+    register_ticket(content)
+    orphan_blob, orphan_file = make_orphans()
+
+    messages = []
+    counts = reconcile_attachments(min_age=0, reset=True, report=messages.append)
+
+    assert counts == {"orphan_blob": 1, "orphan_file": 1}
+    assert any(orphan_blob in message for message in messages)
+    assert any(orphan_file in message for message in messages)
+    db.session.expire_all()
+    assert db.session.get(AttachmentBlob, orphan_blob) is not None
+    assert blob_exists(orphan_blob)
+    assert os.path.exists(blob_path(orphan_file))
+
+
+def test_delete_removes_orphans(client, app_context, register_ticket, attachment_ids):
+    content = os.urandom(3000)
+    ticket_id = register_ticket(content)
+    orphan_blob, orphan_file = make_orphans()
+
+    counts = reconcile_attachments(delete=True, min_age=0, reset=True, report=lambda message: None)
+
+    assert counts == {"orphan_blob": 1, "orphan_file": 1}
+    db.session.expire_all()
+    assert db.session.get(AttachmentBlob, orphan_blob) is None
+    assert not blob_exists(orphan_blob)
+    assert not os.path.exists(blob_path(orphan_file))
+
+    # Los anexos en uso se conservan y una segunda revisión no encuentra diferencias
+    (attachment_id,) = attachment_ids(ticket_id)
+    assert client.get(f"/tickets/attachment/{attachment_id}/").data == content
+    assert reconcile_attachments(delete=True, min_age=0, reset=True, report=lambda message: None) == {}
+
+
+def test_recent_files_are_kept(client, app_context):
+    _, orphan_file = make_orphans()
+
+    counts = reconcile_attachments(delete=True, reset=True, report=lambda message: None)
+
+    assert "orphan_file" not in counts
+    assert os.path.exists(blob_path(orphan_file))
+
+
+def test_wrong_ref_count_is_fixed(client, app_context, register_ticket):
+    content = os.urandom(3000)
+    sha256 = hashlib.sha256(content).hexdigest()
+    register_ticket(content)
+    db.session.execute(db.update(AttachmentBlob).where(AttachmentBlob.sha256 == sha256).values(ref_count=5))
+    db.session.commit()
+
+    assert reconcile_attachments(min_age=0, reset=True, report=lambda message: None) == {"wrong_ref_count": 1}
+    db.session.expire_all()
+    assert db.session.get(AttachmentBlob, sha256).ref_count == 5
+
+    reconcile_attachments(delete=True, min_age=0, reset=True, report=lambda message: None)
+    db.session.expire_all()
+    assert db.session.get(AttachmentBlob, sha256).ref_count == 1
@@ -0,0 +1,104 @@
+import glob
+import importlib.util
+import os
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app import app, db
+from app.utils import ticket_search
+
+
+MIGRATIONS_PATH = os.path.join(os.path.dirname(__file__), "..", "migrations", "versions")
+
+
+def run_search_migration(direction):
+    """
+    Ejecuta la migración del índice de texto completo (c302f4f9427b) sobre la base de datos de prueba.
+    """
+    (path,) = glob.glob(os.path.join(MIGRATIONS_PATH, "c302f4f9427b_*.py"))
+    spec = importlib.util.spec_from_file_location("c302f4f9427b", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with app.app_context(), db.engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            getattr(migration, direction)()
+
+
+@pytest.fixture
+def like(client, monkeypatch):
+    monkeypatch.setattr(ticket_search, "_search_backend", None)
+    with app.app_context():
+        assert ticket_search.get_search_backend() == "like"
+
+
+@pytest.fixture
+def fts5(client, monkeypatch):
+    run_search_migration("upgrade")
+    monkeypatch.setattr(ticket_search, "_search_backend", None)
+    with app.app_context():
+        assert ticket_search.get_search_backend() == "fts5"
+    yield
+    run_search_migration("downgrade")
+
+
+def search(client, q, **params):
+    response = client.get("/tickets/search/", query_string=dict(q=q, **params))
+    assert response.status_code == 200
+    return response.get_json()["tickets"]
+
+
+def test_like_search(client, like, register_ticket):
+    first = register_ticket(descripcion_caso="El disco está al 100% de uso")
+    register_ticket(descripcion_caso="El disco tiene 1000 archivos")
+    third = register_ticket(tema="Impresora_2", descripcion_caso="No imprime")
+
+    assert {ticket["id"] for ticket in search(client, "disco")} >= {first}
+    assert [ticket["id"] for ticket in search(client, "100%")] == [first]
+    assert [ticket["id"] for ticket in search(client, "_2")] == [third]
+    assert [ticket["id"] for ticket in search(client, "%")] == [first]
+
+
+def test_fts5_search(client, fts5, register_ticket):
+    printer = register_ticket(tema="Impresora", descripcion_caso="La impresora del segundo piso no imprime")
+    camera = register_ticket(tema="Cámara", descripcion_caso="La cámara <b>no enciende</b>")
+
+    assert [ticket["id"] for ticket in search(client, "impres")] == [printer]
+    (result,) = search(client, "camara enciende")
+    assert result["id"] == camera
+    assert result["rank"] > 0
+    assert "<mark>enciende</mark>" in result["descripcion_fragmento"]
+    assert "&lt;b&gt;" in result["descripcion_fragmento"]
+
+    # Los operadores y la sintaxis de FTS5 escritos por el usuario no producen errores
+    assert search(client, 'impresora AND "( NEAR') == []
+    assert search(client, "***") == []
+
+
+def test_fts5_index_follows_ticket_changes(client, fts5, register_ticket):
+    ticket_id = register_ticket(descripcion_caso="No hay red")
+    assert search(client, "red")
+
+    response = client.patch(f"/tickets/{ticket_id}/", json={"descripcion_caso": "No hay correo", "solucion_caso": "Se configuró Outlook"})
+    assert response.status_code == 200
+    assert search(client, "red") == []
+    assert [ticket["id"] for ticket in search(client, "outlook")] == [ticket_id]
+
+    assert client.delete(f"/tickets/{ticket_id}/").status_code == 200
+    assert search(client, "correo") == []
+
+
+def test_fts5_migration_indexes_existing_tickets(client, register_ticket, monkeypatch):
+    ticket_id = register_ticket(descripcion_caso="Ticket anterior al índice")
+    run_search_migration("upgrade")
+    try:
+        monkeypatch.setattr(ticket_search, "_search_backend", None)
+        assert [ticket["id"] for ticket in search(client, "anterior")] == [ticket_id]
+    finally:
+        run_search_migration("downgrade")
+
+
+def test_invalid_search_parameters(client):
+    assert client.get("/tickets/search/").status_code == 400
+    assert client.get("/tickets/search/", query_string={"q": "red", "limit": "diez"}).status_code == 400
@@ -0,0 +1,174 @@
+import smtplib
+import threading
+
+import pytest
+
+from app.utils import email_utils, smtp_pool
+from app.utils.smtp_pool import SMTPConnectionPool, SMTPPoolTimeout
+
+
+class FakeServer:
+    """
+    Reemplaza smtplib.SMTP: registra las conexiones abiertas y los correos enviados.
+    """
+
+    connections = []
+
+    def __init__(self, host, port, timeout=None):
+        self.host = host
+        self.port = port
+        self.logins = 0
+        self.sent = []
+        self.closed = False
+        self.noop_code = 250
+        self.errors = []
+        FakeServer.connections.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        self.logins += 1
+
+    def noop(self):
+        return self.noop_code, b"OK"
+
+    def sendmail(self, from_address, to_address, message):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((from_address, to_address, message))
+
+    def quit(self):
+        self.closed = True
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    FakeServer.connections = []
+    monkeypatch.setattr(smtp_pool.smtplib, "SMTP", FakeServer)
+    return FakeServer.connections
+
+
+def make_pool(**kwargs):
+    return SMTPConnectionPool("smtp.example.com", 587, "soporte", "clave", **kwargs)
+
+
+def test_connection_is_reused(servers):
+    pool = make_pool()
+    for i in range(3):
+        pool.send("soporte", ["ana@example.com"], f"mensaje {i}")
+
+    assert len(servers) == 1
+    assert servers[0].logins == 1
+    assert [sent[2] for sent in servers[0].sent] == ["mensaje 0", "mensaje 1", "mensaje 2"]
+    stats = pool.stats()
+    assert stats["handshakes"] == 1
+    assert stats["handshakes_avoided"] == 2
+    assert stats["sends"] == 3
+    assert stats["idle_connections"] == 1
+
+    pool.close()
+    assert servers[0].closed
+    assert pool.stats()["idle_connections"] == 0
+
+
+def test_no_reuse_without_idle_timeout(servers):
+    pool = make_pool(idle_timeout=0)
+    pool.send("soporte", ["ana@example.com"], "uno")
+    pool.send("soporte", ["ana@example.com"], "dos")
+
+    assert len(servers) == 2
+    assert all(server.closed for server in servers)
+    assert pool.stats()["handshakes_avoided"] == 0
+
+
+def test_stale_connection_is_replaced(servers):
+    pool = make_pool(noop_interval=-1)
+    pool.send("soporte", ["ana@example.com"], "uno")
+    servers[0].noop_code = 421
+    pool.send("soporte", ["ana@example.com"], "dos")
+
+    assert len(servers) == 2
+    assert servers[0].closed
+    assert servers[1].sent[0][2] == "dos"
+    stats = pool.stats()
+    assert stats["noop_checks"] == 1
+    assert stats["stale_connections"] == 1
+
+
+def test_reconnects_when_server_closed_reused_connection(servers):
+    pool = make_pool()
+    pool.send("soporte", ["ana@example.com"], "uno")
+    servers[0].errors.append(smtplib.SMTPServerDisconnected("cerrada"))
+    pool.send("soporte", ["ana@example.com"], "dos")
+
+    assert len(servers) == 2
+    assert servers[1].sent[0][2] == "dos"
+    assert pool.stats()["reconnects"] == 1
+
+
+def test_new_connection_errors_are_raised(servers, monkeypatch):
+    pool = make_pool()
+    original_init = FakeServer.__init__
+
+    def disconnected_init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        self.errors.append(smtplib.SMTPServerDisconnected("cerrada"))
+
+    monkeypatch.setattr(FakeServer, "__init__", disconnected_init)
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        pool.send("soporte", ["ana@example.com"], "uno")
+
+    assert len(servers) == 1
+    assert servers[0].closed
+    assert pool.stats()["send_errors"] == 1
+
+
+def test_refused_recipient_keeps_connection(servers):
+    pool = make_pool()
+    pool.send("soporte", ["ana@example.com"], "uno")
+    servers[0].errors.append(smtplib.SMTPRecipientsRefused({"nadie@example.com": (550, b"No existe")}))
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.send("soporte", ["nadie@example.com"], "dos")
+    pool.send("soporte", ["ana@example.com"], "tres")
+
+    assert len(servers) == 1
+    assert not servers[0].closed
+    assert [sent[2] for sent in servers[0].sent] == ["uno", "tres"]
+
+
+def test_pool_size_limits_concurrent_sends(servers, monkeypatch):
+    pool = make_pool(size=1, timeout=0)
+    sending = threading.Event()
+    release = threading.Event()
+
+    def slow_sendmail(self, from_address, to_address, message):
+        sending.set()
+        release.wait(5)
+
+    monkeypatch.setattr(FakeServer, "sendmail", slow_sendmail)
+    thread = threading.Thread(target=pool.send, args=("soporte", ["ana@example.com"], "uno"))
+    thread.start()
+    try:
+        assert sending.wait(5)
+        with pytest.raises(SMTPPoolTimeout):
+            pool.send("soporte", ["luis@example.com"], "dos")
+    finally:
+        release.set()
+        thread.join(5)
+
+    pool.send("soporte", ["luis@example.com"], "tres")
+    assert len(servers) == 1
+
+
+def test_deliver_email_uses_the_pool(servers, monkeypatch):
+    pool = make_pool()
+    monkeypatch.setattr(email_utils, "smtp_pool", pool)
+    for subject in ("Ticket creado", "Ticket finalizado"):
+        msg = email_utils.build_email(["ana@example.com"], subject, "<p>Hola</p>", text_body="Hola")
+        email_utils.deliver_email(["ana@example.com"], msg)
+
+    assert len(servers) == 1
+    assert servers[0].logins == 1
+    assert len(servers[0].sent) == 2
+    assert "Ticket finalizado" in servers[0].sent[1][2]
@@ -0,0 +1,58 @@
+from app import app, db
+from app.models.ticket_stat_model import TicketStat
+from app.utils.ticket_stats import get_ticket_stats, rebuild_ticket_stats
+
+
+def groups(stats, dimension):
+    return {group["valor"]: group for group in stats[f"por_{dimension}"]}
+
+
+def test_stats_follow_ticket_changes(client, register_ticket):
+    first = register_ticket(tema="Impresora")
+    second = register_ticket(tema="Impresora", especialista_email="maria@example.com")
+    third = register_ticket(tema="Red")
+
+    stats = client.get("/tickets/stats/").get_json()
+    assert stats["total"]["total"] == 3
+    assert stats["total"]["promedio_actitud"] is None
+    assert {valor: group["total"] for valor, group in groups(stats, "tema").items()} == {"Impresora": 2, "Red": 1}
+    assert stats["por_tema"][0]["valor"] == "Impresora"
+
+    client.put(f"/tickets/{first}/finalize/", json={"solucion_caso": "Listo"})
+    client.post(f"/tickets/{first}/rate/", json={"actitud": "5", "respuesta": "4", "tiempo_de_respuesta": "3"})
+    client.post(f"/tickets/{second}/rate/", json={"actitud": "2", "respuesta": "x", "solutionApproval": "No"})
+    client.delete(f"/tickets/{third}/")
+
+    stats = client.get("/tickets/stats/").get_json()
+    assert stats["total"]["total"] == 2
+    assert stats["total"]["promedio_actitud"] == 3.5
+    assert stats["total"]["promedio_respuesta"] == 4
+    assert {valor: group["total"] for valor, group in groups(stats, "estado").items()} == {"Solucionado": 1, "Devuelto": 1}
+    assert set(groups(stats, "tema")) == {"Impresora"}
+    assert groups(stats, "especialista_email")["maria@example.com"]["promedio_actitud"] == 2
+
+
+def test_rebuild_matches_incremental(client, app_context, register_ticket):
+    for tema in ("Impresora", "Red", "Red"):
+        ticket_id = register_ticket(tema=tema)
+        client.post(f"/tickets/{ticket_id}/rate/", json={"actitud": "4", "respuesta": "5", "tiempo_de_respuesta": "1"})
+    incremental = get_ticket_stats()
+
+    rebuild_ticket_stats()
+    db.session.commit()
+    assert get_ticket_stats() == incremental
+
+
+def test_rebuild_stats_command(client, app_context, register_ticket):
+    register_ticket()
+    TicketStat.query.delete()
+    db.session.commit()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["tickets", "rebuild-stats", "--if-empty"])
+    assert result.exit_code == 0
+    assert "recalculado" in result.output
+    assert get_ticket_stats()["total"]["total"] == 1
+
+    result = runner.invoke(args=["tickets", "rebuild-stats", "--if-empty"])
+    assert "no requiere" in result.output
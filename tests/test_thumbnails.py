@@ -0,0 +1,95 @@
+import io
+import os
+import time
+
+from PIL import Image
+
+from app.utils import attachment_thumbnails
+from app.utils.attachment_thumbnails import THUMBNAIL_FOLDER, evict_thumbnails
+
+
+def make_image(size=(1200, 800), mode="RGB", image_format="PNG"):
+    color = (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def open_thumbnail(response):
+    return Image.open(io.BytesIO(response.data))
+
+
+def test_thumbnail_is_generated_and_cached(client, register_ticket, attachment_ids):
+    ticket_id = register_ticket(make_image(), file_type="image/png")
+    (attachment_id,) = attachment_ids(ticket_id)
+    url = f"/tickets/attachment/{attachment_id}/thumbnail/"
+
+    response = client.get(url, headers={"Accept": "image/webp,*/*"})
+    assert response.status_code == 200
+    assert response.mimetype == "image/webp"
+    assert "Accept" in response.headers["Vary"]
+    assert open_thumbnail(response).size == (256, 171)
+    folder = os.path.join(os.environ["UPLOAD_PATH"], str(ticket_id), THUMBNAIL_FOLDER)
+    assert os.listdir(folder) == [f"{attachment_id}-256.webp"]
+
+    response = client.get(url, headers={"Accept": "image/webp,*/*", "If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+
+    response = client.get(url, query_string={"size": 128, "format": "jpeg"})
+    assert response.mimetype == "image/jpeg"
+    assert open_thumbnail(response).size == (128, 85)
+
+    # Las miniaturas se eliminan con el ticket
+    client.delete(f"/tickets/{ticket_id}/")
+    assert not os.path.exists(folder)
+
+
+def test_transparent_image_as_jpeg(client, register_ticket, attachment_ids):
+    (attachment_id,) = attachment_ids(register_ticket(make_image(mode="RGBA"), file_type="image/png"))
+    response = client.get(f"/tickets/attachment/{attachment_id}/thumbnail/", query_string={"format": "jpeg"})
+    assert response.status_code == 200
+    thumbnail = open_thumbnail(response)
+    assert thumbnail.mode == "RGB"
+    assert thumbnail.getpixel((10, 10))[1] > 100  # Sobre fondo blanco
+
+
+def test_invalid_thumbnail_requests(client, register_ticket, attachment_ids):
+    (image_id, broken_id) = attachment_ids(register_ticket(make_image(), b"no es una imagen", file_type="image/png"))
+    assert client.get(f"/tickets/attachment/{image_id}/thumbnail/", query_string={"size": 300}).status_code == 400
+    assert client.get(f"/tickets/attachment/{image_id}/thumbnail/", query_string={"format": "gif"}).status_code == 400
+    assert client.get(f"/tickets/attachment/{broken_id}/thumbnail/").status_code == 415
+    assert client.get("/tickets/attachment/999/thumbnail/").status_code == 404
+
+    (text_id,) = attachment_ids(register_ticket(b"texto", file_type="text/plain"))
+    assert client.get(f"/tickets/attachment/{text_id}/thumbnail/").status_code == 415
+
+
+def test_eviction_removes_least_recently_used(client):
+    folder = os.path.join(os.environ["UPLOAD_PATH"], "1", THUMBNAIL_FOLDER)
+    os.makedirs(folder)
+    now = time.time()
+    for i in range(10):
+        path = os.path.join(folder, f"{i}-256.webp")
+        with open(path, "wb") as f:
+            f.write(b"x" * 1000)
+        os.utime(path, (now - 1000 + i, now - 1000 + i))
+
+    assert evict_thumbnails(max_size=20000) == 0
+    assert evict_thumbnails(max_size=5000) == 6
+    assert sorted(os.listdir(folder)) == [f"{i}-256.webp" for i in range(6, 10)]
+
+
+def test_eviction_runs_in_background(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(attachment_thumbnails, "evict_thumbnails", lambda: calls.append(True))
+    monkeypatch.setattr(attachment_thumbnails, "THUMBNAIL_CACHE_MAX_SIZE", 1000)
+    monkeypatch.setattr(attachment_thumbnails, "_eviction_state", {"written": 0, "checked_at": time.monotonic(), "thread": None})
+
+    attachment_thumbnails._evict_if_needed(10)
+    assert attachment_thumbnails._eviction_state["thread"] is None
+
+    attachment_thumbnails._evict_if_needed(100)
+    thread = attachment_thumbnails._eviction_state["thread"]
+    assert thread.name == "thumbnail-eviction"
+    thread.join(5)
+    assert calls == [True]
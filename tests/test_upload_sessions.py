@@ -0,0 +1,193 @@
+import hashlib
+import os
+import time
+
+from app import db
+from app.models.ticket_model import Ticket
+from app.utils import upload_sessions
+
+
+def create_upload(client, content):
+    response = client.post("/uploads/", json={"fileName": "video.mp4", "fileType": "video/mp4", "size": len(content)})
+    assert response.status_code == 201
+    return response.get_json()["uploadId"]
+
+
+def send_chunk(client, upload_id, chunk, offset):
+    return client.patch(f"/uploads/{upload_id}/", data=chunk, headers={"Upload-Offset": str(offset)})
+
+
+def test_resumable_upload(client, ticket_data):
+    content = os.urandom(300000)
+    upload_id = create_upload(client, content)
+
+    assert send_chunk(client, upload_id, content[:100000], 0).get_json()["offset"] == 100000
+    # Tras un corte, el cliente consulta el offset y continúa desde ahí
+    offset = client.get(f"/uploads/{upload_id}/").get_json()["offset"]
+    assert send_chunk(client, upload_id, content[offset:], offset).get_json()["offset"] == len(content)
+
+    response = client.post(f"/uploads/{upload_id}/complete/", json={"sha256": hashlib.sha256(content).hexdigest()})
+    assert response.status_code == 200
+    assert response.get_json()["completed"]
+
+    response = client.post("/tickets/register/", json=dict(ticket_data, attachments=[{"uploadId": upload_id}]))
+    assert response.status_code == 201
+    ticket_id = response.get_json()["ticket_id"]
+    (attachment,) = client.get(f"/tickets/{ticket_id}/attachments/").get_json()
+    assert client.get(f"/tickets/attachment/{attachment['id']}/").data == content
+
+    # La sesión solo se puede usar una vez
+    response = client.post("/tickets/register/", json=dict(ticket_data, attachments=[{"uploadId": upload_id}]))
+    assert response.status_code >= 400
+
+
+def test_wrong_offset(client):
+    content = os.urandom(1000)
+    upload_id = create_upload(client, content)
+    send_chunk(client, upload_id, content[:400], 0)
+
+    response = send_chunk(client, upload_id, content[:400], 0)
+    assert response.status_code == 409
+    assert response.get_json()["offset"] == 400
+
+    response = send_chunk(client, upload_id, content[500:], 500)
+    assert response.status_code == 409
+    assert response.get_json()["offset"] == 400
+
+    response = send_chunk(client, upload_id, content[400:] + b"sobra", 400)
+    assert response.status_code == 413
+    assert response.get_json()["offset"] == 400
+
+    assert client.patch(f"/uploads/{upload_id}/", data=b"x").status_code == 400
+
+
+def test_incomplete_upload(client, ticket_data):
+    content = os.urandom(1000)
+    upload_id = create_upload(client, content)
+    send_chunk(client, upload_id, content[:400], 0)
+
+    response = client.post(f"/uploads/{upload_id}/complete/")
+    assert response.status_code == 409
+    assert response.get_json()["offset"] == 400
+
+    response = client.post("/tickets/register/", json=dict(ticket_data, attachments=[{"uploadId": upload_id}]))
+    assert response.status_code >= 400
+
+
+def test_sha256_mismatch(client):
+    content = os.urandom(1000)
+    upload_id = create_upload(client, content)
+    send_chunk(client, upload_id, content, 0)
+
+    response = client.post(f"/uploads/{upload_id}/complete/", json={"sha256": hashlib.sha256(b"otro").hexdigest()})
+    assert response.status_code == 400
+
+    # El archivo recibido no es el esperado: la sesión se elimina
+    assert client.get(f"/uploads/{upload_id}/").status_code == 404
+
+
+def test_unknown_and_cancelled_session(client):
+    assert client.get(f"/uploads/{'0' * 32}/").status_code == 404
+    assert client.post("/uploads/", json={"fileName": "a", "size": -1}).status_code == 400
+
+    upload_id = create_upload(client, b"abc")
+    assert client.delete(f"/uploads/{upload_id}/").status_code == 200
+    assert client.get(f"/uploads/{upload_id}/").status_code == 404
+
+
+def test_update_and_finalize_reject_bad_upload_ids(client, app_context, register_ticket):
+    ticket_id = register_ticket()
+    incomplete_id = create_upload(client, b"incompleto")
+
+    for method, url in (("patch", f"/tickets/{ticket_id}/"), ("put", f"/tickets/{ticket_id}/finalize/")):
+        response = getattr(client, method)(url, json={"solucion_caso": "Listo", "attachments": [{"uploadId": "nope"}]})
+        assert response.status_code == 404
+
+        response = getattr(client, method)(url, json={"solucion_caso": "Listo", "attachments": [{"uploadId": incomplete_id}]})
+        assert response.status_code == 409
+
+    # El ticket no cambió
+    db_ticket = db.session.get(Ticket, ticket_id)
+    assert db_ticket.solucion_caso != "Listo"
+    assert db_ticket.estado == "Abierto"
+    assert client.get(f"/tickets/{ticket_id}/attachments/").get_json() == []
+
+
+def test_finalize_with_upload(client, register_ticket, attachment_ids):
+    content = os.urandom(5000)
+    upload_id = create_upload(client, content)
+    send_chunk(client, upload_id, content, 0)
+    client.post(f"/uploads/{upload_id}/complete/")
+    ticket_id = register_ticket()
+
+    response = client.put(f"/tickets/{ticket_id}/finalize/", json={"solucion_caso": "Listo", "attachments": [{"uploadId": upload_id}]})
+    assert response.status_code == 200
+    (attachment_id,) = attachment_ids(ticket_id)
+    assert client.get(f"/tickets/attachment/{attachment_id}/").data == content
+
+    # La sesión se eliminó al usarla
+    response = client.patch(f"/tickets/{ticket_id}/", json={"attachments": [{"uploadId": upload_id}]})
+    assert response.status_code == 404
+
+
+def completed_upload(client, content):
+    upload_id = create_upload(client, content)
+    send_chunk(client, upload_id, content, 0)
+    assert client.post(f"/uploads/{upload_id}/complete/").status_code == 200
+    return upload_id
+
+
+def test_session_in_use(client, app_context):
+    content = os.urandom(1000)
+    upload_id = create_upload(client, content)
+
+    # Otra petición está escribiendo un fragmento
+    lock_path = upload_sessions._lock_session(upload_id)
+    response = send_chunk(client, upload_id, content, 0)
+    assert response.status_code == 409
+    assert client.post(f"/uploads/{upload_id}/complete/").status_code == 409
+    assert client.delete(f"/uploads/{upload_id}/").status_code == 409
+    assert client.get(f"/uploads/{upload_id}/").get_json()["offset"] == 0
+
+    upload_sessions._unlock_session(lock_path)
+    assert send_chunk(client, upload_id, content, 0).status_code == 200
+    assert not os.path.exists(lock_path)
+
+
+def test_abandoned_lock_expires(client, monkeypatch):
+    content = os.urandom(1000)
+    upload_id = create_upload(client, content)
+    lock_path = upload_sessions._lock_session(upload_id)
+    monkeypatch.setattr(upload_sessions, "UPLOAD_SESSION_LOCK_TIMEOUT", 60)
+    os.utime(lock_path, (time.time() - 120, time.time() - 120))
+
+    assert send_chunk(client, upload_id, content, 0).status_code == 200
+
+
+def test_same_upload_in_two_tickets(client, app_context, ticket_data):
+    content = os.urandom(5000)
+    upload_id = completed_upload(client, content)
+
+    # Otra petición está registrando un ticket con el mismo uploadId
+    lock_path = upload_sessions._lock_session(upload_id)
+    response = client.post("/tickets/register/", json=dict(ticket_data, attachments=[{"uploadId": upload_id}]))
+    assert response.status_code == 409
+    assert Ticket.query.count() == 0
+    upload_sessions._unlock_session(lock_path)
+
+    response = client.post("/tickets/register/", json=dict(ticket_data, attachments=[{"uploadId": upload_id}]))
+    assert response.status_code == 201
+    assert not os.path.exists(lock_path)
+
+
+def test_rolled_back_upload_can_be_used_again(client, app_context, ticket_data):
+    content = os.urandom(5000)
+    upload_id = completed_upload(client, content)
+
+    upload_sessions.store_upload_session(upload_id)
+    assert os.path.exists(upload_sessions._session_path(upload_id, ".lock"))
+    db.session.rollback()
+    assert not os.path.exists(upload_sessions._session_path(upload_id, ".lock"))
+
+    response = client.post("/tickets/register/", json=dict(ticket_data, attachments=[{"uploadId": upload_id}]))
+    assert response.status_code == 201